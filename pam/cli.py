@@ -1,5 +1,8 @@
 import logging
 import os
+import runpy
+from collections.abc import Iterator
+from contextlib import contextmanager
 from typing import List, Optional
 
 import click
@@ -9,6 +12,7 @@ from rich.console import Console
 from pam import read, write
 from pam.operations.combine import pop_combine
 from pam.operations.cropping import simplify_population
+from pam.policy.policies import apply_policies_to_writer
 from pam.report.benchmarks import benchmarks as bms
 from pam.report.stringify import stringify_plans
 from pam.report.summary import pretty_print_summary, print_summary
@@ -73,6 +77,48 @@ def comment_option(func):
     return func
 
 
+@contextmanager
+def population_writer(
+    dir_population_output: str, household_key: str, comment: str, keep_non_selected: bool
+) -> Iterator[write.Writer]:
+    """Open a MATSim writer for households streamed to `dir_population_output`/plans.xml.
+
+    Households are written to a temporary file, which is renamed once complete,
+    so that no partial output is left if the input cannot be streamed (e.g. non-contiguous households).
+
+    Args:
+        dir_population_output (str): output directory.
+        household_key (str): household key.
+        comment (str): comment included in the output population.
+        keep_non_selected (bool): whether to write non selected plans.
+
+    Raises:
+        click.ClickException: if the input population cannot be streamed.
+
+    Yields:
+        Iterator[write.Writer]: open writer.
+    """
+    path_output = os.path.join(dir_population_output, "plans.xml")
+    path_partial = os.path.join(dir_population_output, "plans.partial.xml")
+    try:
+        with write.Writer(
+            path_partial,
+            household_key=household_key,
+            comment=comment,
+            keep_non_selected=keep_non_selected,
+        ) as writer:
+            yield writer
+        os.replace(path_partial, path_output)
+    except UserWarning as error:
+        message = str(error)
+        if "not contiguous" in message:
+            message = f"{message.split(',')[0]}, use --non_contiguous_households."
+        raise click.ClickException(message) from error
+    finally:
+        if os.path.exists(path_partial):
+            os.remove(path_partial)
+
+
 @click.version_option()
 @click.group()
 def cli():
@@ -418,13 +464,20 @@ def combine(
 @click.option(
     "--household_key", "-h", type=str, default="hid", help="Household key, defaults to 'hid'."
 )
-@click.option("--seed", default=None, help="Random seed.")
+@click.option(
+    "--contiguous_households/--non_contiguous_households",
+    default=False,
+    help="Household members are contiguous in the input population, so the input is read once. "
+    "Otherwise (default) the input is read twice, first to find household sizes.",
+)
+@click.option("--seed", type=int, default=None, help="Random seed.")
 def sample(
     path_population_input: str,
     dir_population_output: str,
     sample_size: str,
     matsim_version: int,
     household_key: str,
+    contiguous_households: bool,
     simplify_pt_trips: bool,
     autocomplete: bool,
     crop: bool,
@@ -453,42 +506,132 @@ def sample(
     logger.debug(f"Leg route (required for warm starting) = {leg_route}")
     logger.debug(f"Keep non selected plans (recommended for warm starting) = {keep_non_selected}")
 
-    # read
-    with Console().status("[bold green]Loading population...", spinner="aesthetic") as _:
-        population_input = read.read_matsim(
-            path_population_input,
-            household_key=household_key,
-            weight=1,
-            version=matsim_version,
-            simplify_pt_trips=simplify_pt_trips,
-            autocomplete=autocomplete,
-            crop=crop,
-            leg_attributes=leg_attributes,
-            leg_route=leg_route,
-            keep_non_selected=keep_non_selected,
-        )
-    logger.info(f"Initial population size (number of agents): {len(population_input)}")
-
-    # sample
-    sample_size = float(sample_size)
-    population_output = population_sampler.sample(
-        population=population_input, sample=sample_size, seed=seed, verbose=True
+    # stream households from input, sample and write them one at a time
+    households = read.stream_matsim_households(
+        path_population_input,
+        household_key=household_key,
+        contiguous=contiguous_households,
+        weight=1,
+        version=matsim_version,
+        simplify_pt_trips=simplify_pt_trips,
+        autocomplete=autocomplete,
+        crop=crop,
+        leg_attributes=leg_attributes,
+        leg_route=leg_route,
+        keep_non_selected=keep_non_selected,
     )
+    counter = {"households": 0}
 
-    # export
-    if not os.path.exists(dir_population_output):
-        os.makedirs(dir_population_output)
+    def count_input(households):
+        for household in households:
+            counter["households"] += 1
+            yield household
 
-    with Console().status("[bold green]Writing population...", spinner="aesthetic") as _:
-        write.write_matsim(
-            population_output,
-            plans_path=os.path.join(dir_population_output, "plans.xml"),
-            comment=comment,
-            keep_non_selected=keep_non_selected,
-        )
+    with Console().status("[bold green]Sampling population...", spinner="aesthetic") as _:
+        with population_writer(
+            dir_population_output, household_key, comment, keep_non_selected
+        ) as writer:
+            n_sampled = population_sampler.sample_to_writer(
+                count_input(households), float(sample_size), writer, seed=seed
+            )
 
     logger.info("Population sampling complete")
-    logger.info(f"Output population size (number of agents): {len(population_output)}")
+    logger.info(f"Initial population size (number of households): {counter['households']}")
+    logger.info(f"Output population size (number of households): {n_sampled}")
+    logger.info(f"Output saved at {dir_population_output}/plans.xml")
+
+
+@cli.command()
+@common_options
+@common_matsim_options
+@comment_option
+@click.argument("path_population_input", type=click.Path(exists=True))
+@click.argument("path_policies", type=click.Path(exists=True))
+@click.argument("dir_population_output", type=click.Path(exists=False, writable=True))
+@click.option(
+    "--household_key", "-h", type=str, default="hid", help="Household key, defaults to 'hid'."
+)
+@click.option(
+    "--contiguous_households/--non_contiguous_households",
+    default=True,
+    help="Household members are contiguous in the input population (default), so the input is read once. "
+    "Otherwise the input is read twice, first to find household sizes.",
+)
+@click.option("--seed", type=int, default=None, help="Random seed.")
+@click.option(
+    "--workers", "-w", type=int, default=1, help="Number of processes to apply policies in."
+)
+def apply_policies(
+    path_population_input: str,
+    path_policies: str,
+    dir_population_output: str,
+    matsim_version: int,
+    household_key: str,
+    contiguous_households: bool,
+    simplify_pt_trips: bool,
+    autocomplete: bool,
+    crop: bool,
+    leg_attributes: bool,
+    leg_route: bool,
+    keep_non_selected: bool,
+    comment: str,
+    seed: Optional[int],
+    workers: int,
+    debug: bool,
+):
+    """Apply policies to a PAM population, one household at a time.
+
+    Policies are defined in a python file (PATH_POLICIES) as a list of `pam.policy` policies, named `policies`.
+    """
+    if debug:
+        logger.setLevel(logging.DEBUG)
+
+    logger.info("Starting policy application")
+    logger.debug(f"Loading plans from {path_population_input}.")
+    logger.debug(f"Loading policies from {path_policies}.")
+    logger.debug(f"Writing modified plans to {dir_population_output}.")
+    logger.debug(f"Seed = {seed}")
+    logger.debug(f"Workers = {workers}")
+    logger.debug(f"MATSim version set to {matsim_version}.")
+    logger.debug(f"'household_key' set to {household_key}.")
+    logger.debug(f"Simplify PT trips = {simplify_pt_trips}")
+    logger.debug(f"Autocomplete MATSim plans (recommended) = {autocomplete}")
+    logger.debug(f"Crop = {crop}")
+    logger.debug(f"Leg attributes (required for warm starting) = {leg_attributes}")
+    logger.debug(f"Leg route (required for warm starting) = {leg_route}")
+    logger.debug(f"Keep non selected plans (recommended for warm starting) = {keep_non_selected}")
+
+    policies = runpy.run_path(path_policies).get("policies")
+    if policies is None:
+        raise click.BadParameter(
+            f"No `policies` defined in {path_policies}.", param_hint="PATH_POLICIES"
+        )
+
+    # stream households from input, apply policies and write them one at a time
+    households = read.stream_matsim_households(
+        path_population_input,
+        household_key=household_key,
+        contiguous=contiguous_households,
+        weight=1,
+        version=matsim_version,
+        simplify_pt_trips=simplify_pt_trips,
+        autocomplete=autocomplete,
+        crop=crop,
+        leg_attributes=leg_attributes,
+        leg_route=leg_route,
+        keep_non_selected=keep_non_selected,
+    )
+
+    with Console().status("[bold green]Applying policies...", spinner="aesthetic") as _:
+        with population_writer(
+            dir_population_output, household_key, comment, keep_non_selected
+        ) as writer:
+            n_households = apply_policies_to_writer(
+                households, policies, writer, seed=seed, workers=workers
+            )
+
+    logger.info("Policy application complete")
+    logger.info(f"Population size (number of households): {n_households}")
     logger.info(f"Output saved at {dir_population_output}/plans.xml")
 
 
@@ -9,6 +9,7 @@ from collections.abc import Iterator
 from typing import Any, Optional, Union
 
 import geopandas as gpd
+import numpy as np
 import pandas as pd
 import plotly.graph_objs as go
 
@@ -19,10 +20,12 @@ from pam import (
     PAMSequenceValidationError,
     PAMValidationLocationsError,
     PAMVehicleIdError,
+    utils,
     variables,
     write,
 )
 from pam.location import Location
+from pam.samplers.rng import derive_seed
 from pam.vehicles import ElectricVehicle, Vehicle, VehicleManager, VehicleType
 
 
@@ -633,13 +636,25 @@ class Population:
                         component.end_location = person.plan[idx + 1].location
 
     def sample_locs_complex(
-        self, sampler, long_term_activities: list = None, joint_trips_prefix: str = "escort_"
+        self,
+        sampler,
+        long_term_activities: list = None,
+        joint_trips_prefix: str = "escort_",
+        seed: Optional[int] = None,
+        workers: int = 1,
     ):
         """Extends sample_locs method to enable more complex and rules-based sampling.
 
         Keeps track of the last location and transport mode, to apply distance- and mode-based sampling rules.
         It is generally slower than sample_locs, as it loops through both activities and legs.
 
+        Sampling is sequential within a household but independent across households.
+        If a `seed` is given, each household is sampled using its own random stream, derived from the seed and the household id,
+        so that results are reproducible and identical for any number of `workers`.
+        Samplers with a `reseed` method (such as `FacilitySampler`) are reseeded for each household.
+        The global `random` and `numpy.random` states are also reseeded, for samplers that rely on them,
+        and restored once sampling is complete.
+
         Args:
             long_term_activities (list, optional):
                 a list of activities for which location is only assigned once (per zone).
@@ -647,74 +662,48 @@ class Population:
             joint_trips_prefix (str, optional):
                 a purpose prefix used to identify escort/joint trips.
                 Defaults to "escort_".
+            seed (Optional[int], optional):
+                If given, master seed for reproducible results. Defaults to None.
+            workers (int, optional):
+                Number of processes to partition households across.
+                The sampler is copied to each process, so must be picklable if processes are not forked.
+                Defaults to 1.
         """
         if long_term_activities is None:
             long_term_activities = variables.LONG_TERM_ACTIVITIES
 
-        for _, household in self.households.items():
-            home_loc = activity.Location(
-                area=household.location.area,
-                loc=sampler.sample(
-                    household.location.area,
-                    "home",
-                    mode=None,
-                    previous_duration=None,
-                    previous_loc=None,
-                ),
-            )
-            mode = None
-
-            unique_locations = {(household.location.area, "home"): home_loc}
-
-            for _, person in household.people.items():
-                mode = None
-                previous_duration = None
-                previous_loc = None
-
-                for idx, component in enumerate(person.plan):
-                    # loop through all plan elements
-
-                    if isinstance(component, activity.Leg):
-                        mode = component.mode  # keep track of last mode
-                        previous_duration = component.duration
-
-                    elif isinstance(component, activity.Activity):
-                        act = component
-
-                        # remove "escort_" from activity types.
-                        # TODO: model joint trips
-                        if act.act[: len(joint_trips_prefix)] == joint_trips_prefix:
-                            target_act = act.act[(len(joint_trips_prefix)) :]
-                        else:
-                            target_act = act.act
-
-                        if (act.location.area, target_act) in unique_locations:
-                            location = unique_locations[(act.location.area, target_act)]
-                            act.location = location
-
-                        else:
-                            location = activity.Location(
-                                area=act.location.area,
-                                loc=sampler.sample(
-                                    act.location.area,
-                                    target_act,
-                                    mode=mode,
-                                    previous_duration=previous_duration,
-                                    previous_loc=previous_loc,
-                                ),
-                            )
-                            if target_act in long_term_activities:
-                                unique_locations[(act.location.area, target_act)] = location
-                            act.location = location
-
-                        previous_loc = location.loc  # keep track of previous location
+        if workers == 1:
+            if seed is not None:
+                random_state, np_random_state = random.getstate(), np.random.get_state()
+            try:
+                for _, household in self.households.items():
+                    _sample_household_locs_complex(
+                        household, sampler, long_term_activities, joint_trips_prefix, seed
+                    )
+            finally:
+                if seed is not None:
+                    random.setstate(random_state)
+                    np.random.set_state(np_random_state)
+            return None
 
-                # complete the alotting activity locations to the trip starts and ends.
-                for idx in range(person.plan.length):
-                    component = person.plan[idx]
-                    if isinstance(component, activity.Leg):
-                        component.start_location = person.plan[idx - 1].location
-                        component.end_location = person.plan[idx + 1].location
+        if seed is None:
+            # otherwise forked processes would share the same global random state
+            seed = np.random.SeedSequence().entropy
+        households = list(self.households.values())
+        chunksize = max(1, len(households) // (workers * 4))
+        chunks = [households[i : i + chunksize] for i in range(0, len(households), chunksize)]
+
+        work = {
+            "sampler": sampler,
+            "long_term_activities": long_term_activities,
+            "joint_trips_prefix": joint_trips_prefix,
+            "seed": seed,
+        }
+        for _, results in utils.map_chunks(chunks, _sample_locs_chunk, work, workers):
+            for hid, locations, facilities in results:
+                _set_household_locs(self.households[hid], locations)
+                if facilities and hasattr(sampler, "merge_facilities"):
+                    sampler.merge_facilities(facilities)
 
 
 class Household:
@@ -1378,3 +1367,107 @@ class Person:
     def pickle(self, path):
         with open(path, "wb") as file:
             pickle.dump(self, file)
+
+
+def _sample_household_locs_complex(
+    household, sampler, long_term_activities: list, joint_trips_prefix: str, seed: Optional[int]
+) -> None:
+    """Sample household plan locs in place, see `Population.sample_locs_complex`."""
+    if seed is not None:
+        household_seed = derive_seed(seed, household.hid)
+        random.seed(household_seed)
+        np.random.seed(household_seed)
+        if hasattr(sampler, "reseed"):
+            sampler.reseed(household_seed)
+
+    home_loc = activity.Location(
+        area=household.location.area,
+        loc=sampler.sample(
+            household.location.area, "home", mode=None, previous_duration=None, previous_loc=None
+        ),
+    )
+    mode = None
+
+    unique_locations = {(household.location.area, "home"): home_loc}
+
+    for _, person in household.people.items():
+        mode = None
+        previous_duration = None
+        previous_loc = None
+
+        for idx, component in enumerate(person.plan):
+            # loop through all plan elements
+
+            if isinstance(component, activity.Leg):
+                mode = component.mode  # keep track of last mode
+                previous_duration = component.duration
+
+            elif isinstance(component, activity.Activity):
+                act = component
+
+                # remove "escort_" from activity types.
+                # TODO: model joint trips
+                if act.act[: len(joint_trips_prefix)] == joint_trips_prefix:
+                    target_act = act.act[(len(joint_trips_prefix)) :]
+                else:
+                    target_act = act.act
+
+                if (act.location.area, target_act) in unique_locations:
+                    location = unique_locations[(act.location.area, target_act)]
+                    act.location = location
+
+                else:
+                    location = activity.Location(
+                        area=act.location.area,
+                        loc=sampler.sample(
+                            act.location.area,
+                            target_act,
+                            mode=mode,
+                            previous_duration=previous_duration,
+                            previous_loc=previous_loc,
+                        ),
+                    )
+                    if target_act in long_term_activities:
+                        unique_locations[(act.location.area, target_act)] = location
+                    act.location = location
+
+                previous_loc = location.loc  # keep track of previous location
+
+        _set_leg_locations(person.plan)
+
+
+def _set_leg_locations(plan: activity.Plan) -> None:
+    """Complete the alotting of activity locations to the trip starts and ends."""
+    for idx in range(plan.length):
+        component = plan[idx]
+        if isinstance(component, activity.Leg):
+            component.start_location = plan[idx - 1].location
+            component.end_location = plan[idx + 1].location
+
+
+def _set_household_locs(household, locations: list[Location]) -> None:
+    """Set household activity locations, in the order given by `Household.activities`."""
+    for act, location in zip(household.activities, locations):
+        act.location = location
+    for _, person in household:
+        _set_leg_locations(person.plan)
+
+
+def _sample_locs_chunk(
+    households: list,
+    sampler,
+    long_term_activities: list,
+    joint_trips_prefix: str,
+    seed: Optional[int],
+) -> list[tuple[Any, list[Location], dict]]:
+    """Sample a chunk of households, returning their new activity locations and any sampled facilities."""
+    results = []
+    for household in households:
+        if hasattr(sampler, "clear"):
+            sampler.clear()
+        _sample_household_locs_complex(
+            household, sampler, long_term_activities, joint_trips_prefix, seed
+        )
+        locations = [act.location for act in household.activities]
+        results.append((household.hid, locations, dict(getattr(sampler, "facilities", {}))))
+    return results
@@ -0,0 +1,149 @@
+from copy import deepcopy
+from datetime import timedelta
+
+import numpy as np
+
+from pam.activity import Plan
+from pam.optimise.grid import latest_start_time, print_report
+from pam.scoring import PT_INTERACTIONS, CharyparNagelPlanScorer
+from pam.variables import START_OF_DAY
+
+
+def dp_search(
+    plan: Plan,
+    plans_scorer: CharyparNagelPlanScorer,
+    config: dict,
+    step: int = 900,
+    copy=True,
+    verbose: bool = True,
+) -> (Plan, float):
+    """Dynamic programming search for the optimum plan schedule.
+
+    Finds the same optimum as `pam.optimise.grid.grid_search`, on the same grid of trip departure times,
+    without enumerating all permutations. Given its start and end times, the score of each activity is independent
+    of the rest of the plan, so the best score of the remainder of a plan can be found for each departure time
+    of each trip, working backwards from the last trip. If the first and last activities are scored as a single wrapped
+    activity, the best score of the remainder is found for each departure time of the first trip as well.
+
+    Each step considers all pairs of consecutive departure times, so cost grows linearly with the number of trips
+    (or with the grid size cubed for wrapped plans), rather than exponentially.
+
+    Trip durations are assumed fixed and activity sequence is not changed.
+
+    Args:
+        plan (Plan): Input plan.
+        plans_scorer (CharyparNagelPlanScorer): Plans scorer object.
+        config (Dict): PlansScorer config.
+        step (int): Grid size in seconds. Defaults to 900.
+        copy (Bool): Create a copy of the input plan. Defaults to True.
+        verbose (bool): Print a report of the search. Defaults to True.
+
+    Returns:
+        (Plan, float): Best plan found and score of best plan.
+    """
+    if copy:
+        plan = deepcopy(plan)
+    initial_score = plans_scorer.score_plan(plan, config)
+    n_legs = len(plan) // 2
+    if n_legs == 0:
+        return plan, initial_score
+
+    initial_times = [(component.start_time, component.end_time) for component in plan]
+    departures = optimum_departures(plan, plans_scorer, config, step)
+    for leg_index, departure in enumerate(departures):
+        activity = plan[leg_index * 2]
+        leg = plan[leg_index * 2 + 1]
+        next_activity = plan[leg_index * 2 + 2]
+        activity.end_time = START_OF_DAY + timedelta(seconds=int(departure))
+        leg.end_time = leg.shift_start_time(activity.end_time)
+        next_activity.start_time = leg.end_time
+
+    best_score = plans_scorer.score_plan(plan, config)
+    if best_score < initial_score:
+        # as per grid_search, the input schedule is kept if no schedule on the grid improves on it
+        for component, (start_time, end_time) in zip(plan, initial_times):
+            component.start_time = start_time
+            component.end_time = end_time
+        best_score = initial_score
+    if verbose:
+        print_report(initial_score, best_score, step)
+    return plan, best_score
+
+
+def optimum_departures(
+    plan: Plan, plans_scorer: CharyparNagelPlanScorer, config: dict, step: int = 900
+) -> np.ndarray:
+    """Find the trip departure times (in seconds) of the optimum plan schedule, as searched by `grid_search`.
+
+    Departures are on a grid of `step` seconds, with each trip departing at least `step` seconds after the previous trip,
+    and early enough for the remaining trips to finish within the day.
+    Where multiple schedules have the same score, the latest departures are preferred, as per `grid_search`.
+
+    Args:
+        plan (Plan): Input plan, of at least one trip.
+        plans_scorer (CharyparNagelPlanScorer): Plans scorer object.
+        config (Dict): PlansScorer config.
+        step (int): Grid size in seconds. Defaults to 900.
+
+    Returns:
+        np.ndarray: departure time of each trip.
+    """
+    activities = plan.day[::2]
+    legs = plan.day[1::2]
+    n_legs = len(legs)
+    grid = np.arange(0, 24 * 60 * 60 + step, step, dtype=float)
+    durations = [leg.duration.seconds for leg in legs]
+    feasible = [grid < latest_start_time(plan, k) + step for k in range(n_legs)]
+    # as per CharyparNagelPlanScorer.score_plan_activities
+    wrapped = activities[0].act == activities[-1].act
+
+    def activity_scores(activity, starts, ends):
+        if activity.act in PT_INTERACTIONS:
+            return np.zeros(np.broadcast(starts, ends).shape)
+        return plans_scorer.score_activity_times(activity.act, starts, ends, config)
+
+    def leg_scores(k):
+        return np.where(
+            feasible[k], plans_scorer.score_leg_departures(legs[k], grid, config), -np.inf
+        )
+
+    # scores of each middle activity, for each departure before (rows) and after (columns) it
+    transitions = []
+    for k in range(1, n_legs):
+        scores = activity_scores(activities[k], grid[:, None] + durations[k - 1], grid[None, :])
+        scores[grid[None, :] < grid[:, None] + step] = -np.inf
+        transitions.append(scores)
+
+    # best score of the remainder of the plan, given the first (rows) and current (columns) departures,
+    # the first departure is only needed (rows > 1) for a wrapped last activity
+    last_starts = grid + durations[-1]
+    if wrapped:
+        remainder = activity_scores(
+            activities[0], last_starts[None, :], grid[:, None] + 24 * 60 * 60
+        )
+    else:
+        last_end = (activities[-1].end_time - START_OF_DAY).total_seconds()
+        remainder = activity_scores(activities[-1], last_starts, last_end)[None, :]
+    remainder = remainder + leg_scores(n_legs - 1)
+    remainders = [remainder]
+    for k in range(n_legs - 2, -1, -1):
+        remainder = np.stack(
+            [(transitions[k] + row[None, :]).max(axis=1) for row in remainder]
+        ) + leg_scores(k)
+        remainders.insert(0, remainder)
+
+    if wrapped:
+        first_scores = np.diagonal(remainders[0])
+    else:
+        first_start = (activities[0].start_time - START_OF_DAY).total_seconds()
+        first_scores = activity_scores(activities[0], first_start, grid) + remainders[0][0]
+
+    departures = [_last_argmax(first_scores)]
+    row = departures[0] if wrapped else 0
+    for k in range(1, n_legs):
+        departures.append(_last_argmax(transitions[k - 1][departures[-1]] + remainders[k][row]))
+    return grid[departures]
+
+
+def _last_argmax(scores: np.ndarray) -> int:
+    return len(scores) - 1 - int(np.argmax(scores[::-1]))
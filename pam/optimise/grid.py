@@ -1,5 +1,7 @@
+import time
 from copy import deepcopy
 from datetime import timedelta
+from typing import Optional
 
 from pam.activity import Plan
 from pam.scoring import PlanScorer
@@ -30,7 +32,13 @@ class Recorder:
 
 
 def grid_search(
-    plan: Plan, plans_scorer: PlanScorer, config: dict, step: int = 900, copy=True
+    plan: Plan,
+    plans_scorer: PlanScorer,
+    config: dict,
+    step: int = 900,
+    copy=True,
+    timeout: Optional[float] = None,
+    verbose: bool = True,
 ) -> (float, Plan):
     """Grid search for optimum plan schedule.
 
@@ -46,6 +54,8 @@ def grid_search(
         config (Dict): PlansScorer config.
         step (int): Grid size in seconds. Defaults to 900.
         copy (Bool): Create a copy of the input plan. Defaults to True.
+        timeout (Optional[float]): If given, stop searching after this many seconds and return the best plan found so far. Defaults to None.
+        verbose (bool): Print a report of the search. Defaults to True.
 
     Returns:
         (Plan, float): Best plan found and score of best plan.
@@ -53,7 +63,7 @@ def grid_search(
     if copy:
         plan = deepcopy(plan)
     initial_score = plans_scorer.score_plan(plan, config)
-    recorder = Recorder(initial_score, plan)
+    recorder = Recorder(initial_score, deepcopy(plan))
 
     traverse(
         scorer=plans_scorer,
@@ -63,8 +73,10 @@ def grid_search(
         step=step,
         leg_index=0,
         recorder=recorder,
+        deadline=None if timeout is None else time.monotonic() + timeout,
     )
-    print_report(initial_score, recorder.best_score, step)
+    if verbose:
+        print_report(initial_score, recorder.best_score, step)
     return recorder.best_plan, recorder.best_score
 
 
@@ -83,10 +95,16 @@ def traverse(
     earliest: int,
     leg_index: int,
     recorder: Recorder,
+    deadline: Optional[float] = None,
 ):
     """Traverse all possible grid permutations by enumerating all trip start times of first trip
     and recursively all following trips in sequence.
+
+    If a `deadline` (`time.monotonic` time) is given, traversal stops once it has passed.
     """
+    if deadline is not None and time.monotonic() > deadline:
+        return None
+
     ## exit condition
     if leg_index * 2 + 2 >= len(plan):
         recorder.update(scorer.score_plan(plan, cnfg=config), plan)
@@ -109,6 +127,7 @@ def traverse(
             leg_index=leg_index + 1,
             step=step,
             recorder=recorder,
+            deadline=deadline,
         )
 
 
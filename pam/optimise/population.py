@@ -0,0 +1,249 @@
+import logging
+from collections.abc import Iterable, Iterator
+from itertools import islice
+from typing import Any, Callable, Optional, Union
+
+import numpy as np
+import pandas as pd
+
+from pam import utils
+from pam.activity import Plan
+from pam.core import Household, Person, Population
+from pam.optimise import dp, grid, random
+from pam.samplers.rng import RNGRegistry
+from pam.scoring import CharyparNagelPlanScorer, PlanScorer, plans_to_scoring_arrays
+from pam.write.matsim import Writer
+
+logger = logging.getLogger(__name__)
+
+OPTIMISERS = ["grid", "dp", "random"]
+
+
+def optimise_population(
+    households: Union[Population, Iterable[Household]],
+    scorer: PlanScorer,
+    optimiser: str = "grid",
+    key: str = "subpopulation",
+    workers: int = 1,
+    chunksize: int = 100,
+    seed: Optional[int] = None,
+    timeout: Optional[float] = None,
+    progress: Optional[Callable[[int], None]] = None,
+    writer: Optional[Writer] = None,
+    **kwargs,
+) -> pd.DataFrame:
+    """Optimise the plan schedules of all persons of a population.
+
+    Persons are optimised in chunks of households, which are distributed across a process pool.
+    Scorer configurations are compiled once (if supported by the scorer) and passed to each process once.
+    Optimised plans replace the persons' plans in place.
+    Households may be a population, or any iterable of households (e.g. streamed from disk),
+    in which case only a few chunks of households per worker are held in memory at a time.
+
+    Example:
+        ```python
+        with pam.write.matsim.Writer(OUT_PATH) as writer:
+            optimise_population(
+                pam.read.stream_matsim_households(IN_PATH), scorer, workers=8, writer=writer
+            )
+        ```
+
+    Args:
+        households (Union[Population, Iterable[Household]]): households to optimise.
+        scorer (PlanScorer): plans scorer, with a configuration for each subpopulation.
+        optimiser (str, optional):
+            "grid" (`pam.optimise.grid.grid_search`), "dp" (`pam.optimise.dp.dp_search`, finding the same optimum as "grid",
+            requires a `CharyparNagelPlanScorer`) or "random" (`pam.optimise.random.reschedule`). Defaults to "grid".
+        key (str, optional): person attribute name for subpopulation. Defaults to "subpopulation".
+        workers (int, optional):
+            Number of processes to optimise chunks of households in.
+            The scorer is copied to each process, so must be picklable if processes are not forked.
+            Defaults to 1.
+        chunksize (int, optional): number of households in each chunk. Defaults to 100.
+        seed (Optional[int], optional):
+            If given, master seed for reproducible results.
+            Each person is optimised using its own random stream, so results do not depend on `workers` or `chunksize`.
+            Defaults to None.
+        timeout (Optional[float], optional):
+            If given, maximum time in seconds to optimise each person, after which the best plan found so far is kept.
+            Not supported by "dp". Defaults to None.
+        progress (Optional[Callable[[int], None]], optional):
+            If given, called with the number of persons optimised so far, after each chunk. Defaults to None.
+        writer (Optional[Writer], optional): If given, open MATSim writer to stream optimised households to. Defaults to None.
+        **kwargs: optimiser options, e.g. `step` for "grid" and "dp", or `patience` for "random".
+
+    Returns:
+        pd.DataFrame: initial and optimised score of each person, indexed by household and person id.
+    """
+    if optimiser not in OPTIMISERS:
+        raise ValueError(f"Unknown optimiser '{optimiser}', expected one of {OPTIMISERS}")
+    if optimiser == "dp":
+        if not isinstance(scorer, CharyparNagelPlanScorer):
+            raise ValueError(
+                f"Optimiser 'dp' requires a CharyparNagelPlanScorer, not {type(scorer).__name__}"
+            )
+        if timeout is not None:
+            raise ValueError("Optimiser 'dp' does not support a timeout")
+    if seed is None:
+        seed = np.random.SeedSequence().entropy
+    if hasattr(scorer, "compile"):
+        configs = {subpop: scorer.compile(cnfg) for subpop, cnfg in scorer.cnfg.items()}
+    else:
+        configs = scorer.cnfg
+    work = {
+        "scorer": scorer,
+        "configs": configs,
+        "optimiser": optimiser,
+        "options": kwargs,
+        "seed": seed,
+        "timeout": timeout,
+    }
+
+    records = []
+    for chunk, results in _map_chunks(households, key, chunksize, workers, _optimise_persons, work):
+        for (hid, pid, person), (plan, initial_score, score) in zip(_people(chunk), results):
+            person.plan = plan
+            records.append((hid, pid, initial_score, score))
+        if writer is not None:
+            for household in chunk:
+                writer.add_hh(household)
+        if progress is not None:
+            progress(len(records))
+        logger.debug(f"Optimised {len(records)} persons")
+
+    return pd.DataFrame(records, columns=["hid", "pid", "initial_score", "score"]).set_index(
+        ["hid", "pid"]
+    )
+
+
+def score_population(
+    households: Union[Population, Iterable[Household]],
+    scorer: PlanScorer,
+    key: str = "subpopulation",
+    workers: int = 1,
+    chunksize: int = 10000,
+    progress: Optional[Callable[[int], None]] = None,
+) -> pd.Series:
+    """Score all persons of a population, distributing chunks of households across a process pool.
+
+    `CharyparNagelPlanScorer` chunks are scored at once using `score_arrays`, other scorers score each person in turn.
+
+    Args:
+        households (Union[Population, Iterable[Household]]): households to score.
+        scorer (PlanScorer): plans scorer, with a configuration for each subpopulation.
+        key (str, optional): person attribute name for subpopulation. Defaults to "subpopulation".
+        workers (int, optional): number of processes to score chunks of households in. Defaults to 1.
+        chunksize (int, optional): number of households in each chunk. Defaults to 10000.
+        progress (Optional[Callable[[int], None]], optional):
+            If given, called with the number of persons scored so far, after each chunk. Defaults to None.
+
+    Returns:
+        pd.Series: score of each person, indexed by household and person id.
+    """
+    index = []
+    scores = []
+    for chunk, results in _map_chunks(
+        households, key, chunksize, workers, _score_persons, {"scorer": scorer}
+    ):
+        index.extend((hid, pid) for hid, pid, _ in _people(chunk))
+        scores.extend(results)
+        if progress is not None:
+            progress(len(scores))
+
+    return pd.Series(
+        scores,
+        index=pd.MultiIndex.from_tuples(index, names=["hid", "pid"]),
+        name="score",
+        dtype=float,
+    )
+
+
+def _optimise_persons(
+    persons: list[tuple[Any, Any, Plan, str]],
+    scorer: PlanScorer,
+    configs: dict,
+    optimiser: str,
+    options: dict,
+    seed: int,
+    timeout: Optional[float],
+) -> list[tuple[Plan, float, float]]:
+    """Optimise plans, returning the best plan, initial score and best score of each person."""
+    registry = RNGRegistry(seed)
+    results = []
+    for hid, pid, plan, subpop in persons:
+        config = configs[subpop]
+        initial_score = scorer.score_plan(plan, config)
+        if optimiser == "grid":
+            best_plan, score = grid.grid_search(
+                plan, scorer, config, timeout=timeout, verbose=False, **options
+            )
+        elif optimiser == "dp":
+            best_plan, score = dp.dp_search(plan, scorer, config, verbose=False, **options)
+        else:
+            best_plan, scores = random.reschedule(
+                plan,
+                scorer,
+                config,
+                rng=registry.stream("optimise", hid, pid),
+                timeout=timeout,
+                verbose=False,
+                **options,
+            )
+            score = max(scores.values())
+        results.append((best_plan, initial_score, score))
+    return results
+
+
+def _score_persons(
+    persons: list[tuple[Any, Any, Plan, str]], scorer: PlanScorer
+) -> Union[np.ndarray, list[float]]:
+    if isinstance(scorer, CharyparNagelPlanScorer):
+        arrays = plans_to_scoring_arrays(
+            [plan for _, _, plan, _ in persons], [subpop for _, _, _, subpop in persons]
+        )
+        return scorer.score_arrays(arrays)
+    return [scorer.score_plan(plan, scorer.cnfg[subpop]) for _, _, plan, subpop in persons]
+
+
+def _people(households: list[Household]) -> Iterator[tuple[Any, Any, Person]]:
+    for household in households:
+        for pid, person in household.people.items():
+            yield household.hid, pid, person
+
+
+def _payload(households: list[Household], key: str) -> list[tuple[Any, Any, Plan, str]]:
+    """Persons of a chunk of households, as sent to workers."""
+    return [
+        (hid, pid, person.plan, person.attributes[key]) for hid, pid, person in _people(households)
+    ]
+
+
+def _chunks(
+    households: Union[Population, Iterable[Household]], chunksize: int
+) -> Iterator[list[Household]]:
+    if isinstance(households, Population):
+        households = households.households.values()
+    households = iter(households)
+    while chunk := list(islice(households, chunksize)):
+        yield chunk
+
+
+def _map_chunks(
+    households: Union[Population, Iterable[Household]],
+    key: str,
+    chunksize: int,
+    workers: int,
+    func: Callable,
+    work: dict,
+) -> Iterator[tuple[list[Household], Any]]:
+    """Apply `func` to the persons of each chunk of households, yielding each chunk with its results in order.
+
+    With more than one worker, at most a few chunks per worker are read ahead of the results.
+    """
+    return utils.map_chunks(
+        _chunks(households, chunksize),
+        func,
+        work,
+        workers,
+        payload=lambda chunk: _payload(chunk, key),
+    )
@@ -1,11 +1,13 @@
+import time
 from copy import deepcopy
-from datetime import timedelta
+from typing import Optional
 
+import numpy as np
 from numpy import random
 
 from pam.activity import Plan
-from pam.scoring import PlanScorer
-from pam.variables import END_OF_DAY
+from pam.scoring import PlanScorer, set_plan_times
+from pam.variables import END_OF_DAY, START_OF_DAY
 
 
 def reschedule(
@@ -15,6 +17,10 @@ def reschedule(
     horizon: int = 5,
     sensitivity: float = 0.01,
     patience: int = 1000,
+    batch_size: int = 1,
+    rng: Optional[np.random.Generator] = None,
+    timeout: Optional[float] = None,
+    verbose: bool = True,
 ) -> (Plan, float):
     """Randomly search for an improved plan sequence based on given plans_scorer.
 
@@ -26,26 +32,48 @@ def reschedule(
         config (dict): plans_scorer configuration. Defaults to {}.
         horizon (int): Early stopper horizon. Defaults to 5.
         sensitivity (float): Early stopper sensitivity. Defaults to 0.01.
-        patience (int): Defaults to 1000.
+        patience (int): Number of proposals (after the first). Defaults to 1000.
+        batch_size (int):
+            Number of proposals to draw and score at once, keeping the best of each batch.
+            Early stopping is checked once per batch. Defaults to 1.
+        rng (Optional[np.random.Generator]): If given, random number generator to draw from. Defaults to None.
+        timeout (Optional[float]): If given, stop searching after this many seconds and return the best plan found so far. Defaults to None.
+        verbose (bool): Print a report of the search. Defaults to True.
 
     Returns:
         (Plan, float): best plan found and best score.
     """
-    best_score = plans_scorer.score_plan(plan, config)
+    best_score = plans_scorer.score_components(plan, config).total
     initial_score = best_score
     best_scores = {0: best_score}
+    best_times = None
     stopper = Stopper(horizon=horizon, sensitivity=sensitivity)
-    for n in range(patience + 1):
-        proposed_plan = random_mutate_activity_durations(plan, copy=True)
-        score = plans_scorer.score_plan(proposed_plan, config)
-        if score > best_score:
-            best_scores[n] = score
-            best_score = score
-            plan = proposed_plan
-            if stopper.stop(score):
-                print_report(initial_score, best_score, n)
-                return plan, best_scores
-    print_report(initial_score, best_score, n)
+    deadline = None if timeout is None else time.monotonic() + timeout
+    n = 0
+    while n <= patience:
+        # proposals are drawn and scored as arrays of times, without copying the plan
+        size = min(batch_size, patience + 1 - n)
+        starts, ends = random_activity_times(plan, rng=rng, size=size)
+        if size == 1:
+            # every component of a proposal changes, so single proposals are scored in full
+            scores = [plans_scorer.score_components(plan, config, starts[0], ends[0]).total]
+        else:
+            scores = plans_scorer.score_plan_times(plan, config, starts, ends)
+        best = int(np.argmax(scores))
+        if scores[best] > best_score:
+            best_score = float(scores[best])
+            best_scores[n + best] = best_score
+            best_times = (starts[best], ends[best])
+            if stopper.stop(best_score):
+                n += best
+                break
+        n += size
+        if deadline is not None and time.monotonic() > deadline:
+            break
+    if verbose:
+        print_report(initial_score, best_score, min(n, patience))
+    if best_times is not None:
+        plan = set_plan_times(deepcopy(plan), *best_times)
     return plan, best_scores
 
 
@@ -56,28 +84,52 @@ def print_report(initial_score, best_score, n):
         print(f"Failed to improve score from initial {initial_score} in {n} steps.")
 
 
-def random_mutate_activity_durations(plan: Plan, copy=True):
-    """Rearrange input plan into random new plan, maintaining activity sequence and trip durations."""
-    allowance = 24 * 60 * 60  # seconds
-    for leg in plan.legs:
-        allowance -= leg.duration.total_seconds()
-    n_activities = len(list(plan.activities))
-    activity_durations = [
-        timedelta(seconds=int(random.random() * allowance / n_activities))
-        for n in range(n_activities)
-    ]
+def random_mutate_activity_durations(
+    plan: Plan, copy=True, rng: Optional[np.random.Generator] = None
+):
+    """Rearrange input plan into random new plan, maintaining activity sequence and trip durations.
+
+    If given, random durations are drawn from `rng`, otherwise from the global numpy random state.
+    """
+    starts, ends = random_activity_times(plan, rng=rng)
     if copy:
         plan = deepcopy(plan)
-    time = plan.day[0].shift_duration(new_duration=activity_durations.pop(0))
-    idx = 1
-    for activity_duration, leg_duration in zip(
-        activity_durations, [leg.duration for leg in plan.legs]
-    ):
-        time = plan.day[idx].shift_duration(new_start_time=time, new_duration=leg_duration)
-        time = plan.day[idx + 1].shift_duration(new_start_time=time, new_duration=activity_duration)
-        idx += 2
-    plan.day[-1].end_time = END_OF_DAY
-    return plan
+    return set_plan_times(plan, starts, ends)
+
+
+def random_activity_times(
+    plan: Plan, rng: Optional[np.random.Generator] = None, size: Optional[int] = None
+) -> tuple[np.ndarray, np.ndarray]:
+    """Random new start and end times (in seconds) of each plan component, maintaining trip durations.
+
+    As used by `random_mutate_activity_durations`, without modifying or copying the plan.
+    Drawing `size` schedules at once gives the same schedules as drawing them one at a time.
+
+    Args:
+        plan (Plan): Input plan.
+        rng (Optional[np.random.Generator]): If given, random number generator to draw from. Defaults to None.
+        size (Optional[int]): If given, number of schedules to draw, returned as (size, n_components) arrays. Defaults to None.
+
+    Returns:
+        tuple[np.ndarray, np.ndarray]: start times and end times.
+    """
+    if rng is None:
+        rng = random
+    leg_durations = np.array([leg.duration.total_seconds() for leg in plan.day[1::2]])
+    allowance = 24 * 60 * 60 - leg_durations.sum()  # seconds
+    n_activities = len(leg_durations) + 1
+    draws = rng.random((1 if size is None else size, n_activities))
+    durations = np.zeros((len(draws), len(plan)))
+    durations[:, ::2] = (draws * allowance / n_activities).astype(int)
+    durations[:, 1::2] = leg_durations
+    start = (plan.day[0].start_time - START_OF_DAY).total_seconds()
+    times = np.cumsum(np.column_stack([np.full(len(draws), start), durations]), axis=1)
+    starts = times[:, :-1]
+    ends = times[:, 1:].copy()
+    ends[:, -1] = (END_OF_DAY - START_OF_DAY).total_seconds()
+    if size is None:
+        return starts[0], ends[0]
+    return starts, ends
 
 
 class Stopper:
@@ -1,10 +1,13 @@
 """Location and mode choice models for activity modelling."""
+
 import itertools
 import logging
+import operator
 from abc import ABC, abstractmethod
-from collections.abc import Callable
+from collections.abc import Callable, Iterable, Iterator
 from copy import deepcopy
 from dataclasses import dataclass
+from types import CodeType
 from typing import Literal, NamedTuple, Optional, Union
 
 import numpy as np
@@ -21,9 +24,13 @@ from pam.planner.utils_planner import (
     get_act_names,
     get_first_leg_time_ratio,
     get_trip_chains_either_anchor,
+    sample_mnl_gumbel,
     sample_weighted,
+    sample_weighted_rows,
 )
 from pam.planner.zones import Zones
+from pam.samplers.rng import RNGRegistry
+from pam.utils import map_chunks
 
 
 class ChoiceLabel(NamedTuple):
@@ -52,23 +59,49 @@ class ChoiceSet(NamedTuple):
 
 @dataclass
 class SelectionSet:
-    """Calculate probabilities and select alternative."""
+    """Calculate probabilities and select alternative.
+
+    MNL probabilities (`calculate_mnl_probabilities`) and weighted sampling (`sample_weighted`) are applied
+    to the whole choice set at once, other functions are applied to each row in turn.
+
+    Attributes:
+      choice_set (ChoiceSet): The choice set.
+      func_probabilities (Callable): The function for calculating the probability of each alternative.
+      func_sampling (Callable, optional): The function for sampling across alternatives. Defaults to None.
+      rng (np.random.Generator, optional):
+        If given, random number generator to sample with (for vectorised sampling functions),
+        otherwise the `random` module is used. Defaults to None.
+      gumbel (bool, optional):
+        If True, sample MNL selections directly from utilities using the Gumbel-max trick,
+        without calculating the probabilities matrix. Defaults to False.
+    """
 
     choice_set: ChoiceSet
     func_probabilities: Callable
     func_sampling: Optional[Callable] = None
+    rng: Optional[np.random.Generator] = None
+    gumbel: bool = False
     _selections = None
 
     @property
     def probabilities(self) -> np.array:
         """Probabilities for each alternative."""
+        if self.func_probabilities is calculate_mnl_probabilities:
+            return calculate_mnl_probabilities(self.choice_set.u_choices)
         return np.apply_along_axis(
             func1d=self.func_probabilities, axis=1, arr=self.choice_set.u_choices
         )
 
     def sample(self) -> list:
         """Sample from a set of alternative options."""
-        sampled = np.apply_along_axis(func1d=self.func_sampling, axis=1, arr=self.probabilities)
+        if self.gumbel:
+            if self.func_probabilities is not calculate_mnl_probabilities:
+                raise ValueError("Gumbel-max sampling is only valid for MNL probabilities")
+            sampled = sample_mnl_gumbel(self.choice_set.u_choices, rng=self.rng)
+        elif self.func_sampling is sample_weighted:
+            sampled = sample_weighted_rows(self.probabilities, rng=self.rng)
+        else:
+            sampled = np.apply_along_axis(func1d=self.func_sampling, axis=1, arr=self.probabilities)
         sampled_labels = [self.choice_set.choice_labels[x] for x in sampled]
         self._selections = sampled_labels
         return sampled_labels
@@ -95,12 +128,28 @@ class ChoiceConfiguration:
       scope (str, optional): The scope of the function (for example, work activities). Defaults to None.
       func_probabilities (Callable, optional): The function for calculating the probability of each alternative. Defaults to None.
       func_sampling (Callable, optional): The function for sampling across alternatives, ie softmax. Defaults to None.
+      dtype (type, optional): Data type of the utilities array, e.g. np.float32 to halve its memory. Defaults to np.float64.
+      seed (int, optional):
+        If given, seed number for reproducible selections, which are then sampled with a numpy random number generator.
+        Defaults to None.
+      gumbel (bool, optional):
+        If True, sample MNL selections directly from utilities (Gumbel-max trick), without calculating probabilities.
+        Defaults to False.
+      vectorise (bool, optional):
+        If True, evaluate the scope and utility expressions for chunks of activities at once.
+        Expressions must then be elementwise across activities, e.g. they must not reduce over OD data indexed by activity variables
+        (such as `od['time', act.location.area].max()`), as each row would then depend on the other activities in the chunk.
+        Defaults to False.
     """
 
     u: Optional[str] = None
     scope: Optional[str] = None
     func_probabilities: Optional[Callable] = None
     func_sampling: Optional[Callable] = None
+    dtype: type = np.float64
+    seed: Optional[int] = None
+    gumbel: bool = False
+    vectorise: bool = False
 
     def validate(self, vars: list[str]) -> None:
         """
@@ -160,10 +209,16 @@ class ChoiceModel:
         apply_mode: bool = True,
         once_per_agent: bool = True,
         apply_mode_to: Literal["chain", "previous_leg"] = "chain",
+        chunksize: Optional[int] = None,
     ) -> None:
         """Apply the choice model to the PAM population,
             updating the activity locations and mode choices in scope.
 
+        By default, the choice set of the whole population is calculated and sampled before it is applied.
+        For large populations and zone systems, use `chunksize` so that households are processed in batches,
+        each calculated, sampled and applied before the next, such that memory is proportional to the chunk size.
+        For a given seed, the selections are the same either way.
+
         Args:
           apply_location (bool, optional): Whether to update activities' location. Defaults to True.
           apply_mode (bool, optional): Whether to update travel modes. Defaults to True.
@@ -171,17 +226,25 @@ class ChoiceModel:
           apply_mode_to (Literal["chain", "previous_leg"]):
             Whether to apply the mode to the entire trip chain that contains the activity, or the leg preceding the activity.
             Defaults to "chain".
+          chunksize (Optional[int], optional):
+            If given, apply the model to batches of whole households with (at least) this many activities at a time.
+            Defaults to None.
 
         """
         self.logger.info("Applying choice model...")
         self.logger.info(f"Configuration: \n{self.configuration}")
 
+        if chunksize is None:
+            batches = [(self.selections.choice_set.idxs, self.selections.selections)]
+        else:
+            batches = self._chunked_selections(chunksize)
+
         pid = None
         destination = None
         trmode = None
 
         # update location and mode
-        for idx, selection in zip(self.selections.choice_set.idxs, self.selections.selections):
+        for idx, selection in (item for batch in batches for item in zip(*batch)):
             if not (once_per_agent and (pid == idx.pid)):
                 destination = selection.destination
                 trmode = selection.mode
@@ -202,41 +265,174 @@ class ChoiceModel:
 
         self.logger.info("Choice model application complete.")
 
-    def get_choice_set(self) -> ChoiceSet:
-        """Construct an agent's choice set for each activity/leg within scope."""
+    def get_choice_set(self, chunksize: int = 10000) -> ChoiceSet:
+        """Construct an agent's choice set for each activity/leg within scope.
+
+        The scope and utility expressions are compiled once.
+        If the `vectorise` option is configured, they are evaluated for chunks of activities at once,
+        with household, person and activity variables (e.g. `person.attributes['age']`) evaluated as arrays,
+        and OD data indexed by these arrays (e.g. `od['time', person.home.area]`).
+        Expressions that cannot be evaluated this way are evaluated for one activity at a time.
+
+        Args:
+            chunksize (int, optional): Number of activities to evaluate at once. Defaults to 10000.
+
+        Returns:
+            ChoiceSet:
+        """
+        activities = [
+            activity for _, hh in self.population for activity in self._household_activities(hh)
+        ]
+        return self._choice_set(activities, chunksize)
+
+    def _choice_set(self, activities: list[tuple], chunksize: int = 10000) -> ChoiceSet:
+        """Construct the choice set of activities within scope.
+
+        Args:
+            activities (list[tuple]): (hid, hh, pid, person, i, act) of each activity.
+            chunksize (int, optional): Number of activities to evaluate at once. Defaults to 10000.
+
+        Returns:
+            ChoiceSet:
+        """
         self.configuration.validate(["u", "scope"])
-        od = self.od
-        u = self.configuration.u
-        scope = self.configuration.scope
-        # zones might be defined in `u` and so be required on calling `eval(u)`
-        zones = self.zones  # noqa: F841
-
-        idxs = []
-        u_choices = []
-        choice_labels = list(itertools.product(od.labels.destination_zones, od.labels.mode))
+        u = compile(self.configuration.u, "<utility>", "eval")
+        scope = compile(self.configuration.scope, "<scope>", "eval")
+
+        choice_labels = list(
+            itertools.product(self.od.labels.destination_zones, self.od.labels.mode)
+        )
         choice_labels = [ChoiceLabel(*x) for x in choice_labels]
 
-        # iterate across activities
-        for hid, hh in self.population:
-            for pid, person in hh:
-                for i, act in enumerate(person.activities):
-                    if eval(scope):
-                        idx_act = ChoiceIdx(pid=pid, hid=hid, seq=i, act=act)
-                        # calculate utilities for each alternative
-                        u_act = eval(u)
-                        # flatten location-mode combinations
-                        u_act = u_act.flatten()
+        in_scope = np.zeros(len(activities), dtype=bool)
+        for start in range(0, len(activities), chunksize):
+            chunk = activities[start : start + chunksize]
+            in_scope[start : start + len(chunk)] = self._evaluate(scope, chunk).reshape(len(chunk))
+        activities = list(itertools.compress(activities, in_scope))
+        idxs = [
+            ChoiceIdx(pid=pid, hid=hid, seq=i, act=act) for hid, _, pid, _, i, act in activities
+        ]
+
+        # calculate utilities for each alternative, flattening location-mode combinations
+        u_choices = np.empty((len(activities), len(choice_labels)), dtype=self.configuration.dtype)
+        for start in range(0, len(activities), chunksize):
+            chunk = activities[start : start + chunksize]
+            u_chunk = self._evaluate(u, chunk).reshape(len(chunk), -1)
+            # check dimensions
+            assert u_chunk.shape[1] == len(choice_labels)
+            u_choices[start : start + len(chunk)] = u_chunk
 
-                        u_choices.append(u_act)
-                        idxs.append(idx_act)
+        return ChoiceSet(idxs=idxs, u_choices=u_choices, choice_labels=choice_labels)
 
-        u_choices = np.array(u_choices)
+    @staticmethod
+    def _household_activities(hh) -> list[tuple]:
+        """(hid, hh, pid, person, i, act) of each activity of a household."""
+        return [
+            (hh.hid, hh, pid, person, i, act)
+            for pid, person in hh
+            for i, act in enumerate(person.activities)
+        ]
+
+    def _chunked_selections(
+        self, chunksize: int
+    ) -> Iterator[tuple[list[ChoiceIdx], list[ChoiceLabel]]]:
+        """Calculate and sample the choice sets of batches of households, one batch at a time.
+
+        Batches are made of whole households, so that applying the selections of a batch
+        does not change the choice sets of the following batches.
+        A single random number generator is used across batches, so that selections are the same as for the whole population.
 
-        # check dimensions
-        assert u_choices.shape[1] == len(choice_labels)
-        assert u_choices.shape[0] == len(idxs)
+        Args:
+            chunksize (int): minimum number of activities in each batch (except the last).
 
-        return ChoiceSet(idxs=idxs, u_choices=u_choices, choice_labels=choice_labels)
+        Yields:
+            Iterator[tuple[list[ChoiceIdx], list[ChoiceLabel]]]: choice set indices and selections of each batch.
+        """
+        self.configuration.validate(["func_probabilities", "func_sampling"])
+        rng = self.rng
+        activities = []
+        for i, (_, hh) in enumerate(self.population):
+            activities.extend(self._household_activities(hh))
+            if len(activities) >= chunksize or i == len(self.population.households) - 1:
+                selection_set = SelectionSet(
+                    choice_set=self._choice_set(activities, chunksize),
+                    func_probabilities=self.configuration.func_probabilities,
+                    func_sampling=self.configuration.func_sampling,
+                    rng=rng,
+                    gumbel=self.configuration.gumbel,
+                )
+                yield selection_set.choice_set.idxs, selection_set.selections
+                activities = []
+
+    def _namespace(self, hid, hh, pid, person, i, act, od: Optional[OD] = None) -> dict:
+        """Variables available to scope and utility expressions."""
+        return {
+            "hid": hid,
+            "hh": hh,
+            "pid": pid,
+            "person": person,
+            "i": i,
+            "act": act,
+            "od": self.od if od is None else od,
+            "zones": self.zones,
+            "self": self,
+        }
+
+    def _evaluate(self, expression: CodeType, chunk: list[tuple]) -> np.ndarray:
+        """Evaluate a compiled expression for a chunk of activities, vectorised if configured and possible.
+
+        Vectorised values are checked against the expression evaluated for the first and last activities of the chunk.
+
+        Args:
+            expression (CodeType): compiled scope or utility expression.
+            chunk (list[tuple]): (hid, hh, pid, person, i, act) of each activity.
+
+        Returns:
+            np.ndarray: expression value of each activity, stacked along the first dimension.
+        """
+        first = np.asarray(eval(expression, globals(), self._namespace(*chunk[0])))
+        if self.configuration.vectorise and len(chunk) > 1:
+            values = self._evaluate_columns(expression, chunk, first.shape)
+            if values is not None:
+                last = np.asarray(eval(expression, globals(), self._namespace(*chunk[-1])))
+                if np.allclose(values[0], first, equal_nan=True) and np.allclose(
+                    values[-1], last, equal_nan=True
+                ):
+                    return values
+                self.logger.warning(
+                    "Vectorised expression does not match the expression evaluated for a single activity, "
+                    "evaluating for one activity at a time."
+                )
+        return np.array(
+            [first]
+            + [
+                np.asarray(eval(expression, globals(), self._namespace(*item)))
+                for item in chunk[1:]
+            ]
+        )
+
+    def _evaluate_columns(
+        self, expression: CodeType, chunk: list[tuple], shape: tuple
+    ) -> Optional[np.ndarray]:
+        """Evaluate a compiled expression for columns of activity variables, or None if it cannot be vectorised."""
+        columns = [_Column(values, ndim=len(shape)) for values in zip(*chunk)]
+        try:
+            values = eval(expression, globals(), self._namespace(*columns, od=_ColumnOD(self.od)))
+        except _ColumnError as error:
+            self.logger.debug(f"Evaluating expression for one activity at a time: {error}")
+            return None
+        try:
+            return np.broadcast_to(np.asarray(values), (len(chunk), *shape))
+        except ValueError as error:
+            self.logger.debug(f"Evaluating expression for one activity at a time: {error}")
+            return None
+
+    @property
+    def rng(self) -> Optional[np.random.Generator]:
+        """Random number generator for sampling selections, if seeded or sampling with the Gumbel-max trick."""
+        if self.configuration.seed is None and not self.configuration.gumbel:
+            return None
+        return RNGRegistry(self.configuration.seed).stream("choice")
 
     @property
     def selections(self) -> SelectionSet:
@@ -246,10 +442,125 @@ class ChoiceModel:
                 choice_set=self.get_choice_set(),
                 func_probabilities=self.configuration.func_probabilities,
                 func_sampling=self.configuration.func_sampling,
+                rng=self.rng,
+                gumbel=self.configuration.gumbel,
             )
         return self._selections
 
 
+class _ColumnError(TypeError):
+    """A column of activity variables cannot be used as an expression requires."""
+
+
+class _Column:
+    """Values of a household, person or activity variable for a chunk of activities.
+
+    Attribute access, indexing and calls are applied to each value. Operators, and numpy functions,
+    are applied to the values as an array, shaped to broadcast along the first dimension of an expression's value.
+    """
+
+    __array_priority__ = 1000
+    __hash__ = None
+
+    def __init__(self, values: Iterable, ndim: int = 0) -> None:
+        self._values = list(values)
+        self._ndim = ndim
+
+    def _map(self, func: Callable) -> "_Column":
+        return _Column([func(value) for value in self._values], self._ndim)
+
+    def __getattr__(self, name: str) -> "_Column":
+        if name.startswith("__"):
+            raise AttributeError(name)
+        return self._map(lambda value: getattr(value, name))
+
+    def __getitem__(self, key) -> "_Column":
+        return self._map(lambda value: value[key])
+
+    def __call__(self, *args, **kwargs) -> "_Column":
+        if any(isinstance(arg, _Column) for arg in (*args, *kwargs.values())):
+            raise _ColumnError("Column arguments are not supported")
+        return self._map(lambda value: value(*args, **kwargs))
+
+    def __iter__(self):
+        raise _ColumnError("Columns are not iterable")
+
+    def __bool__(self):
+        raise _ColumnError("The truth value of a column is ambiguous")
+
+    def __float__(self):
+        raise _ColumnError("Columns cannot be converted to scalars or sized")
+
+    __int__ = __index__ = __len__ = __float__
+
+    def __array__(self, dtype=None) -> np.ndarray:
+        array = np.array(self._values, dtype=dtype)
+        if array.ndim != 1:
+            raise _ColumnError("Column values must be scalars")
+        return array.reshape(-1, *[1] * self._ndim)
+
+
+def _column_operator(op: Callable, reflected: bool = False) -> Callable:
+    def method(self, other=None):
+        try:
+            if other is None:
+                return op(np.asarray(self))
+            if isinstance(other, _Column):
+                other = np.asarray(other)
+            if reflected:
+                return op(other, np.asarray(self))
+            return op(np.asarray(self), other)
+        except ValueError as error:
+            # values of the chunk do not broadcast with the other operand
+            raise _ColumnError(str(error)) from error
+
+    return method
+
+
+for _name in ["add", "sub", "mul", "truediv", "floordiv", "mod", "pow", "and", "or", "xor"]:
+    _op = getattr(operator, _name, None) or getattr(operator, f"{_name}_")
+    setattr(_Column, f"__{_name}__", _column_operator(_op))
+    setattr(_Column, f"__r{_name}__", _column_operator(_op, reflected=True))
+for _name in ["eq", "ne", "lt", "le", "gt", "ge"]:
+    setattr(_Column, f"__{_name}__", _column_operator(getattr(operator, _name)))
+for _name in ["neg", "pos", "abs", "invert"]:
+    setattr(_Column, f"__{_name}__", _column_operator(getattr(operator, _name)))
+
+
+class _ColumnOD:
+    """OD data, indexed by labels or by columns of labels (one per activity)."""
+
+    def __init__(self, od: OD) -> None:
+        self.od = od
+        self.label_idxs = od.label_idxs
+
+    def __getattr__(self, name: str):
+        return getattr(self.od, name)
+
+    def __getitem__(self, args) -> np.ndarray:
+        _args = args if isinstance(args, tuple) else tuple([args])
+        if not any(isinstance(arg, _Column) for arg in _args):
+            return self.od[args]
+
+        _args_encoded = tuple()
+        for i, arg in enumerate(_args):
+            if isinstance(arg, _Column):
+                _args_encoded += (np.array([self.label_idxs[i][v] for v in arg._values]),)
+            elif arg == slice(None) or isinstance(arg, int):
+                _args_encoded += (arg,)
+            elif arg in self.label_idxs[i]:
+                _args_encoded += (self.label_idxs[i][arg],)
+            else:
+                raise _ColumnError(f"Invalid slice value {arg}")
+        values = self.od.data[_args_encoded]
+
+        # move the activities dimension first, numpy places it first unless advanced indices are adjacent
+        advanced = [i for i, arg in enumerate(_args_encoded) if not isinstance(arg, slice)]
+        if advanced == list(range(advanced[0], advanced[-1] + 1)):
+            values = np.moveaxis(values, advanced[0], 0)
+        return values
+
+
 class ChoiceMNL(ChoiceModel):
     """Applies a Multinomial Logit Choice model."""
 
@@ -494,3 +805,213 @@ class DiscretionaryTripOD(DiscretionaryTrip):
         area = self._od.labels.destination_zones[zone]
 
         return area
+
+
+class _Chain(NamedTuple):
+    """Location choice inputs of a trip chain with discretionary activities."""
+
+    anchor_zone_start: str
+    anchor_zone_end: str
+    # for each discretionary activity in turn
+    round_trips: list[bool]
+    trmodes: list[str]
+    observed_leg_ratios: list[float]
+
+
+class BatchDiscretionaryTrips:
+    def __init__(
+        self,
+        population: Union[Population, Iterable[Plan]],
+        od: OD,
+        max_diversion_factor: float = 2.1,
+    ) -> None:
+        """Solve discretionary trip location choice of a whole population at once.
+
+        Equivalent to applying `DiscretionaryTrips` to each plan, but trip chains are extracted from all plans first,
+        and then solved one discretionary activity at a time across all chains.
+        Chains sharing the same anchors and mode are grouped,
+        such that destination probabilities are calculated once per group and all of the group's locations are sampled at once.
+
+        Example:
+            ```python
+            BatchDiscretionaryTrips(population, od).update_plans(seed=0, workers=4)
+            ```
+
+        Args:
+            population (Union[Population, Iterable[Plan]]): PAM population, or any iterable of PAM plans.
+            od (OD): An object holding origin-destination matrices.
+            max_diversion_factor (float, optional): maximum diversion factor, compared to a direct trip between anchors. Defaults to 2.1.
+        """
+        if isinstance(population, Population):
+            population = [person.plan for _, _, person in population.people()]
+        self._plans = list(population)
+        self._od = od
+        self.max_diversion_factor = max_diversion_factor
+
+    def update_plans(
+        self, seed: Optional[int] = None, workers: int = 1, chunksize: int = 10000
+    ) -> None:
+        """Update the locations (in-place) of each non-mandatory activity location in the population.
+
+        Trip chains are solved in chunks, each with its own random stream, so that results for a given seed
+        do not depend on the number of workers.
+
+        Args:
+            seed (Optional[int], optional): If given, seed number for reproducible results. Defaults to None.
+            workers (int, optional): number of processes to solve chunks of trip chains in. Defaults to 1.
+            chunksize (int, optional): number of trip chains in each chunk. Defaults to 10000.
+        """
+        trip_chains = []
+        chains = []
+        for plan in self._plans:
+            for trip_chain in get_trip_chains_either_anchor(plan):
+                # if only one achor, convert to round-trip
+                convert_single_anchor_roundtrip(trip_chain)
+                chain = self.parse_chain(trip_chain)
+                if chain.observed_leg_ratios:
+                    trip_chains.append(trip_chain)
+                    chains.append(chain)
+
+        if seed is None:
+            seed = np.random.SeedSequence().entropy
+        chunks = [
+            (i, chains[start : start + chunksize])
+            for i, start in enumerate(range(0, len(chains), chunksize))
+        ]
+        if workers == 1:
+            solver = self
+        else:
+            # workers only need the OD data, not the plans
+            solver = BatchDiscretionaryTrips([], self._od, self.max_diversion_factor)
+        work = {"solver": solver, "seed": seed}
+        results = map_chunks(chunks, _solve_discretionary_chunk, work, workers)
+        areas = [chain_areas for _, result in results for chain_areas in result]
+
+        for trip_chain, chain_areas in zip(trip_chains, areas):
+            for i, area in enumerate(chain_areas):
+                trip_chain[2 * i + 2].location.area = area
+                trip_chain[2 * i + 1].end_location.area = area
+                trip_chain[2 * i + 3].start_location.area = area
+
+    @staticmethod
+    def parse_chain(trip_chain: list[Union[Activity, Leg]]) -> _Chain:
+        """Get the location choice inputs of a trip chain.
+
+        Args:
+            trip_chain (list[Union[Activity, Leg]]): A trip chain between two long-term activities.
+
+        Returns:
+            _Chain:
+        """
+        act_names = get_act_names(trip_chain)
+        stages = range(len(act_names) - 2)
+        return _Chain(
+            anchor_zone_start=trip_chain[0].location.area,
+            anchor_zone_end=trip_chain[-1].location.area,
+            # as per `DiscretionaryTrip.update_plan`, each stage is solved as a round trip (or not)
+            # depending on the first activity of the previous stage's chain
+            round_trips=[act_names[max(i - 1, 0)] == act_names[-1] for i in stages],
+            # and with the mode of its own first leg
+            trmodes=[trip_chain[2 * i + 1].mode for i in stages],
+            observed_leg_ratios=[get_first_leg_time_ratio(trip_chain[2 * i :]) for i in stages],
+        )
+
+    def solve(
+        self, chains: list[_Chain], rng: Optional[np.random.Generator] = None
+    ) -> list[list[str]]:
+        """Select the location of each discretionary activity of each trip chain.
+
+        Args:
+            chains (list[_Chain]): trip chains.
+            rng (Optional[np.random.Generator], optional): If given, random number generator to draw from, otherwise the `random` module is used. Defaults to None.
+
+        Returns:
+            list[list[str]]: selected zone of each discretionary activity of each trip chain.
+        """
+        areas = [[] for _ in chains]
+        starts = [chain.anchor_zone_start for chain in chains]
+        cache = {}
+        for stage in range(max((len(chain.observed_leg_ratios) for chain in chains), default=0)):
+            groups = {}
+            for i, chain in enumerate(chains):
+                if stage < len(chain.observed_leg_ratios):
+                    end = None if chain.round_trips[stage] else chain.anchor_zone_end
+                    groups.setdefault((starts[i], end, chain.trmodes[stage]), []).append(i)
+
+            for key, idxs in groups.items():
+                if key not in cache:
+                    cache[key] = self.destination_factors(*key)
+                if key[1] is None:
+                    probs = np.broadcast_to(cache[key], (len(idxs), len(cache[key])))
+                else:
+                    leg_ratios, p = cache[key]
+                    observed = np.array([chains[i].observed_leg_ratios[stage] for i in idxs])
+                    probs = self.pdf_leg_ratios(leg_ratios, observed) * p
+                zones = sample_weighted_rows(probs, rng)
+                for i, zone in zip(idxs, zones):
+                    starts[i] = self._od.labels.destination_zones[zone]
+                    areas[i].append(starts[i])
+
+        return areas
+
+    def destination_factors(
+        self, anchor_zone_start: str, anchor_zone_end: Optional[str], trmode: str
+    ) -> Union[np.ndarray, tuple[np.ndarray, np.ndarray]]:
+        """Destination probability factors shared by all trip chains with the same anchors and mode.
+
+        Args:
+            anchor_zone_start (str): start anchor zone.
+            anchor_zone_end (Optional[str]): end anchor zone, or None for round trips.
+            trmode (str): travel mode.
+
+        Returns:
+            Union[np.ndarray, tuple[np.ndarray, np.ndarray]]:
+                For round trips, the attraction probabilities.
+                Otherwise, the leg ratios and the product of the diversion and attraction probabilities.
+        """
+        attraction_p = self._od["od_probs", anchor_zone_start, :, trmode]
+        attraction_p = attraction_p / attraction_p.sum()
+        if anchor_zone_end is None:
+            return attraction_p
+
+        imp_first_leg = self._od["time", anchor_zone_start, :, trmode]
+        imp_second_leg = self._od["time", :, anchor_zone_end, trmode]
+        imp_direct = self._od["time", anchor_zone_start, anchor_zone_end, trmode]
+        leg_ratios = imp_first_leg / (imp_first_leg + imp_second_leg)
+        diversion_p = DiscretionaryTripOD.pdf_leg_diversion(
+            (imp_first_leg + imp_second_leg) / imp_direct,
+            max_diversion_factor=self.max_diversion_factor,
+        )
+        return leg_ratios, diversion_p * attraction_p
+
+    @staticmethod
+    def pdf_leg_ratios(leg_ratios: np.ndarray, observed_ratios: np.ndarray) -> np.ndarray:
+        """Vectorised `DiscretionaryTripOD.pdf_leg_ratio`, for a number of observed ratios.
+
+        Args:
+            leg_ratios (np.ndarray): (k,) leg ratio of each candidate destination.
+            observed_ratios (np.ndarray): (n,) observed leg ratio of each trip chain.
+
+        Returns:
+            np.ndarray: (n, k) leg ratio probabilities.
+        """
+        leg_ratios = leg_ratios[np.newaxis, :]
+        observed_ratios = observed_ratios[:, np.newaxis]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            p = np.where(
+                leg_ratios < observed_ratios,
+                leg_ratios / observed_ratios,
+                (1 - leg_ratios) / (1 - observed_ratios),
+            )
+        p = np.where(leg_ratios == observed_ratios, 1, p)
+        return np.where((leg_ratios < 0) | (leg_ratios >= 1), 0, p)
+
+    def _solve_chunk(self, chunk: tuple, seed: int) -> list[list[str]]:
+        i, chains = chunk
+        return self.solve(chains, RNGRegistry(seed).stream("discretionary_trips", i))
+
+
+def _solve_discretionary_chunk(
+    chunk: tuple, solver: BatchDiscretionaryTrips, seed: int
+) -> list[list[str]]:
+    return solver._solve_chunk(chunk, seed)
@@ -1,9 +1,10 @@
 from __future__ import annotations
 
 import itertools
+from collections.abc import Iterable
 from functools import lru_cache, partial
-from multiprocessing import Pool
-from typing import TYPE_CHECKING, Literal, Optional
+from multiprocessing import Pool, shared_memory
+from typing import TYPE_CHECKING, Literal, Optional, Union
 
 if TYPE_CHECKING:
     from pam.core import Population
@@ -11,11 +12,13 @@ if TYPE_CHECKING:
 import numpy as np
 import pandas as pd
 from Levenshtein import ratio
+from scipy.spatial.distance import squareform
 from sklearn.cluster import AgglomerativeClustering, SpectralClustering
 
 from pam.activity import Plan
 from pam.planner.encoder import PlansCharacterEncoder
 from pam.plot.plans import plot_activity_breakdown_area, plot_activity_breakdown_area_tiles
+from pam.samplers.rng import RNGRegistry
 
 
 def _levenshtein_distance(a: str, b: str) -> float:
@@ -38,17 +41,203 @@ def calc_levenshtein_matrix(x: list[str], y: list[str], n_cores=1) -> np.array:
     return distances
 
 
+def condensed_index(n: int, i: int, j: int) -> int:
+    """Index of the distance between items i and j (i < j) of n items in a condensed distance matrix."""
+    return n * i - i * (i + 1) // 2 + (j - i - 1)
+
+
+def calc_levenshtein_condensed(
+    x: list[str], n_cores: int = 1, dtype: Union[type, np.dtype] = np.float32
+) -> np.ndarray:
+    """Create a condensed levenshtein distance matrix (the upper triangle, as in `scipy.spatial.distance.squareform`).
+
+    With multiple cores, workers write their rows directly into a shared memory array.
+
+    Args:
+        x (list[str]): strings.
+        n_cores (int, optional): number of processes to use. Defaults to 1.
+        dtype (Union[type, np.dtype], optional): data type of the distances. Defaults to np.float32.
+
+    Returns:
+        np.ndarray: (n * (n - 1) / 2,) distances.
+    """
+    n = len(x)
+    size = n * (n - 1) // 2
+    if n_cores == 1:
+        distances = np.empty(size, dtype=dtype)
+        _fill_levenshtein_rows(x, range(n), distances)
+        return distances
+
+    shm = shared_memory.SharedMemory(create=True, size=max(size * np.dtype(dtype).itemsize, 1))
+    try:
+        # interleave rows, as earlier rows are longer
+        n_chunks = min(n, n_cores * 4)
+        chunks = [range(i, n, n_chunks) for i in range(n_chunks)]
+        with Pool(
+            n_cores, initializer=_init_levenshtein_worker, initargs=(x, shm.name, size, dtype)
+        ) as p:
+            for _ in p.imap_unordered(_levenshtein_worker, chunks):
+                pass
+        distances = np.ndarray(size, dtype=dtype, buffer=shm.buf).copy()
+    finally:
+        shm.close()
+        shm.unlink()
+
+    return distances
+
+
+def _fill_levenshtein_rows(x: list[str], rows: Iterable[int], distances: np.ndarray) -> None:
+    n = len(x)
+    for i in rows:
+        start = condensed_index(n, i, i + 1)
+        distances[start : start + n - i - 1] = [_levenshtein_distance(x[i], y) for y in x[i + 1 :]]
+
+
+_LEVENSHTEIN_WORKER = {}
+
+
+def _init_levenshtein_worker(x: list[str], shm_name: str, size: int, dtype: np.dtype) -> None:
+    shm = shared_memory.SharedMemory(name=shm_name)
+    _LEVENSHTEIN_WORKER["x"] = x
+    _LEVENSHTEIN_WORKER["shm"] = shm
+    _LEVENSHTEIN_WORKER["distances"] = np.ndarray(size, dtype=dtype, buffer=shm.buf)
+
+
+def _levenshtein_worker(rows: range) -> None:
+    _fill_levenshtein_rows(_LEVENSHTEIN_WORKER["x"], rows, _LEVENSHTEIN_WORKER["distances"])
+
+
+def weighted_kmedoids(
+    distances: np.ndarray, n_clusters: int, sample_weight: np.ndarray, max_iter: int = 100
+) -> np.ndarray:
+    """Weighted k-medoids clustering, initialised greedily (as PAM BUILD) and refined by alternating assignment and medoid updates.
+
+    Args:
+        distances (np.ndarray): (n, n) distance matrix.
+        n_clusters (int): number of clusters.
+        sample_weight (np.ndarray): (n,) weight of each item.
+        max_iter (int, optional): maximum number of refinement iterations. Defaults to 100.
+
+    Returns:
+        np.ndarray: (n_clusters,) indices of the medoids.
+    """
+    # greedy initialisation, each new medoid minimising the total weighted distance to the nearest medoid
+    nearest = np.full(len(distances), np.inf)
+    medoids = []
+    for _ in range(n_clusters):
+        costs = (np.minimum(nearest, distances) * sample_weight).sum(axis=1)
+        costs[medoids] = np.inf
+        medoids.append(int(np.argmin(costs)))
+        nearest = np.minimum(nearest, distances[medoids[-1]])
+
+    medoids = np.array(medoids)
+    for _ in range(max_iter):
+        labels = np.argmin(distances[:, medoids], axis=1)
+        labels[medoids] = np.arange(n_clusters)
+        new_medoids = medoids.copy()
+        for cluster in range(n_clusters):
+            members = np.flatnonzero(labels == cluster)
+            costs = (distances[np.ix_(members, members)] * sample_weight[members]).sum(axis=1)
+            new_medoids[cluster] = members[np.argmin(costs)]
+        if (new_medoids == medoids).all():
+            break
+        medoids = new_medoids
+
+    return medoids
+
+
+class CLARA:
+    def __init__(
+        self,
+        n_clusters: int,
+        n_samples: int = 5,
+        sample_size: Optional[int] = None,
+        max_iter: int = 100,
+        seed: Optional[int] = None,
+        n_cores: int = 1,
+    ) -> None:
+        """Clustering Large Applications (CLARA) k-medoids clustering of strings, by levenshtein distance.
+
+        Weighted k-medoids is fitted to random samples of the strings,
+        and all strings are then assigned to their nearest medoid, keeping the medoids of the sample with the lowest total cost.
+        Memory is linear in the number of strings, as only the distances within a sample and to the medoids are calculated.
+
+        Args:
+            n_clusters (int): number of clusters.
+            n_samples (int, optional): number of samples to fit. Defaults to 5.
+            sample_size (Optional[int], optional): size of each sample. Defaults to None (40 + 2 * n_clusters).
+            max_iter (int, optional): maximum number of k-medoids iterations per sample. Defaults to 100.
+            seed (Optional[int], optional): If given, seed number for reproducible results. Defaults to None.
+            n_cores (int, optional): number of processes to use for distance calculations. Defaults to 1.
+        """
+        self.n_clusters = n_clusters
+        self.n_samples = n_samples
+        self.sample_size = sample_size
+        self.max_iter = max_iter
+        self.seed = seed
+        self.n_cores = n_cores
+
+    def fit(self, x: list[str], sample_weight: Optional[np.ndarray] = None) -> CLARA:
+        """Fit the model, setting the `medoid_indices_`, `labels_` and `inertia_` (total weighted distance to the medoids) attributes.
+
+        Args:
+            x (list[str]): strings to cluster.
+            sample_weight (Optional[np.ndarray], optional): weight of each string, e.g. its number of duplicates. Defaults to None.
+
+        Returns:
+            CLARA: fitted model.
+        """
+        n = len(x)
+        if self.n_clusters > n:
+            raise ValueError(f"Cannot fit {self.n_clusters} clusters to {n} samples")
+        sample_weight = np.ones(n) if sample_weight is None else np.asarray(sample_weight, float)
+        sample_size = min(n, self.sample_size or 40 + 2 * self.n_clusters)
+        rng = RNGRegistry(self.seed).stream("clara")
+
+        self.inertia_ = np.inf
+        for _ in range(self.n_samples if sample_size < n else 1):
+            sample = np.sort(rng.choice(n, size=sample_size, replace=False))
+            sample_x = [x[i] for i in sample]
+            sample_distances = squareform(
+                calc_levenshtein_condensed(sample_x, n_cores=self.n_cores)
+            )
+            medoids = sample[
+                weighted_kmedoids(
+                    sample_distances, self.n_clusters, sample_weight[sample], self.max_iter
+                )
+            ]
+
+            # assign all strings to their nearest medoid
+            distances = calc_levenshtein_matrix(x, [x[i] for i in medoids], n_cores=self.n_cores)
+            labels = np.argmin(distances, axis=1)
+            labels[medoids] = np.arange(self.n_clusters)
+            inertia = (distances[np.arange(n), labels] * sample_weight).sum()
+            if inertia < self.inertia_:
+                self.inertia_ = inertia
+                self.medoid_indices_ = medoids
+                self.labels_ = labels
+
+        return self
+
+
 class PlanClusters:
     """Groups activity plans into clusters.
     Plan similarity is defined using the edit distance
         of character-encoded plan sequences.
+    Optionally (`deduplicate=True`), identical encoded plans are deduplicated, such that only unique plans are compared and clustered,
+        and the number of plans of each unique plan is kept as its sample weight.
+        `distances` and `distances_no_diagonal` then index unique plans, rather than plans.
+        Only "clara" clustering uses the sample weights: agglomerative and spectral clustering are fitted on unweighted unique plans,
+        which gives the same clusters as without deduplication for single and complete linkage only.
     """
 
-    def __init__(self, population: Population, n_cores: int = 1) -> None:
+    def __init__(self, population: Population, n_cores: int = 1, deduplicate: bool = False) -> None:
         self.population = population
         self.plans = list(population.plans())
         self.n_cores = n_cores
+        self.deduplicate = deduplicate
         self._distances = None
+        self._condensed_distances = None
         self.model = None
 
         # encodings
@@ -60,13 +249,45 @@ class PlanClusters:
     def plans_encoded(self) -> list[str]:
         return self.plans_encoder.encode(self.plans)
 
+    @property
+    @lru_cache()
+    def _unique(self) -> tuple[list[str], np.ndarray, np.ndarray]:
+        if not self.deduplicate:
+            n = len(self.plans_encoded)
+            return list(self.plans_encoded), np.arange(n), np.ones(n, dtype=int)
+        codes = {}
+        inverse = np.array([codes.setdefault(x, len(codes)) for x in self.plans_encoded], dtype=int)
+        return list(codes), inverse, np.bincount(inverse, minlength=len(codes))
+
+    @property
+    def plans_unique_encoded(self) -> list[str]:
+        """Unique encoded plans, in order of first appearance (all encoded plans, if not deduplicated)."""
+        return self._unique[0]
+
+    @property
+    def plans_inverse(self) -> np.ndarray:
+        """Index of the unique encoded plan of each plan."""
+        return self._unique[1]
+
+    @property
+    def sample_weights(self) -> np.ndarray:
+        """Number of plans of each unique encoded plan."""
+        return self._unique[2]
+
+    @property
+    def condensed_distances(self) -> np.ndarray:
+        """Levenshtein distances between activity plans (unique plans, if deduplicated), as a condensed float32 matrix."""
+        if self._condensed_distances is None:
+            self._condensed_distances = calc_levenshtein_condensed(
+                self.plans_unique_encoded, n_cores=self.n_cores
+            )
+        return self._condensed_distances
+
     @property
     def distances(self) -> np.array:
-        """Levenshtein distances between activity plans."""
+        """Levenshtein distances between activity plans (unique plans, if deduplicated)."""
         if self._distances is None:
-            self._distances = calc_levenshtein_matrix(
-                self.plans_encoded, self.plans_encoded, n_cores=self.n_cores
-            )
+            self._distances = squareform(self.condensed_distances)
         return self._distances
 
     @property
@@ -75,21 +296,35 @@ class PlanClusters:
         np.fill_diagonal(dist, 1)
         return dist
 
+    @property
+    def labels(self) -> np.ndarray:
+        """Cluster of each plan."""
+        return np.asarray(self.model.labels_)[self.plans_inverse]
+
     def fit(
         self,
         n_clusters: int,
-        clustering_method: Literal["agglomerative", "spectral"] = "agglomerative",
+        clustering_method: Literal["agglomerative", "spectral", "clara"] = "agglomerative",
         linkage: Optional[str] = "complete",
+        seed: Optional[int] = None,
     ) -> None:
         """Fit an agglomerative clustering model.
 
+        Agglomerative and spectral clustering require the full matrix of distances between (unique) plans,
+        and ignore the sample weights of deduplicated plans.
+        For large populations, use "clara" (k-medoids on samples of plans), with memory linear in the number of plans.
+
         Args:
           n_clusters (int): The number of clusters to use.
-          clustering_method (Literal['agglomerative', 'spectral']): The clustering method to use. Defaults to "agglomerative".
+          clustering_method (Literal['agglomerative', 'spectral', 'clara']): The clustering method to use. Defaults to "agglomerative".
           linkage (str, optional): Linkage criterion. Defaults to "complete".
+          seed (Optional[int], optional): If given, seed number for reproducible "clara" results. Defaults to None.
 
         """
-        if clustering_method == "agglomerative":
+        if clustering_method == "clara":
+            model = CLARA(n_clusters=n_clusters, seed=seed, n_cores=self.n_cores)
+            model.fit(self.plans_unique_encoded, sample_weight=self.sample_weights)
+        elif clustering_method == "agglomerative":
             model = AgglomerativeClustering(
                 n_clusters=n_clusters, linkage=linkage, metric="precomputed"
             )
@@ -99,15 +334,45 @@ class PlanClusters:
             model.fit((1 - self.distances))
         else:
             raise ValueError(
-                "Please select a valid clustering_method ('agglomerative' or 'spectral')"
+                "Please select a valid clustering_method ('agglomerative', 'spectral' or 'clara')"
             )
 
         self.model = model
 
+    @property
+    @lru_cache()
+    def _plans_index(self) -> dict[int, int]:
+        return {id(plan): i for i, plan in enumerate(self.plans)}
+
+    @property
+    @lru_cache()
+    def _unique_members(self) -> list[np.ndarray]:
+        order = np.argsort(self.plans_inverse, kind="stable")
+        return np.split(order, np.cumsum(self.sample_weights)[:-1])
+
     def get_closest_matches(self, plan, n) -> list[Plan]:
-        """Get the n closest matches of a PAM activity schedule."""
-        idx = self.plans.index(plan)
-        idx_closest = np.argsort(self.distances_no_diagonal[idx])[:n]
+        """Get the n closest matches of a PAM activity schedule.
+
+        Only the distances from the plan to unique plans are used (calculated if the distance matrix has not been),
+        and only the closest unique plans are sorted.
+        """
+        idx = self._plans_index.get(id(plan))
+        if idx is None:
+            idx = self.plans.index(plan)
+        u = self.plans_inverse[idx]
+        if self._distances is not None:
+            dist = self._distances[u]
+        else:
+            plan_encoded = self.plans_unique_encoded[u]
+            dist = np.array(
+                [_levenshtein_distance(plan_encoded, x) for x in self.plans_unique_encoded]
+            )
+
+        # each unique plan includes at least one plan other than this one, except its own
+        k = min(n + 1, len(dist))
+        candidates = np.argpartition(dist, k - 1)[:k]
+        candidates = candidates[np.argsort(dist[candidates], kind="stable")]
+        idx_closest = [x for c in candidates for x in self._unique_members[c] if x != idx][:n]
         return [self.plans[x] for x in idx_closest]
 
     def get_cluster_plans(self, cluster: int) -> list:
@@ -116,11 +381,11 @@ class PlanClusters:
         Args:
             cluster (int): The cluster index.
         """
-        return list(itertools.compress(self.plans, self.model.labels_ == cluster))
+        return list(itertools.compress(self.plans, self.labels == cluster))
 
     def get_cluster_sizes(self) -> pd.Series:
         """Get the number of plans in each cluster."""
-        return pd.Series(self.model.labels_).value_counts()
+        return pd.Series(self.labels).value_counts()
 
     def get_cluster_membership(self) -> dict:
         """Get the cluster membership of each person in the population.
@@ -128,7 +393,7 @@ class PlanClusters:
             and the values are the correponding agents' clusters.
         """
         ids = [(hid, pid) for hid, pid, person in self.population.people()]
-        return dict(zip(ids, self.model.labels_))
+        return dict(zip(ids, self.labels))
 
     def plot_plan_breakdowns(
         self, ax=None, cluster=None, activity_classes: Optional[list[str]] = None, **kwargs
@@ -153,7 +418,7 @@ class PlanClusters:
         for the clusters with the top n number of plans.
         """
         if n is None:
-            n = len(set(self.model.labels_))
+            n = len(set(self.labels))
 
         clusters = self.get_cluster_sizes().head(n).index
         plans = {cluster: self.get_cluster_plans(cluster) for cluster in clusters}
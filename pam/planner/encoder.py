@@ -109,12 +109,10 @@ class PlanCharacterEncoder(PlanEncoder):
 
     def encode(self, plan: Plan) -> np.array:
         """Convert a pam plan to a character sequence."""
-        encoded = ""
-        for act in plan.day:
-            duration = int(act.duration / td(minutes=1))
-            encoded = encoded + (self.activity_encoder.encode(act.act) * duration)
-
-        return encoded
+        return "".join(
+            self.activity_encoder.encode(act.act) * int(act.duration / td(minutes=1))
+            for act in plan.day
+        )
 
     @staticmethod
     def get_seq(x):
@@ -144,6 +142,110 @@ class PlanOneHotEncoder(PlanEncoder):
         return x.argmax(axis=0)
 
 
+class PlanRunLengthEncoder(PlanEncoder):
+    """Encode a PAM plan as runs of activities (from the start of the day, as `PlanOneHotEncoder`),
+    in a 2D numpy integer array with a row for every activity/leg
+    and columns for the activity code, start minute and duration (minutes).
+    Consecutive runs of the same activity are merged, and zero-duration runs are dropped.
+    """
+
+    activity_encoder_class = StringIntEncoder
+
+    def encode(self, plan: Plan) -> np.array:
+        """Encode a PAM plan into a (runs, 3) array of activity codes, start minutes and durations."""
+        codes = np.array([self.activity_encoder.encode(act.act) for act in plan.day], dtype=int)
+        ends = np.array(
+            [int((act.end_time - START_OF_DAY) / td(minutes=1)) for act in plan.day], dtype=int
+        )
+        starts = np.concatenate([[0], ends[:-1]])
+        keep = ends > starts
+        codes, starts, ends = codes[keep], starts[keep], ends[keep]
+
+        # merge consecutive runs of the same activity
+        new_run = np.ones(len(codes), dtype=bool)
+        new_run[1:] = codes[1:] != codes[:-1]
+        last = np.append(new_run[1:], True)
+        return np.stack(
+            [codes[new_run], starts[new_run], ends[last] - starts[new_run]], axis=1
+        ).reshape(-1, 3)
+
+    def decode(self, encoded_plan: np.array) -> Plan:
+        """Decode a run-length encoded plan to a new PAM plan."""
+        plan = activity.Plan()
+        for seq, (code, start, duration) in enumerate(encoded_plan):
+            self.add_plan_component(
+                plan=plan,
+                seq=seq,
+                act=self.activity_encoder.decode(int(code)),
+                start_time=START_OF_DAY + td(minutes=int(start)),
+                duration=td(minutes=int(duration)),
+            )
+
+        return plan
+
+    @staticmethod
+    def get_seq(x):
+        return np.repeat(x[:, 0], x[:, 2])
+
+
+def run_length_hamming_distance(
+    a: np.ndarray, b: np.ndarray, normalize: bool = False
+) -> Union[int, float]:
+    """Number of minutes in which two run-length encoded plans have different activities.
+
+    Calculated directly from the runs, without expanding plans to minutes.
+    Minutes after the end of the shorter plan count as different.
+
+    Args:
+        a (np.ndarray): (runs, 3) run-length encoded plan.
+        b (np.ndarray): (runs, 3) run-length encoded plan.
+        normalize (bool, optional): If True, divide by the length of the longer plan. Defaults to False.
+
+    Returns:
+        Union[int, float]: distance.
+    """
+    ends_a = a[:, 1] + a[:, 2]
+    ends_b = b[:, 1] + b[:, 2]
+    bounds = np.unique(np.concatenate([[0], ends_a, ends_b]))
+    starts = bounds[:-1].astype(int)
+
+    # code of the run containing each segment start, -1 after the end of the plan
+    codes = []
+    for runs, ends in [(a, ends_a), (b, ends_b)]:
+        idxs = np.searchsorted(ends, starts, side="right")
+        codes.append(np.where(idxs < len(runs), runs[np.minimum(idxs, len(runs) - 1), 0], -1))
+    distance = int(np.diff(bounds)[codes[0] != codes[1]].sum())
+
+    if normalize:
+        return distance / bounds[-1] if bounds[-1] else 0.0
+    return distance
+
+
+def run_length_activity_counts(
+    plans_encoded: List[np.ndarray], n_labels: int, length: Optional[int] = None
+) -> np.ndarray:
+    """Number of plans in each activity, for every minute of the day, from run-length encoded plans.
+
+    Equivalent to the sum of one-hot encoded plans, but only the start and end of each run are counted.
+
+    Args:
+        plans_encoded (List[np.ndarray]): run-length encoded plans.
+        n_labels (int): number of activity codes.
+        length (Optional[int], optional): number of minutes. Defaults to None (the end of the longest plan).
+
+    Returns:
+        np.ndarray: (n_labels, length) counts.
+    """
+    runs = np.concatenate(plans_encoded)
+    ends = runs[:, 1] + runs[:, 2]
+    if length is None:
+        length = int(ends.max())
+    counts = np.zeros((n_labels, length + 1), dtype=int)
+    np.add.at(counts, (runs[:, 0], np.minimum(runs[:, 1], length)), 1)
+    np.add.at(counts, (runs[:, 0], np.minimum(ends, length)), -1)
+    return counts.cumsum(axis=1)[:, :length]
+
+
 class PlansEncoder:
     plans_encoder_class = None
     dtype = None
@@ -169,3 +271,21 @@ class PlansOneHotEncoder(PlansEncoder):
     """
 
     plans_encoder_class = PlanOneHotEncoder
+
+
+class PlansRunLengthEncoder(PlansEncoder):
+    """Encode plans to a list of run-length encoded plans (see `PlanRunLengthEncoder`),
+    which, unlike other encodings, do not grow with the length of the day.
+    """
+
+    plans_encoder_class = PlanRunLengthEncoder
+
+    def encode(self, plans: List[Plan]) -> List[np.ndarray]:
+        """Encode all plans to a list of (runs, 3) arrays."""
+        return [self.plan_encoder.encode(x) for x in plans]
+
+    def activity_counts(self, plans: List[Plan]) -> np.ndarray:
+        """Number of plans in each activity, for every minute of the day (as summed one-hot encoded plans)."""
+        return run_length_activity_counts(
+            self.encode(plans), n_labels=len(self.plan_encoder.activity_encoder.labels)
+        )
@@ -1,14 +1,18 @@
+import logging
 import random
 import warnings
 from collections import defaultdict
-from copy import deepcopy
-from typing import Optional
+from collections.abc import Iterator
+from copy import copy, deepcopy
+from typing import NamedTuple, Optional
 
 import numpy as np
 import pandas as pd
 
-from pam.core import Person, Population
+from pam.core import Household, Person, Population
 from pam.planner.utils_planner import safe_divide
+from pam.samplers.rng import RNGRegistry
+from pam.write.matsim import Writer
 
 
 def get_scaling_factor(X: np.ndarray, sel_dim: int, marginals: np.array) -> np.ndarray:
@@ -47,7 +51,10 @@ def get_max_error(X: np.ndarray, marginals: list[np.array]) -> float:
     max_error = 0
     for dim in range(X.ndim):
         scaling_factor = get_scaling_factor(X, dim, marginals[dim])
-        max_error = max(max_error, abs(scaling_factor - 1).max())
+        # classes with zero totals and zero targets are already fitted
+        other_dims = tuple(i for i in range(X.ndim) if i != dim)
+        fitted = np.expand_dims((X.sum(axis=other_dims) == 0) & (marginals[dim] == 0), other_dims)
+        max_error = max(max_error, abs(np.where(fitted, 1, scaling_factor) - 1).max())
 
     return max_error
 
@@ -77,10 +84,88 @@ def ipf(
             scaling_factor = get_scaling_factor(X_fitted, sel_dim, marginals[sel_dim])
             X_fitted *= scaling_factor
         iters += 1
+        max_error = get_max_error(X_fitted, marginals)
 
     return X_fitted
 
 
+class IPFResult(NamedTuple):
+    """Fitted matrices and convergence telemetry of a batched IPF."""
+
+    fitted: np.ndarray  # (batch, *dims) fitted matrices
+    iterations: np.ndarray  # (batch,) number of iterations applied to each matrix
+    max_error: np.ndarray  # (batch,) final max absolute percentage error of each matrix
+    converged: np.ndarray  # (batch,) whether each matrix was fitted within tolerance
+
+
+def ipf_batch(
+    X: np.ndarray,
+    marginals: list[np.ndarray],
+    tolerance: Optional[float] = 0.001,
+    max_iterations: Optional[int] = 10**3,
+) -> IPFResult:
+    """Apply Iterative Proportional Fitting on a batch of multi-dimensional matrices at once (e.g. one per zone).
+
+    Each iteration scales all matrices that have not yet converged with numpy broadcasting.
+    Matrices are frozen as soon as their error is within the tolerance.
+
+    Args:
+        X (np.ndarray): Initial matrices, with the batch as the first dimension.
+        marginals (list[np.ndarray]): Totals to match, one (batch, n) array for each matrix dimension after the first.
+        tolerance (Optional[float], optional): Max accepted percentage difference to the targets. Defaults to 0.001.
+        max_iterations (Optional[int], optional): Max number of iterations. Defaults to 10**3.
+
+    Returns:
+        IPFResult: fitted matrices and convergence telemetry.
+    """
+    X_fitted = X.astype(float)
+    iterations = np.zeros(len(X), dtype=int)
+    max_error = _get_batch_max_error(X_fitted, marginals)
+    active = np.flatnonzero(max_error > tolerance)
+    for _ in range(max_iterations):
+        if not len(active):
+            break
+        X_active = X_fitted[active]
+        marginals_active = [m[active] for m in marginals]
+        for sel_dim in range(1, X_active.ndim):
+            X_active *= _get_batch_scaling_factor(X_active, sel_dim, marginals_active[sel_dim - 1])
+        X_fitted[active] = X_active
+        iterations[active] += 1
+        max_error[active] = _get_batch_max_error(X_active, marginals_active)
+        active = active[max_error[active] > tolerance]
+
+    converged = max_error <= tolerance
+    logging.getLogger(__name__).info(
+        f"IPF fitted {converged.sum()} of {len(X)} matrices within tolerance, "
+        f"in up to {iterations.max(initial=0)} iterations."
+    )
+    return IPFResult(
+        fitted=X_fitted, iterations=iterations, max_error=max_error, converged=converged
+    )
+
+
+def _get_batch_scaling_factor(X: np.ndarray, sel_dim: int, marginals: np.ndarray) -> np.ndarray:
+    """Batched `get_scaling_factor`, for the first dimension of the matrix being the batch."""
+    other_dims = tuple(i for i in range(1, X.ndim) if i != sel_dim)
+    totals = X.sum(axis=other_dims)
+    if ((totals == 0) & (totals != marginals)).any():
+        warnings.warn("Zero-cell issue found! Please check the seed matrix totals.", UserWarning)
+    return np.expand_dims(safe_divide(marginals, totals), other_dims)
+
+
+def _get_batch_max_error(X: np.ndarray, marginals: list[np.ndarray]) -> np.ndarray:
+    """Batched `get_max_error`, returning the error of each matrix."""
+    max_error = np.zeros(len(X))
+    for sel_dim in range(1, X.ndim):
+        other_dims = tuple(i for i in range(1, X.ndim) if i != sel_dim)
+        totals = X.sum(axis=other_dims)
+        error = np.abs(safe_divide(marginals[sel_dim - 1], totals) - 1)
+        error[(totals == 0) & (marginals[sel_dim - 1] == 0)] = 0
+        max_error = np.maximum(max_error, error.max(axis=1, initial=0))
+
+    return max_error
+
+
 def prepare_zone_marginals(zone_data: pd.DataFrame) -> tuple[dict, dict[str, list[np.array]]]:
     """Prepare zone marginals in the required format.
 
@@ -104,13 +189,20 @@ def prepare_zone_marginals(zone_data: pd.DataFrame) -> tuple[dict, dict[str, lis
     for x, y in df_marginals.columns:
         encodings[x].append(y)
 
-    marginals = {}
-    for i, irow in df_marginals.iterrows():
-        marginals[i] = irow.groupby(level=0).apply(np.array).loc[list(encodings.keys())].tolist()
+    batch_marginals = _get_batch_marginals(df_marginals, encodings)
+    marginals = {zone: [m[i] for m in batch_marginals] for i, zone in enumerate(df_marginals.index)}
 
     return encodings, marginals
 
 
+def _get_batch_marginals(df_marginals: pd.DataFrame, encodings: dict) -> list[np.ndarray]:
+    """(zones, classes) marginals of each variable."""
+    return [
+        df_marginals.loc[:, [(variable, c) for c in classes]].to_numpy()
+        for variable, classes in encodings.items()
+    ]
+
+
 def generate_joint_distributions(
     zone_data: pd.DataFrame,
     tolerance: Optional[float] = 0.001,
@@ -129,14 +221,15 @@ def generate_joint_distributions(
         tuple[dict, dict[np.ndarray]]: Encodings and a matrix of the joint distributions.
     """
     encodings, marginals = prepare_zone_marginals(zone_data)
-    dist = {}
-    for zone, zone_marginals in marginals.items():
-        # start with a small value in each cell
-        X = np.zeros(tuple(map(len, zone_marginals))) + 0.001
-        # apply iterative proportinal fitting
-        fitted = ipf(X, zone_marginals, tolerance=tolerance, max_iterations=max_iterations)
-        fitted = fitted.round(0).astype(int)
-        dist[zone] = fitted
+    zones = list(marginals.keys())
+    batch_marginals = [np.stack(m) for m in zip(*marginals.values())]
+
+    # start with a small value in each cell
+    X = np.zeros((len(zones), *(m.shape[1] for m in batch_marginals))) + 0.001
+    # apply iterative proportinal fitting to all zones at once
+    result = ipf_batch(X, batch_marginals, tolerance=tolerance, max_iterations=max_iterations)
+    fitted = result.fitted.round(0).astype(int)
+    dist = dict(zip(zones, fitted))
 
     return encodings, dist
 
@@ -161,8 +254,102 @@ def get_sample_pool(population: Population, encodings: dict) -> dict[tuple, list
     return person_pool
 
 
+class PersonReference(NamedTuple):
+    """A synthetic person, as a reference to a seed population person (template) and its own overrides."""
+
+    template: Person
+    pid: str
+    hid: str
+    zone: str
+
+    def materialise(self, share_plans: bool = False) -> Person:
+        """Create the synthetic person.
+
+        Args:
+            share_plans (bool, optional):
+                If True, the person is a lightweight clone of the template, sharing its plans (and other data, except attributes).
+                Shared plans must not be modified in place.
+                If False, the person is a deep copy of the template.
+                Defaults to False.
+
+        Returns:
+            Person:
+        """
+        if share_plans:
+            person = copy(self.template)
+            person.attributes = dict(self.template.attributes)
+        else:
+            person = deepcopy(self.template)
+        person.pid = self.pid
+        person.attributes["hzone"] = self.zone
+        return person
+
+
+def sample_references(
+    encodings: dict,
+    dist: dict[str, np.ndarray],
+    sample_pool: dict[tuple, list[Person]],
+    seed: Optional[int] = None,
+    rng: Optional[np.random.Generator] = None,
+) -> Iterator[PersonReference]:
+    """Sample a synthetic population as references to the persons of the sample pool, one zone at a time.
+
+    The persons of all demographic categories of a zone are drawn at once.
+    Without a seed or random number generator, draws are the same as sampling each category with `random.choices`.
+
+    Args:
+        encodings (dict): Variable encodings generated with `prepare_zone_marginals`.
+        dist (dict[str, np.ndarray]): Joint distribution matrix.
+        sample_pool (dict[tuple, list[Person]]): The person sample pool generated wtih `get_sample_pool`.
+        seed (Optional[int], optional): If given, seed number for reproducible results. Defaults to None.
+        rng (Optional[np.random.Generator], optional): If given, random number generator to draw from, `seed` is then ignored. Defaults to None.
+
+    Raises:
+        ValueError: Zero-cell issue (trying to sample from a category with no seed samples)
+
+    Yields:
+        Iterator[PersonReference]: synthetic persons.
+    """
+    if rng is None and seed is not None:
+        rng = RNGRegistry(seed).stream("ipf_sample")
+
+    n = 0
+    for zone, zone_dist in dist.items():
+        cells = np.flatnonzero(zone_dist)
+        codes = list(zip(*(idx.tolist() for idx in np.unravel_index(cells, zone_dist.shape))))
+        for code in codes:
+            if code not in sample_pool:
+                # zero cell issue: raise an error
+                k = list(encodings.keys())
+                missing_cat = [([k[i], encodings[k[i]][j]]) for i, j in enumerate(code)]
+                raise ValueError(f"Missing category in seed population: {missing_cat}")
+
+        # sample persons from the appropriate demographic groups
+        sample_sizes = zone_dist.ravel()[cells]
+        total = int(sample_sizes.sum())
+        if rng is not None:
+            draws = rng.random(total)
+        else:
+            draws = np.fromiter((random.random() for _ in range(total)), dtype=float, count=total)
+        pool_sizes = np.repeat([len(sample_pool[code]) for code in codes], sample_sizes)
+        idxs = (draws * pool_sizes).astype(int)
+
+        start = 0
+        for code, sample_size in zip(codes, sample_sizes):
+            pool = sample_pool[code]
+            for i in idxs[start : start + sample_size]:
+                pid = f"{pool[i].pid}-{n}"
+                yield PersonReference(template=pool[i], pid=pid, hid=pid, zone=zone)
+                n += 1
+            start += sample_size
+
+
 def sample_population(
-    encodings: dict, dist: dict[str, np.ndarray], sample_pool: dict[tuple, list[Person]]
+    encodings: dict,
+    dist: dict[str, np.ndarray],
+    sample_pool: dict[tuple, list[Person]],
+    seed: Optional[int] = None,
+    rng: Optional[np.random.Generator] = None,
 ) -> Population:
     """Sample a population.
 
@@ -170,6 +357,8 @@ def sample_population(
         encodings (str): Variable encodings generated with `prepare_zone_marginals`.
         dist (dict[str, np.ndarray]): Joint distribution matrix.
         sample_pool (dict[tuple, list[Person]]): The person sample pool generated wtih `get_sample_pool`.
+        seed (Optional[int], optional): If given, seed number for reproducible results. Defaults to None.
+        rng (Optional[np.random.Generator], optional): If given, random number generator to draw from, `seed` is then ignored. Defaults to None.
 
     Raises:
         ValueError: Zero-cell issue (trying to sample from a category with no seed samples)
@@ -178,34 +367,53 @@ def sample_population(
         Population: A resampled PAM population.
     """
     pop_fitted = Population()
-    n = 0
-    for zone, zone_dist in dist.items():
-        for code, sample_size in np.ndenumerate(zone_dist):
-            if sample_size:
-                if code not in sample_pool:
-                    # zero cell issue: raise an error
-                    k = list(encodings.keys())
-                    missing_cat = [([k[i], encodings[k[i]][j]]) for i, j in enumerate(code)]
-                    raise ValueError(f"Missing category in seed population: {missing_cat}")
-                else:
-                    # sample persons from the appropriate demographic group
-                    persons = random.choices(sample_pool[code], k=sample_size)
-                    # add to the population
-                    for person in persons:
-                        person_new = deepcopy(person)
-                        person_new.pid = f"{person_new.pid}-{n}"
-                        person_new.attributes["hzone"] = zone
-                        pop_fitted.add(person_new)
-                        n += 1
+    for reference in sample_references(encodings, dist, sample_pool, seed=seed, rng=rng):
+        pop_fitted.add(reference.materialise())
 
     return pop_fitted
 
 
+def sample_population_to_writer(
+    encodings: dict,
+    dist: dict[str, np.ndarray],
+    sample_pool: dict[tuple, list[Person]],
+    writer: Writer,
+    seed: Optional[int] = None,
+    rng: Optional[np.random.Generator] = None,
+) -> int:
+    """Sample a population and write it straight to a MATSim writer.
+
+    The sampled population is never held in memory, sampled persons are lightweight clones of the sample pool persons (sharing plans),
+    which are written and discarded one at a time.
+    For a given seed, the sampled persons are the same as those returned by `sample_population`.
+
+    Args:
+        encodings (str): Variable encodings generated with `prepare_zone_marginals`.
+        dist (dict[str, np.ndarray]): Joint distribution matrix.
+        sample_pool (dict[tuple, list[Person]]): The person sample pool generated wtih `get_sample_pool`.
+        writer (Writer): open MATSim population writer.
+        seed (Optional[int], optional): If given, seed number for reproducible results. Defaults to None.
+        rng (Optional[np.random.Generator], optional): If given, random number generator to draw from, `seed` is then ignored. Defaults to None.
+
+    Returns:
+        int: number of persons written.
+    """
+    written = 0
+    for reference in sample_references(encodings, dist, sample_pool, seed=seed, rng=rng):
+        household = Household(hid=reference.hid)
+        household.add(reference.materialise(share_plans=True))
+        writer.add_hh(household)
+        written += 1
+
+    return written
+
+
 def generate_population(
     population: Population,
     zone_data: pd.DataFrame,
     tolerance: Optional[float] = 0.001,
     max_iterations: Optional[int] = 10**3,
+    seed: Optional[int] = None,
 ) -> Population:
     """Resample a population and assign its person to zones,
         so that the distributions in the `zone_data` dataset are met.
@@ -218,6 +426,7 @@ def generate_population(
             for example: `age|minor, age|adult, income|low, income|high, ....`
         tolerance (Optional[float], optional): Max accepted percentage difference to the targets. Defaults to 0.001.
         max_iterations (Optional[int], optional): Max number of iterations. Defaults to 10**3.
+        seed (Optional[int], optional): If given, seed number for reproducible results. Defaults to None.
 
     Returns:
         Population: A new population that matches marginals in each zone.
@@ -227,6 +436,6 @@ def generate_population(
         zone_data, tolerance=tolerance, max_iterations=max_iterations
     )
     sample_pool = get_sample_pool(population, encodings)
-    pop_fitted = sample_population(encodings, dist, sample_pool)
+    pop_fitted = sample_population(encodings, dist, sample_pool, seed=seed)
 
     return pop_fitted
@@ -1,6 +1,7 @@
 """Manages origin-destination data required by the planner module."""
 import itertools
-from typing import NamedTuple, Union
+import os
+from typing import NamedTuple, Optional, Union
 
 import numpy as np
 
@@ -17,7 +18,12 @@ class Labels(NamedTuple):
 class OD:
     """Holds origin-destination matrices for a number of modes and variables."""
 
-    def __init__(self, data: np.ndarray, labels: Union[Labels, list, dict]) -> None:
+    def __init__(
+        self,
+        data: np.ndarray,
+        labels: Union[Labels, list, dict],
+        dtype: Optional[Union[type, np.dtype]] = None,
+    ) -> None:
         """
         Args:
             data (np.ndarray):
@@ -26,12 +32,53 @@ class OD:
                 - Second dimension: origin zone
                 - Third dimension: destination zone
                 - Fourth dimension: mode (ie car, bus, etc)
+                This can be a memory-mapped array (see `OD.from_npy`).
             labels (Union[Labels, list, dict]):
+            dtype (Optional[Union[type, np.dtype]], optional):
+                If given, data type to store the data as (e.g. `np.float32` to halve memory use).
+                Casting a memory-mapped array to a different type loads it into memory.
+                Defaults to None (data is stored as given).
         """
+        if dtype is not None:
+            data = data.astype(dtype, copy=False)
         self.data = data
         self.labels = self.parse_labels(labels)
+        self.label_idxs = [
+            {label: i for i, label in enumerate(dim_labels)} for dim_labels in self.labels
+        ]
         self.data_checks()
 
+    @classmethod
+    def from_npy(
+        cls,
+        path: Union[str, os.PathLike],
+        labels: Union[Labels, list, dict],
+        mmap_mode: Optional[str] = "r",
+    ) -> "OD":
+        """Load origin-destination data from a `.npy` file, memory-mapped by default.
+
+        With memory-mapping, only the parts of the data that are accessed are read from disk,
+        so that datasets larger than the available memory can be used.
+
+        Args:
+            path (Union[str, os.PathLike]): path to the `.npy` file, e.g. as written by `OD.to_npy`.
+            labels (Union[Labels, list, dict]): data labels.
+            mmap_mode (Optional[str], optional):
+                numpy memory-map mode, use None to load the data into memory. Defaults to "r" (read-only).
+
+        Returns:
+            OD:
+        """
+        return cls(data=np.load(path, mmap_mode=mmap_mode), labels=labels)
+
+    def to_npy(self, path: Union[str, os.PathLike]) -> None:
+        """Save the origin-destination data to a `.npy` file.
+
+        Args:
+            path (Union[str, os.PathLike]): output path.
+        """
+        np.save(path, self.data)
+
     def data_checks(self):
         """Check the integrity of input data and labels."""
         assert (
@@ -61,8 +108,8 @@ class OD:
         for i, (arg, labels) in enumerate(zip(_args, self.labels)):
             if arg == slice(None) or isinstance(arg, int):
                 _args_encoded += (arg,)
-            elif arg in labels:
-                _args_encoded += (labels.index(arg),)
+            elif arg in self.label_idxs[i]:
+                _args_encoded += (self.label_idxs[i][arg],)
             else:
                 raise IndexError(f"Invalid slice value {arg}")
 
@@ -89,17 +136,41 @@ class ODMatrix(NamedTuple):
 
 class ODFactory:
     @classmethod
-    def from_matrices(cls, matrices: list[ODMatrix]) -> OD:
-        """Creates an OD instance from a list of ODMatrices."""
+    def from_matrices(
+        cls,
+        matrices: list[ODMatrix],
+        dtype: Union[type, np.dtype] = np.float64,
+        path: Optional[Union[str, os.PathLike]] = None,
+    ) -> OD:
+        """Creates an OD instance from a list of ODMatrices.
+
+        Args:
+            matrices (list[ODMatrix]): input matrices, one per variable and mode combination.
+            dtype (Union[type, np.dtype], optional): data type of the OD data. Defaults to np.float64.
+            path (Optional[Union[str, os.PathLike]], optional):
+                If given, the OD data is written one matrix at a time to a memory-mapped `.npy` file at this path,
+                rather than allocated in memory. It can be re-opened with `OD.from_npy`. Defaults to None.
+
+        Returns:
+            OD:
+        """
         # collect dimensions
         labels = cls.prepare_labels(matrices)
 
         cls.check(matrices, labels)
 
         # create ndarray
-        od = np.zeros(shape=[len(x) for x in labels])
+        shape = tuple(len(x) for x in labels)
+        if path is None:
+            od = np.zeros(shape=shape, dtype=dtype)
+        else:
+            od = np.lib.format.open_memmap(path, mode="w+", dtype=dtype, shape=shape)
+        var_idxs = {var: i for i, var in enumerate(labels.vars)}
+        mode_idxs = {trmode: i for i, trmode in enumerate(labels.mode)}
         for mat in matrices:
-            od[labels.vars.index(mat.var), :, :, labels.mode.index(mat.mode)] = mat.matrix
+            od[var_idxs[mat.var], :, :, mode_idxs[mat.mode]] = mat.matrix
+        if path is not None:
+            od.flush()
 
         return OD(data=od, labels=labels)
 
@@ -1,7 +1,7 @@
 import datetime
 import random
 from copy import deepcopy
-from typing import Union
+from typing import Optional, Union
 
 import numpy as np
 
@@ -10,8 +10,14 @@ from pam.variables import LONG_TERM_ACTIVITIES
 
 
 def calculate_mnl_probabilities(x: Union[np.array, list]) -> np.array:
-    """Calculates MNL probabilities from a set of alternatives."""
-    return np.exp(x) / np.exp(x).sum()
+    """Calculates MNL probabilities from a set of alternatives.
+
+    Utilities are shifted by their maximum before exponentiation, so that large utilities do not overflow.
+    If given a matrix, probabilities are calculated for each row (along the last axis).
+    """
+    x = np.asarray(x, dtype=float)
+    exp_x = np.exp(x - x.max(axis=-1, keepdims=True))
+    return exp_x / exp_x.sum(axis=-1, keepdims=True)
 
 
 def sample_weighted(weights: np.array) -> int:
@@ -21,6 +27,71 @@ def sample_weighted(weights: np.array) -> int:
     return random.choices(range(len(weights)), weights=weights, k=1)[0]
 
 
+def sample_weighted_rows(
+    weights: np.ndarray, rng: Optional[np.random.Generator] = None
+) -> np.ndarray:
+    """Weighted sampling of each row of a matrix of weights, using cumulative weights.
+
+    Without a random number generator, selections are the same as `sample_weighted` applied to each row in turn.
+
+    Args:
+        weights (np.ndarray): (n, k) matrix of weights.
+        rng (Optional[np.random.Generator], optional): If given, random number generator to draw from, otherwise the `random` module is used. Defaults to None.
+
+    Raises:
+        ValueError: if the weights of any row do not have a finite total greater than zero, as per `random.choices`.
+
+    Returns:
+        np.ndarray: (n,) indices of the selections.
+    """
+    cum_weights = np.cumsum(weights, axis=1)
+    n, k = cum_weights.shape
+    totals = cum_weights[:, -1]
+    invalid = np.flatnonzero(~(np.isfinite(totals) & (totals > 0)))
+    if len(invalid):
+        raise ValueError(
+            f"Total of weights must be finite and greater than zero, invalid for rows {invalid.tolist()}"
+        )
+    if rng is not None:
+        draws = rng.random(n)
+    else:
+        draws = np.fromiter((random.random() for _ in range(n)), dtype=float, count=n)
+    thresholds = draws * totals
+    # equivalent to bisect, for each row
+    idxs = (cum_weights <= thresholds[:, np.newaxis]).sum(axis=1)
+    return np.minimum(idxs, k - 1)
+
+
+def sample_mnl_gumbel(
+    utilities: np.ndarray, rng: Optional[np.random.Generator] = None, block_size: int = 1024
+) -> np.ndarray:
+    """Sample MNL selections directly from utilities, without calculating probabilities, using the Gumbel-max trick.
+
+    The alternative with the maximum utility plus independent Gumbel noise is selected, which is equivalent to
+    sampling from the MNL probabilities of each row.
+    Rows are processed in blocks, so that only a (block_size, k) matrix of noise is held in memory at a time.
+    Selections do not depend on the block size.
+
+    Args:
+        utilities (np.ndarray): (n, k) matrix of utilities.
+        rng (Optional[np.random.Generator], optional): random number generator. Defaults to None.
+        block_size (int, optional): number of rows sampled at a time. Defaults to 1024.
+
+    Returns:
+        np.ndarray: (n,) indices of the selections.
+    """
+    if rng is None:
+        rng = np.random.default_rng()
+    utilities = np.asarray(utilities)
+    selections = np.empty(len(utilities), dtype=int)
+    for start in range(0, len(utilities), block_size):
+        block = utilities[start : start + block_size]
+        noise = rng.gumbel(size=block.shape)
+        noise += block
+        selections[start : start + block_size] = noise.argmax(axis=1)
+    return selections
+
+
 def get_trip_chains(plan: Plan, act: str = "home") -> list[list[Union[Activity, Leg]]]:
     """Get trip chains starting and/or ending at a long-term activity."""
     chains = []
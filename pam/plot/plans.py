@@ -435,12 +435,15 @@ def plot_activity_breakdown_area(
         plt.Axes: plot object.
     """
     if activity_classes is not None:
-        plans_encoder = encoder.PlansOneHotEncoder(activity_classes=activity_classes)
+        plans_encoder = encoder.PlansRunLengthEncoder(activity_classes=activity_classes)
     elif plans_encoder is None:
         raise ValueError("Please provide a list of activity classes or a plans encoder.")
 
     labels = plans_encoder.plan_encoder.activity_encoder.labels
-    freqs = plans_encoder.encode(plans).sum(axis=0)
+    if isinstance(plans_encoder, encoder.PlansRunLengthEncoder):
+        freqs = plans_encoder.activity_counts(plans)
+    else:
+        freqs = plans_encoder.encode(plans).sum(axis=0)
 
     if normalize:
         freqs = freqs.astype(float) / freqs.sum(0)
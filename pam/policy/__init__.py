@@ -20,6 +20,8 @@ from pam.policy.policies import (
     RemoveIndividualActivities,
     RemovePersonActivities,
     apply_policies,
+    apply_policies_to_writer,
+    stream_policies,
 )
 from pam.policy.probability_samplers import (
     ActivityProbability,
@@ -2,16 +2,24 @@ from __future__ import annotations
 
 import random
 from abc import ABC, abstractmethod
+from collections.abc import Iterable, Iterator
 from copy import deepcopy
+from itertools import islice
 from typing import TYPE_CHECKING, Optional, Union
 
+import numpy as np
+
 if TYPE_CHECKING:
     from pam.activity import Activity
-    from pam.core import Household, Person, Population
+    from pam.core import Household, Person
+    from pam.write.matsim import Writer
 
 import pam.policy.filters as filters
 import pam.policy.modifiers as modifiers
 import pam.policy.probability_samplers as probability_samplers
+from pam import utils
+from pam.core import Population
+from pam.samplers.rng import derive_seed
 
 
 class Policy(ABC):
@@ -371,24 +379,163 @@ class ReduceSharedHouseholdActivities(HouseholdPolicy):
 
 
 def apply_policies(
-    population: Population, policies: Union[list[Policy], Policy], in_place: bool = False
+    population: Population,
+    policies: Union[list[Policy], Policy],
+    in_place: bool = False,
+    seed: Optional[int] = None,
+    workers: int = 1,
+    chunksize: int = 100,
 ) -> Optional[Population]:
     """Method which applies policies to population.
 
+    Policies are applied to each household independently.
+    If a `seed` is given, each household is modified using its own random stream, derived from the seed and the household id,
+    so that results are reproducible and identical for any number of `workers`.
+    To apply policies to a population streamed from disk, see `apply_policies_to_writer`.
+
     Args:
       population (pam.core.Population):
       policies (Union[list[Policy], Policy]): Policies to be applied to the population.
       in_place (bool): Whether to apply policies to current Population (True) object or return a copy (False). Defaults to False.
+      seed (Optional[int]): If given, master seed for reproducible results. Defaults to None.
+      workers (int):
+        Number of processes to partition households across.
+        Modified households replace the population households, so references to the original households are not updated.
+        Defaults to 1.
+      chunksize (int): Number of households sent to a process at a time, if `workers` > 1. Defaults to 100.
 
     Returns:
       pam.core.Population, optional: if `in_place` is False.
 
     """
-    if not in_place:
-        pop = deepcopy(population)
-    else:
+    if in_place:
         pop = population
+    elif workers > 1:
+        # households are copied to and from the worker processes, so are not copied here
+        pop = deepcopy(population, memo={id(population.households): {}})
+        pop.households.update(population.households)
+    else:
+        pop = deepcopy(population)
+
+    households = list(pop.households.values())
+    for household in stream_policies(households, policies, seed, workers, chunksize):
+        pop.households[household.hid] = household
+    if not in_place:
+        return pop
 
+
+def stream_policies(
+    households: Union[Population, Iterable[Household]],
+    policies: Union[list[Policy], Policy],
+    seed: Optional[int] = None,
+    workers: int = 1,
+    chunksize: int = 100,
+) -> Iterator[Household]:
+    """Apply policies to one household at a time, yielding each household once modified.
+
+    With one worker, policies are applied in place, so households are not copied.
+    Households may be a population, or any iterable of households (e.g. streamed from disk),
+    in which case only one household (or a few chunks of households per worker) is held in memory at a time.
+    For the same `seed`, households are modified as per `apply_policies`.
+
+    Args:
+        households (Union[Population, Iterable[Household]]): households to apply policies to.
+        policies (Union[list[Policy], Policy]): Policies to be applied to each household.
+        seed (Optional[int], optional): If given, master seed for reproducible results. Defaults to None.
+        workers (int, optional):
+            Number of processes to partition households across, yielding modified copies of the households, in order.
+            Policies are copied to each process, so must be picklable if processes are not forked.
+            Defaults to 1.
+        chunksize (int, optional): Number of households sent to a process at a time, if `workers` > 1. Defaults to 100.
+
+    Yields:
+        Iterator[Household]:
+    """
+    policies = _check_policies(policies)
+    if isinstance(households, Population):
+        households = households.households.values()
+    if workers == 1:
+        for household in households:
+            yield _apply_to_household(household, policies, seed)
+        return None
+
+    if seed is None:
+        # otherwise forked processes would share the same global random state
+        seed = np.random.SeedSequence().entropy
+    households = iter(households)
+    chunks = iter(lambda: list(islice(households, chunksize)), [])
+    work = {"policies": policies, "seed": seed}
+    for _, results in utils.map_chunks(chunks, _apply_to_households, work, workers):
+        yield from results
+
+
+def apply_policies_to_writer(
+    households: Union[Population, Iterable[Household]],
+    policies: Union[list[Policy], Policy],
+    writer: Writer,
+    seed: Optional[int] = None,
+    workers: int = 1,
+    chunksize: int = 100,
+) -> int:
+    """Apply policies to households and write each household straight to a MATSim writer.
+
+    Example:
+        ```python
+        with pam.write.matsim.Writer(OUT_PATH, household_key="hid") as writer:
+            apply_policies_to_writer(
+                pam.read.stream_matsim_households(IN_PATH, contiguous=True), policies, writer
+            )
+        ```
+
+    Args:
+        households (Union[Population, Iterable[Household]]):
+            households to apply policies to, modified in place if `workers` is 1.
+        policies (Union[list[Policy], Policy]): Policies to be applied to each household.
+        writer (Writer): open MATSim population writer.
+        seed (Optional[int], optional): If given, master seed for reproducible results. Defaults to None.
+        workers (int, optional): Number of processes to partition households across. Defaults to 1.
+        chunksize (int, optional): Number of households sent to a process at a time, if `workers` > 1. Defaults to 100.
+
+    Returns:
+        int: number of households written.
+    """
+    written = 0
+    for household in stream_policies(households, policies, seed, workers, chunksize):
+        writer.add_hh(household)
+        written += 1
+    return written
+
+
+def _apply_to_household(
+    household: Household, policies: list[Policy], seed: Optional[int]
+) -> Household:
+    """Apply policies to a household in place, see `apply_policies`.
+
+    Policies draw from the global random state, so if a `seed` is given it is reseeded for the household
+    and then restored.
+    """
+    if seed is None:
+        for policy in policies:
+            policy.apply_to(household)
+        return household
+
+    state = random.getstate()
+    random.seed(derive_seed(seed, household.hid))
+    try:
+        for policy in policies:
+            policy.apply_to(household)
+    finally:
+        random.setstate(state)
+    return household
+
+
+def _apply_to_households(
+    households: list[Household], policies: list[Policy], seed: Optional[int]
+) -> list[Household]:
+    return [_apply_to_household(household, policies, seed) for household in households]
+
+
+def _check_policies(policies: Union[list[Policy], Policy]) -> list[Policy]:
     if isinstance(policies, Policy):
         policies = [policies]
     for i in range(len(policies)):
@@ -398,8 +545,4 @@ def apply_policies(
         ), "Policies need to be of type {}, not {}. Failed for policy {} at list index {}".format(
             type(Policy), type(policy), policy, i
         )
-    for hid, household in pop.households.items():
-        for policy in policies:
-            policy.apply_to(household)
-    if not in_place:
-        return pop
+    return policies
@@ -15,14 +15,17 @@ from pam.read.diary import (
     trip_based_travel_diary_read,
 )
 from pam.read.matsim import (
+    count_matsim_household_members,
     get_attributes_from_legs,
     get_attributes_from_person,
+    get_household_id,
     load_attributes_map,
     load_attributes_map_from_v12,
     parse_matsim_plan,
     parse_veh_attribute,
     read_matsim,
     selected_plans,
+    stream_matsim_households,
     stream_matsim_persons,
     unpack_leg,
     unpack_leg_v12,
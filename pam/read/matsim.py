@@ -2,6 +2,7 @@ from __future__ import annotations
 
 import json
 import logging
+from collections import defaultdict
 from collections.abc import Iterator
 from datetime import timedelta
 from typing import Literal, Optional
@@ -225,6 +226,132 @@ def stream_matsim_persons(
         yield person
 
 
+def stream_matsim_households(
+    plans_path: str,
+    household_key: Optional[str] = "hid",
+    contiguous: bool = False,
+    attributes: dict = {},
+    vehicles_manager: Optional[VehicleManager] = None,
+    weight: int = 100,
+    version: Literal[11, 12] = 12,
+    simplify_pt_trips: bool = False,
+    autocomplete: bool = True,
+    crop: bool = False,
+    keep_non_selected: bool = False,
+    leg_attributes: bool = True,
+    leg_route: bool = True,
+) -> Iterator[core.Household]:
+    """Stream a MATSim format population into core.Household objects.
+
+    Persons are grouped into households using a household attribute key, as per `read_matsim`.
+    Persons without a household key are each placed in their own household.
+    If household members are contiguous in the input, use `contiguous=True`, so that only one household is held in memory at a time.
+    Otherwise, a first lightweight pass of the input counts household members,
+    so that each household is yielded as soon as it is complete.
+
+    Args:
+        plans_path (str): path to matsim format xml
+        household_key (Optional[str], optional): Household attribute key. Defaults to "hid".
+        contiguous (bool, optional): If True, household members are assumed to be contiguous in the input. Defaults to False.
+        attributes (dict, optional): map of person attributes, only required for v11. Defaults to {}.
+        vehicles_manager (VehicleManager, optional): Population vehicles manager. Defaults to None.
+        weight (int, optional): household and person frequency. Defaults to 100.
+        version (Literal[11, 12], optional): Defaults to 12.
+        simplify_pt_trips (bool, optional): simplify legs in multi-leg trips. Defaults to False.
+        autocomplete (bool, optional): fills missing leg and activity attributes. Defaults to True.
+        crop (bool, optional): crop plans that go beyond 24 hours. Defaults to False.
+        keep_non_selected (bool, optional): Whether to parse non-selected plans. Defaults to False.
+        leg_attributes (bool, optional): Parse leg attributes such as routing mode. Defaults to True.
+        leg_route (bool, optional): Parse leg route. Defaults to True.
+
+    Raises:
+        UserWarning: If `contiguous`, household members must be contiguous in the input.
+
+    Yields:
+        Iterator[core.Household]:
+    """
+    persons = stream_matsim_persons(
+        plans_path,
+        attributes=attributes,
+        vehicles_manager=vehicles_manager,
+        weight=weight,
+        version=version,
+        simplify_pt_trips=simplify_pt_trips,
+        autocomplete=autocomplete,
+        crop=crop,
+        keep_non_selected=keep_non_selected,
+        leg_attributes=leg_attributes,
+        leg_route=leg_route,
+    )
+
+    if not contiguous:
+        sizes = count_matsim_household_members(plans_path, household_key, attributes, version)
+        incomplete = {}
+        for person in persons:
+            hid = get_household_id(person.pid, person.attributes, household_key)
+            household = incomplete.pop(hid, None) or core.Household(hid, freq=weight)
+            household.add(person)
+            if len(household) == sizes[hid]:
+                yield household
+            else:
+                incomplete[hid] = household
+        return None
+
+    yielded = set()
+    household = None
+    for person in persons:
+        hid = get_household_id(person.pid, person.attributes, household_key)
+        if household is not None and hid == household.hid:
+            household.add(person)
+            continue
+        if household is not None:
+            yield household
+            yielded.add(household.hid)
+        if hid in yielded:
+            raise UserWarning(
+                f"Household {hid} members are not contiguous in {plans_path}, use `contiguous=False`."
+            )
+        household = core.Household(hid, freq=weight)
+        household.add(person)
+    if household is not None:
+        yield household
+
+
+def count_matsim_household_members(
+    plans_path: str,
+    household_key: Optional[str] = "hid",
+    attributes: dict = {},
+    version: Literal[11, 12] = 12,
+) -> dict:
+    """Count household members of a MATSim format population, without parsing plans.
+
+    Args:
+        plans_path (str): path to matsim format xml
+        household_key (Optional[str], optional): Household attribute key. Defaults to "hid".
+        attributes (dict, optional): map of person attributes, only required for v11. Defaults to {}.
+        version (Literal[11, 12], optional): Defaults to 12.
+
+    Returns:
+        dict: household id to number of members.
+    """
+    sizes = defaultdict(int)
+    for person_xml in utils.get_elems(plans_path, "person"):
+        if version == 11:
+            person_id = person_xml.xpath("@id")[0]
+            agent_attributes = attributes.get(person_id, {})
+        else:
+            person_id, agent_attributes = get_attributes_from_person(person_xml)
+        sizes[get_household_id(person_id, agent_attributes, household_key)] += 1
+    return dict(sizes)
+
+
+def get_household_id(pid: str, attributes: dict, household_key: Optional[str] = "hid") -> str:
+    """Household id from person attributes, defaulting to the person id if missing."""
+    if household_key and attributes.get(household_key):
+        return attributes.get(household_key)
+    return pid
+
+
 def parse_matsim_plan(
     plan_xml,
     person_id: str,
@@ -1,8 +1,9 @@
 from datetime import timedelta
+from itertools import islice
 
 from pam.array.encode import PlansToCategorical
 from pam.read import stream_matsim_persons
-from pam.samplers.time import apply_jitter_to_plan
+from pam.samplers.time import apply_jitter_to_plans
 
 
 def inf_yield(queue: list):
@@ -29,18 +30,30 @@ class ActColour:
 
 
 def stringify_plans(
-    plans_path, simplify_pt_trips: bool = False, crop: bool = False, colour=True, width=101
+    plans_path,
+    simplify_pt_trips: bool = False,
+    crop: bool = False,
+    colour=True,
+    width=101,
+    batch_size: int = 1000,
 ):
     print(f"Loading plan sequences from {plans_path}.")
     encoder = PlansToCategorical(bin_size=int(86400 / width), duration=86400)
     colourer = ActColour(colour=colour)
-    for person in stream_matsim_persons(plans_path, simplify_pt_trips=simplify_pt_trips, crop=crop):
-        apply_jitter_to_plan(
-            plan=person.plan, jitter=timedelta(minutes=30), min_duration=timedelta(minutes=5)
+    persons = stream_matsim_persons(plans_path, simplify_pt_trips=simplify_pt_trips, crop=crop)
+    # jitter plans in batches
+    while batch := list(islice(persons, batch_size)):
+        apply_jitter_to_plans(
+            [person.plan for person in batch],
+            jitter=timedelta(minutes=30),
+            min_duration=timedelta(minutes=5),
         )
-        encoded = encoder.encode(person.plan)
-        string = stringify_plan(plan_array=encoded, mapping=encoder.index_to_act, colourer=colourer)
-        print(person.pid, string)
+        for person in batch:
+            encoded = encoder.encode(person.plan)
+            string = stringify_plan(
+                plan_array=encoded, mapping=encoder.index_to_act, colourer=colourer
+            )
+            print(person.pid, string)
 
     print()
     print("Key:")
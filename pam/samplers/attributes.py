@@ -1,6 +1,8 @@
 import random
 from typing import Any, Optional
 
+import numpy as np
+
 
 def bin_integer_transformer(features, target, bins, default=None):
     """Bin a target integer feature based on bins.
@@ -24,6 +26,7 @@ def discrete_joint_distribution_sampler(
     distribution: dict[dict],
     careful: bool = False,
     seed: Optional[int] = None,
+    rng: Optional[np.random.Generator] = None,
 ) -> bool:
     """Randomly sample from a joint distribution based some discrete features.
 
@@ -37,6 +40,9 @@ def discrete_joint_distribution_sampler(
             If True, missing mapped feature in `distribution` will raise an exception. If False, missing values will return False.
             Defaults to False.
         seed (Optional[int], optional): If given, seed number for reproducible results. Defaults to None.
+        rng (Optional[np.random.Generator], optional):
+            If given, random number generator to draw from (e.g. from `pam.samplers.rng.RNGRegistry`), `seed` is then ignored.
+            Defaults to None.
 
     Raises:
         KeyError: all `mapping` keys must be in `features`.
@@ -46,8 +52,9 @@ def discrete_joint_distribution_sampler(
         bool:
     """
 
-    # Fix random seed
-    random.seed(seed)
+    if rng is None:
+        # Fix random seed
+        random.seed(seed)
     p = distribution
     for key in mapping:
         value = features.get(key)
@@ -60,4 +67,6 @@ def discrete_joint_distribution_sampler(
                 raise KeyError(f"Can not find feature for {key}: {value} in distribution: {p}")
             else:
                 return False
-    return random.random() <= p
+    if rng is None:
+        return random.random() <= p
+    return rng.random() <= p
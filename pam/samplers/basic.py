@@ -1,8 +1,15 @@
 import random
 from typing import Optional
 
+import numpy as np
 
-def freq_sample(freq: float, sample: float, seed: Optional[int] = None) -> int:
+
+def freq_sample(
+    freq: float,
+    sample: float,
+    seed: Optional[int] = None,
+    rng: Optional[np.random.Generator] = None,
+) -> int:
     """Down or up sample a frequency based on a sample size.
 
     Sub unit frequencies are rounded probabalistically.
@@ -11,14 +18,21 @@ def freq_sample(freq: float, sample: float, seed: Optional[int] = None) -> int:
         freq (float): pre sampled frequency.
         sample (float): sample size.
         seed (Optional[int], optional): If given, seed number for reproducible results. Defaults to None.
+        rng (Optional[np.random.Generator], optional):
+            If given, random number generator to draw from (e.g. from `pam.samplers.rng.RNGRegistry`), `seed` is then ignored.
+            Unlike `seed`, this does not reset random state, so repeated calls are independent. Defaults to None.
 
     Returns:
         int: new frequency
     """
-    # Fix random seed
-    random.seed(seed)
+    if rng is None:
+        # Fix random seed
+        random.seed(seed)
+        draw = random.random()
+    else:
+        draw = rng.random()
 
     new_freq = freq * sample
     remainder = new_freq - int(new_freq)
-    remainder = int(random.random() < remainder)
+    remainder = int(draw < remainder)
     return int(new_freq) + remainder
@@ -3,7 +3,7 @@ import os
 import pickle
 import random
 from collections.abc import Generator, Iterator
-from typing import Any, Optional
+from typing import Any, Optional, Union
 
 import geopandas as gp
 import numpy as np
@@ -31,6 +31,7 @@ class FacilitySampler:
         expected_euclidean_speeds: Optional[dict] = None,
         activity_areas_path: Optional[str] = None,
         seed: Optional[int] = None,
+        rng: Optional[np.random.Generator] = None,
     ) -> None:
         """Sampler object for facilities.
 
@@ -50,11 +51,15 @@ class FacilitySampler:
             expected_euclidean_speeds (Optional[dict], optional): a dictionary specifying the euclidean speed of the various modes (m/s). If not specified, the default list in variables.EXPECTED_EUCLIDEAN_SPEEDS is used. Defaults to None.
             activity_areas_path (Optional[str], optional): path to the activity areas shapefile (previously exported throught the FacilitySampler.export_activity_areas method). Defaults to None.
             seed (Optional[int], optional): If given, seed number for reproducible results. Defaults to None.
+            rng (Optional[np.random.Generator], optional):
+                If given, random number generator to draw from (e.g. from `pam.samplers.rng.RNGRegistry`), `seed` is then ignored.
+                Defaults to None.
         """
         self.logger = logging.getLogger(__name__)
 
         # Fix random seed
         self.seed = seed
+        self.rng = rng
 
         if activities is None:
             self.activities = list(set(facilities.activity))
@@ -85,7 +90,7 @@ class FacilitySampler:
         self.random_default = random_default
 
         if random_default:
-            self.random_sampler = RandomPointSampler(geoms=zones, fail=fail, seed=seed)
+            self.random_sampler = RandomPointSampler(geoms=zones, fail=fail, seed=seed, rng=rng)
 
         self.facilities = {}
         self.index_counter = 0
@@ -94,6 +99,39 @@ class FacilitySampler:
     def clear(self):
         self.facilities = {}
 
+    def reseed(self, seed: Union[int, np.random.SeedSequence, np.random.Generator]) -> None:
+        """Reset the sampler random state, replacing the sampler random number generator.
+
+        Facility yielders are rebuilt (lazily, on next use) so that subsequent samples do not depend on any previous sampling.
+
+        Args:
+            seed (Union[int, np.random.SeedSequence, np.random.Generator]): new seed or random number generator.
+        """
+        self.rng = np.random.default_rng(seed)
+        self.samplers = {}
+        if self.random_default:
+            self.random_sampler.rng = self.rng
+
+    def merge_facilities(self, facilities: dict) -> None:
+        """Merge facilities sampled elsewhere (e.g. by a copy of this sampler in another process).
+
+        Randomly sampled facilities (with ids prefixed by "_") are given new ids to maintain unique ids.
+
+        Args:
+            facilities (dict): sampled facilities, as per `FacilitySampler.facilities`.
+        """
+        for idx, data in facilities.items():
+            if isinstance(idx, str) and idx.startswith("_"):
+                idx = f"_{self.index_counter}"
+                self.index_counter += 1
+            self.facilities[idx] = data
+
+    def __getstate__(self) -> dict:
+        # facility yielders are generators, which cannot be pickled, so are rebuilt on next use
+        state = self.__dict__.copy()
+        state["samplers"] = {}
+        return state
+
     def sample(
         self,
         location_idx: str,
@@ -137,7 +175,7 @@ class FacilitySampler:
         previous_loc: Optional[shapely.geometry.Point] = None,
     ):
         """Sample a facility id and location. If a location idx is missing, can return a random location."""
-        if location_idx not in self.samplers:
+        if location_idx not in self.candidates:
             if self.random_default:
                 self.logger.warning(f"Using random sample for zone:{location_idx}:{activity}")
                 idx = f"_{self.index_counter}"
@@ -148,7 +186,7 @@ class FacilitySampler:
             self.logger.warning(f"Missing location idx:{location_idx}")
             return None, None
 
-        sampler = self.samplers[location_idx][activity]
+        sampler = self.get_sampler(location_idx, activity)
 
         if sampler is None:
             self.error_counter += 1
@@ -172,6 +210,25 @@ class FacilitySampler:
             else:
                 return next(sampler(mode, previous_duration, previous_loc))
 
+    def get_sampler(self, location_idx: str, activity: str) -> Optional[Iterator]:
+        """Get the facility sampler for a given zone and activity, (re)building it if required."""
+        zone_samplers = self.samplers.setdefault(location_idx, {})
+        if activity not in zone_samplers:
+            zone_samplers[activity] = self.build_sampler(self.candidates[location_idx][activity])
+        return zone_samplers[activity]
+
+    def build_sampler(self, candidates: Optional[dict]) -> Optional[Iterator]:
+        """Build a facility sampler from candidate facilities, as stored in `FacilitySampler.candidates`."""
+        if candidates is None:
+            return None
+        return inf_yielder(
+            transit_modes=self.TRANSIT_MODES,
+            expected_euclidean_speeds=self.EXPECTED_EUCLIDEAN_SPEEDS,
+            seed=self.seed,
+            rng=self.rng,
+            **candidates,
+        )
+
     def spatial_join(self, facilities, zones):
         "Spatially join facility and zone data."
         self.logger.warning("Joining facilities data to zones, this may take a while.")
@@ -219,10 +276,12 @@ class FacilitySampler:
         Returns:
             dict:
         """
+        self.candidates = {}
         sampler_dict = {}
 
         self.logger.warning("Building sampler, this may take a while.")
         for zone in set(activity_areas.keys()):
+            self.candidates[zone] = {}
             sampler_dict[zone] = {}
             zone_facs = activity_areas.get(zone, {})
 
@@ -230,25 +289,19 @@ class FacilitySampler:
                 self.logger.debug(f"Building sampler for zone:{zone} act:{act}.")
                 facs = zone_facs.get(act, None)
                 if facs is not None:
-                    points = list(facs.geometry.items())
+                    candidates = {"candidates": list(facs.geometry.items())}
                     if weight_on is not None:
                         # weighted sampler
-                        weights = facs[weight_on]
-                        transit_distance = facs["transit"] if max_walk is not None else None
-                        sampler_dict[zone][act] = inf_yielder(
-                            points,
-                            weights,
-                            transit_distance,
-                            max_walk,
-                            self.TRANSIT_MODES,
-                            self.EXPECTED_EUCLIDEAN_SPEEDS,
-                            seed=self.seed,
+                        candidates["weights"] = facs[weight_on]
+                        candidates["transit_distance"] = (
+                            facs["transit"] if max_walk is not None else None
                         )
-                    else:
-                        # simple sampler
-                        sampler_dict[zone][act] = inf_yielder(points, seed=self.seed)
+                        candidates["max_walk"] = max_walk
+                    # else simple sampler
+                    self.candidates[zone][act] = candidates
                 else:
-                    sampler_dict[zone][act] = None
+                    self.candidates[zone][act] = None
+                sampler_dict[zone][act] = self.build_sampler(self.candidates[zone][act])
         return sampler_dict
 
     def write_facilities_xml(self, path, comment=None, coordinate_reference_system=None):
@@ -289,6 +342,7 @@ def inf_yielder(
     transit_modes: Optional[list[str]] = None,
     expected_euclidean_speeds: Optional[dict] = None,
     seed: Optional[int] = None,
+    rng: Optional[np.random.Generator] = None,
 ) -> tuple[Any, shapely.geometry.Point]:
     """Redirect to the appropriate sampler.
 
@@ -300,6 +354,9 @@ def inf_yielder(
         transit_modes (Optional[list[str]], optional): Possible transit modes. Defaults to None.
         expected_euclidean_speeds (Optional[dict], optional): Defaults to None.
         seed (Optional[int], optional): If given, seed number for reproducible results. Defaults to None.
+        rng (Optional[np.random.Generator], optional):
+            If given, random number generator to draw from (e.g. from `pam.samplers.rng.RNGRegistry`), `seed` is then ignored.
+            Defaults to None.
 
     Returns:
         tuple[Any, shapely.geometry.Point]: Sampled candidate.
@@ -317,19 +374,27 @@ def inf_yielder(
             previous_duration=previous_duration,
             previous_loc=previous_loc,
             seed=seed,
+            rng=rng,
         )
     else:
-        return inf_yielder_simple(candidates, seed=seed)
+        return inf_yielder_simple(candidates, seed=seed, rng=rng)
 
 
 def inf_yielder_simple(
-    candidates: list[tuple[Any, shapely.geometry.Point]], seed: Optional[int] = None
+    candidates: list[tuple[Any, shapely.geometry.Point]],
+    seed: Optional[int] = None,
+    rng: Optional[np.random.Generator] = None,
 ) -> Iterator[tuple[Any, shapely.geometry.Point]]:
     """Endlessly yield shuffled candidate items."""
-    # Fix random seed
-    random.seed(seed)
+    candidates = list(candidates)  # shuffle a copy, leaving the input order unchanged
+    if rng is None:
+        # Fix random seed
+        random.seed(seed)
+        shuffle = random.shuffle
+    else:
+        shuffle = rng.shuffle
     while True:
-        random.shuffle(candidates)
+        shuffle(candidates)
         for c in candidates:
             yield c
 
@@ -345,6 +410,7 @@ def inf_yielder_weighted(
     previous_duration: Optional[pd.Timedelta],
     previous_loc: Optional[shapely.geometry.Point],
     seed: Optional[int] = None,
+    rng: Optional[np.random.Generator] = None,
 ) -> Iterator[tuple[Any, shapely.geometry.Point]]:
     """A more complex sampler, which allows for weighted and rule-based sampling (with replacement).
 
@@ -359,13 +425,17 @@ def inf_yielder_weighted(
         previous_duration (Optional[pd.Timedelta]): the time duration of the arriving leg.
         previous_loc (Optional[shapely.geometry.Point]):  the location of the last visited activity.
         seed (Optional[int], optional):  If given, seed number for reproducible results. Defaults to None.
-
+        rng (Optional[np.random.Generator], optional):
+            If given, random number generator to draw from (e.g. from `pam.samplers.rng.RNGRegistry`), `seed` is then ignored.
+            Unlike `seed`, this does not reset random state, so repeated calls are independent. Defaults to None.
 
     Yields:
         Iterator[tuple[Any, shapely.geometry.Point]]:
     """
-    # Fix random seed
-    np.random.seed(seed)
+    if rng is None:
+        # Fix random seed
+        np.random.seed(seed)
+        rng = np.random
     if isinstance(weights, pd.Series):
         # if a series of facility weights is provided, perform weighted sampling with replacement
         while True:
@@ -406,4 +476,4 @@ def inf_yielder_weighted(
                 weights = weights / (distance_weights**2)  # distance decay factor of 2
 
             weights = weights / weights.sum()  # probability weights should add up to 1
-            yield candidates[np.random.choice(len(candidates), p=weights)]
+            yield candidates[rng.choice(len(candidates), p=weights)]
@@ -1,12 +1,21 @@
-from copy import deepcopy
-from typing import Optional
+import copy
+from collections.abc import Iterable, Iterator
+from typing import Optional, Union
 
-from pam.core import Population
-from pam.samplers.basic import freq_sample
+import numpy as np
+
+from pam.core import Household, Person, Population
+from pam.samplers.rng import RNGRegistry
+from pam.write.matsim import Writer
 
 
 def sample(
-    population: Population, sample: float, seed: Optional[int] = None, verbose: bool = False
+    population: Population,
+    sample: float,
+    seed: Optional[int] = None,
+    verbose: bool = False,
+    rng: Optional[np.random.Generator] = None,
+    share_plans: bool = False,
 ) -> Population:
     """Sample a new population from the existing using a sample size.
 
@@ -20,41 +29,166 @@ def sample(
         sample (float):  sample size of new population, eg 0.1 for a 10% sample.
         seed (Optional[int], optional): If given, seed number for reproducible results. Defaults to None.
         verbose (bool, optional): Defaults to False.
+        rng (Optional[np.random.Generator], optional): If given, random number generator to draw from, `seed` is then ignored. Defaults to None.
+        share_plans (bool, optional):
+            If True, sampled households and persons are lightweight clones, sharing plans (and other person data, except attributes) with the input population.
+            This is much faster and lighter when upsampling, but shared plans must not be modified in place.
+            If False, sampled households and persons are deep copies.
+            Defaults to False.
 
     Returns:
         Population:
             A new Population object with households sampled based on input frequency.
     """
     sampled_population = Population()
-    sample_freq = int(1 / sample)
-    size = population.size * sample
-    sampled = 0
+    households = list(population.households.values())
+    counts = sample_counts([_household_freq(hh) for hh in households], sample, seed=seed, rng=rng)
 
-    for _, hh in population:
-        sampled_count = freq_sample(freq=hh.freq, sample=sample, seed=seed)
+    for hh, count in zip(households, counts):
+        sampled_population.add(list(replicate_household(hh, count, sample, share_plans)))
 
-        for n in range(sampled_count):  # add sampled hhs (note we provide new unique hid)
-            sampled_hh = deepcopy(hh)
-            sampled_hh.hid = f"{hh.hid}-{n}"
-            sampled_hh.people = {}
-            sampled_hh.hh_freq = sample_freq
+    if verbose:
+        print(
+            f"Population sampler completed: {counts.sum()} households from target of {population.size * sample} sampled"
+        )
 
-            # add sampled people (note we provide a new unique pid)
-            for pid, person in hh.people.items():
-                sampled_person = deepcopy(person)
-                sampled_person.pid = f"{pid}-{n}"
-                sampled_person.person_freq = sample_freq
-                sampled_hh.add(sampled_person)
+    return sampled_population
 
-            sampled_population.add(sampled_hh)
 
-        if verbose:
-            sampled += sampled_count
-            progress = sampled / size
-            if progress % 0.01 == 0:
-                print(f"Sampled approx. {progress*100}%")
+def sample_to_writer(
+    households: Union[Population, Iterable[Household]],
+    sample: float,
+    writer: Writer,
+    seed: Optional[int] = None,
+    rng: Optional[np.random.Generator] = None,
+) -> int:
+    """Sample households and write the sampled households straight to a MATSim writer.
 
-    if verbose:
-        print(f"Population sampler completed: {sampled} households from target of {size} sampled")
+    The sampled population is never held in memory, sampled households are lightweight clones of the input households (sharing plans),
+    which are written and discarded one at a time.
+    Households may be a population, or any iterable of households (e.g. streamed from disk).
+    For a given seed, the sampled households are the same as those returned by `sample`.
 
-    return sampled_population
+    Example:
+        ```python
+        with pam.write.matsim.Writer(OUT_PATH) as writer:
+            sample_to_writer(population, 0.1, writer, seed=0)
+        ```
+
+    Args:
+        households (Union[Population, Iterable[Household]]): households to sample from using household frequency.
+        sample (float): sample size of new population, eg 0.1 for a 10% sample.
+        writer (Writer): open MATSim population writer.
+        seed (Optional[int], optional): If given, seed number for reproducible results. Defaults to None.
+        rng (Optional[np.random.Generator], optional): If given, random number generator to draw from, `seed` is then ignored. Defaults to None.
+
+    Returns:
+        int: number of sampled households written.
+    """
+    if rng is None:
+        rng = _sample_rng(seed)
+    if isinstance(households, Population):
+        households = list(households.households.values())
+        counts = sample_counts([_household_freq(hh) for hh in households], sample, rng=rng)
+        sampled = zip(households, counts)
+    else:
+        # draws are identical to a single vectorised draw, as the generator is consumed in the same order
+        sampled = (
+            (hh, sample_counts([_household_freq(hh)], sample, rng=rng)[0]) for hh in households
+        )
+
+    written = 0
+    for hh, count in sampled:
+        for sampled_hh in replicate_household(hh, count, sample, share_plans=True):
+            writer.add_hh(sampled_hh)
+            written += 1
+    return written
+
+
+def sample_counts(
+    freqs: Iterable[float],
+    sample: float,
+    seed: Optional[int] = None,
+    rng: Optional[np.random.Generator] = None,
+) -> np.ndarray:
+    """Down or up sample frequencies based on a sample size.
+
+    Vectorised equivalent of `pam.samplers.basic.freq_sample`, with sub unit frequencies rounded probabalistically.
+
+    Args:
+        freqs (Iterable[float]): pre sampled frequencies.
+        sample (float): sample size.
+        seed (Optional[int], optional): If given, seed number for reproducible results. Defaults to None.
+        rng (Optional[np.random.Generator], optional): If given, random number generator to draw from, `seed` is then ignored. Defaults to None.
+
+    Raises:
+        ValueError: if any frequency is missing (None) or not finite.
+
+    Returns:
+        np.ndarray: new (integer) frequencies.
+    """
+    if rng is None:
+        rng = _sample_rng(seed)
+    new_freqs = np.asarray(freqs, dtype=float) * sample
+    invalid = np.flatnonzero(~np.isfinite(new_freqs))
+    if len(invalid):
+        raise ValueError(
+            f"Frequencies must be finite numbers, invalid at positions {invalid.tolist()}"
+        )
+    whole = np.floor(new_freqs)
+    return (whole + (rng.random(len(new_freqs)) < new_freqs - whole)).astype(int)
+
+
+def _household_freq(household: Household) -> float:
+    freq = household.freq
+    if freq is None:
+        raise ValueError(
+            f"Household {household.hid} has no frequency (e.g. it is empty), cannot sample it."
+        )
+    return freq
+
+
+def replicate_household(
+    household: Household, n: int, sample: float, share_plans: bool = False
+) -> Iterator[Household]:
+    """Yield `n` sampled replicates of a household, with new unique hids and pids, e.g. `{hid}-{n}`.
+
+    Args:
+        household (Household): household to replicate.
+        n (int): number of replicates.
+        sample (float): sample size, replicate frequencies are set to 1/sample.
+        share_plans (bool, optional): If True, replicates are lightweight clones, sharing plans with the input household. Defaults to False.
+
+    Yields:
+        Iterator[Household]:
+    """
+    sample_freq = int(1 / sample)
+    for i in range(n):
+        if share_plans:
+            sampled_hh = _clone(household)
+        else:
+            # household members are copied separately below
+            sampled_hh = copy.deepcopy(household, memo={id(household.people): {}})
+        sampled_hh.hid = f"{household.hid}-{i}"
+        sampled_hh.hh_freq = sample_freq
+
+        for pid, person in household.people.items():
+            sampled_person = _clone(person) if share_plans else copy.deepcopy(person)
+            sampled_person.pid = f"{pid}-{i}"
+            sampled_person.person_freq = sample_freq
+            sampled_hh.add(sampled_person)
+
+        yield sampled_hh
+
+
+def _clone(target: Union[Household, Person]) -> Union[Household, Person]:
+    """Lightweight copy of a household or person, sharing all data except attributes (and household members)."""
+    clone = copy.copy(target)
+    clone.attributes = dict(target.attributes)
+    if isinstance(target, Household):
+        clone.people = {}
+    return clone
+
+
+def _sample_rng(seed: Optional[int]) -> np.random.Generator:
+    return RNGRegistry(seed).stream("population_sample")
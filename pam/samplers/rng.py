@@ -0,0 +1,108 @@
+from __future__ import annotations
+
+import hashlib
+from typing import Any, Optional, Union
+
+import numpy as np
+
+
+def _key_to_int(key: Any) -> int:
+    """Stable (across processes and sessions) integer hash of a key, such as a household id."""
+    digest = hashlib.blake2b(str(key).encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "little")
+
+
+class RNGRegistry:
+    def __init__(self, seed: Optional[Union[int, np.random.SeedSequence]] = None) -> None:
+        """Central source of named, independent and reproducible random number generator streams.
+
+        Streams are identified by a component name (e.g. "facility") and optionally any number of entity keys
+        (e.g. a household id). Each stream is derived from the registry `numpy.random.SeedSequence`,
+        so streams are statistically independent and do not depend on the order or process in which they are requested.
+
+        Example:
+            ```python
+            registry = RNGRegistry(seed=42)
+            sampler = FacilitySampler(facilities, zones, rng=registry.stream("facility"))
+            hh_rng = registry.stream("sample_locs", hid)
+            ```
+
+        Args:
+            seed (Optional[Union[int, np.random.SeedSequence]], optional):
+                Master seed. If None, fresh entropy is drawn from the OS. Defaults to None.
+        """
+        if isinstance(seed, np.random.SeedSequence):
+            self.seed_sequence = seed
+        else:
+            self.seed_sequence = np.random.SeedSequence(seed)
+
+    @property
+    def seed(self) -> int:
+        """Master seed (entropy) of the registry, can be used to recreate it."""
+        return self.seed_sequence.entropy
+
+    def seed_sequence_for(self, component: str, *entities: Any) -> np.random.SeedSequence:
+        """Get the seed sequence of a named stream.
+
+        Args:
+            component (str): component name, e.g. "facility".
+            *entities (Any): optional entity keys, e.g. a household id.
+
+        Returns:
+            np.random.SeedSequence:
+        """
+        keys = tuple(_key_to_int(k) for k in (component, *entities))
+        return np.random.SeedSequence(
+            entropy=self.seed_sequence.entropy, spawn_key=self.seed_sequence.spawn_key + keys
+        )
+
+    def stream(self, component: str, *entities: Any) -> np.random.Generator:
+        """Get a new random number generator for a named stream.
+
+        Repeated calls with the same names return new generators in the same initial state.
+
+        Args:
+            component (str): component name, e.g. "facility".
+            *entities (Any): optional entity keys, e.g. a household id.
+
+        Returns:
+            np.random.Generator:
+        """
+        return np.random.default_rng(self.seed_sequence_for(component, *entities))
+
+    def spawn(self, component: str, *entities: Any) -> RNGRegistry:
+        """Get a child registry, for a component that itself manages multiple streams.
+
+        Args:
+            component (str): component name.
+            *entities (Any): optional entity keys.
+
+        Returns:
+            RNGRegistry:
+        """
+        return RNGRegistry(self.seed_sequence_for(component, *entities))
+
+    def seed_for(self, component: str, *entities: Any) -> int:
+        """Get an integer seed for a named stream, for use with components that require an integer seed.
+
+        Args:
+            component (str): component name.
+            *entities (Any): optional entity keys.
+
+        Returns:
+            int: seed, valid for both `random.seed` and `numpy.random.seed`.
+        """
+        return int(self.seed_sequence_for(component, *entities).generate_state(1, np.uint32)[0])
+
+
+def derive_seed(seed: int, *keys: Any) -> int:
+    """Derive a deterministic child seed from a master seed and any number of keys.
+
+    Args:
+        seed (int): master seed.
+        *keys (Any): identifiers of the child stream, e.g. a household id.
+
+    Returns:
+        int: child seed, valid for both `random.seed` and `numpy.random.seed`.
+    """
+    return RNGRegistry(seed).seed_for(*keys)
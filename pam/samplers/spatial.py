@@ -3,6 +3,7 @@ import random
 from typing import Any, Optional, Union
 
 import geopandas as gp
+import numpy as np
 from shapely.geometry import Point
 
 
@@ -13,6 +14,7 @@ class RandomPointSampler:
         patience: int = 100,
         fail: bool = True,
         seed: Optional[int] = None,
+        rng: Optional[np.random.Generator] = None,
     ) -> None:
         """Returns randomly placed point within given geometries, as defined by geoms.
 
@@ -23,7 +25,13 @@ class RandomPointSampler:
             geoms (Union[gp.GeoSeries, gp.GeoDataFrame]):
             patience (int, optional): number of tries to sample point. Defaults to 100.
             fail (bool, optional): If True, raise error rather than return None. Defaults to True.
-            seed (Optional[int], optional): If given, seed number for reproducible results. Defaults to None.
+            seed (Optional[int], optional):
+                If given, seed number for reproducible results.
+                Note that the seed is reset for every sample, so repeated samples from the same geometry are identical.
+                Defaults to None.
+            rng (Optional[np.random.Generator], optional):
+                If given, random number generator to draw from (e.g. from `pam.samplers.rng.RNGRegistry`), `seed` is then ignored.
+                Defaults to None.
 
         Raises:
             UserWarning: `geoms` must be one of [gp.GeoSeries, gp.GeoDataFrame].
@@ -47,6 +55,7 @@ class RandomPointSampler:
         self.fail = fail
         # Store random seed
         self.seed = seed
+        self.rng = rng
 
     def sample(self, idx: Union[int, str], activity: Any) -> Optional[Point]:
         """
@@ -102,40 +111,60 @@ class RandomPointSampler:
         return geom
 
     def sample_point_from_multipoint(self, geom):
-        # Fix random seed
-        random.seed(self.seed)
-        return random.choice(list(geom.geoms))
+        self.fix_seed()
+        return self.choice(list(geom.geoms))
 
     def sample_point_from_linestring(self, geom):
         """Also works for linearRing."""
-        # Fix random seed
-        random.seed(self.seed)
-        return geom.interpolate(random.random(), True)
+        self.fix_seed()
+        return geom.interpolate(self.random(), True)
 
     def sample_point_from_multilinestring(self, geom):
-        # Fix random seed
-        random.seed(self.seed)
-        line = random.choice(list(geom.geoms))
+        self.fix_seed()
+        line = self.choice(list(geom.geoms))
         return self.sample_point_from_linestring(line)
 
     def sample_point_from_polygon(self, geom):
         """Return random coordinates within polygon, note that will return float coordinates."""
-        # Fix random seed
-        random.seed(self.seed)
+        self.fix_seed()
         min_x, min_y, max_x, max_y = geom.bounds
         for _ in range(self.patience):
-            random_point = Point(random.uniform(min_x, max_x), random.uniform(min_y, max_y))
+            random_point = Point(self.uniform(min_x, max_x), self.uniform(min_y, max_y))
             if random_point.within(geom):
                 return random_point
 
-        return Point(random.uniform(min_x, max_x), random.uniform(min_y, max_y))
+        return Point(self.uniform(min_x, max_x), self.uniform(min_y, max_y))
 
     def sample_point_from_multipolygon(self, geom):
-        # Fix random seed
-        random.seed(self.seed)
-        poly = random.choices(geom.geoms, weights=[poly.area for poly in geom.geoms])[0]
+        self.fix_seed()
+        poly = self.choice(list(geom.geoms), weights=[poly.area for poly in geom.geoms])
         return self.sample_point_from_polygon(poly)
 
+    def fix_seed(self) -> None:
+        """Reset the global random state to the sampler seed, unless the sampler has its own random number generator."""
+        if self.rng is None:
+            random.seed(self.seed)
+
+    def random(self) -> float:
+        if self.rng is None:
+            return random.random()
+        return self.rng.random()
+
+    def uniform(self, low: float, high: float) -> float:
+        if self.rng is None:
+            return random.uniform(low, high)
+        return self.rng.uniform(low, high)
+
+    def choice(self, items: list, weights: Optional[list] = None) -> Any:
+        if self.rng is None:
+            if weights is None:
+                return random.choice(items)
+            return random.choices(items, weights=weights)[0]
+        if weights is not None:
+            weights = np.asarray(weights, dtype=float)
+            weights = weights / weights.sum()
+        return items[self.rng.choice(len(items), p=weights)]
+
 
 class GeometryRandomSampler:
     def __init__(
@@ -144,6 +173,7 @@ class GeometryRandomSampler:
         geometry_name_column: str,
         default_region: str,
         seed: Optional[int] = None,
+        rng: Optional[np.random.Generator] = None,
     ) -> None:
         """
 
@@ -152,6 +182,9 @@ class GeometryRandomSampler:
             geometry_name_column (str):
             default_region (str):
             seed (Optional[int], optional): If given, seed number for reproducible results. Defaults to None.
+            rng (Optional[np.random.Generator], optional):
+                If given, random number generator to draw from (e.g. from `pam.samplers.rng.RNGRegistry`), `seed` is then ignored.
+                Defaults to None.
         """
         self.geo_df = gp.read_file(geo_df_file)
         self.geometry_name_column = geometry_name_column
@@ -167,6 +200,7 @@ class GeometryRandomSampler:
 
         # Store random seed
         self.seed = seed
+        self.rng = rng
 
     def sample_point(self, geo_region: str, patience: int = 1000) -> Point:
         """Randomly sample point within geodata loaded on class initialisation.
@@ -190,12 +224,16 @@ class GeometryRandomSampler:
             print("Unknown region: {}, sampling from {}".format(geo_region, self.default_region))
             geom = self.default_geom
 
-        # Fix random seed
-        random.seed(self.seed)
+        if self.rng is None:
+            # Fix random seed
+            random.seed(self.seed)
+            uniform = random.uniform
+        else:
+            uniform = self.rng.uniform
 
         min_x, min_y, max_x, max_y = geom.bounds
         for attempt in range(patience):
-            random_point = Point(random.uniform(min_x, max_x), random.uniform(min_y, max_y))
+            random_point = Point(uniform(min_x, max_x), uniform(min_y, max_y))
             if geom.is_valid:
                 if random_point.within(geom):
                     return random_point
@@ -1,8 +1,12 @@
+from collections.abc import Iterable
 from datetime import timedelta
 from random import randrange
+from typing import Optional
+
+import numpy as np
 
 from pam.activity import Activity, Plan
-from pam.variables import END_OF_DAY
+from pam.variables import END_OF_DAY, START_OF_DAY
 
 
 def apply_jitter_to_plan(plan: Plan, jitter: timedelta, min_duration: timedelta):
@@ -71,3 +75,168 @@ def jitter_activity(plan: Plan, i: int, jitter: timedelta, min_duration: timedel
     # final act
     time = plan[-1].shift_start_time(time)
     plan[-1].end_time = END_OF_DAY
+
+
+def apply_jitter_to_plans(
+    plans: Iterable[Plan],
+    jitter: timedelta,
+    min_duration: timedelta,
+    seed: Optional[int] = None,
+    rng: Optional[np.random.Generator] = None,
+):
+    """Apply time jitter to activity durations of many plans at once, leg durations are kept the same.
+
+    Vectorised equivalent of `apply_jitter_to_plan`. Plan times are extracted into arrays of seconds,
+    jittered for all plans at once (see `jitter_arrays`) and then written back to the plans.
+
+    Args:
+        plans (Iterable[Plan]): plans to be jittered, in place.
+        jitter (timedelta): maximum jitter.
+        min_duration (timedelta): minimum activity duration.
+        seed (Optional[int], optional): If given, seed number for reproducible results. Defaults to None.
+        rng (Optional[np.random.Generator], optional): If given, random number generator to draw from, `seed` is then ignored. Defaults to None.
+    """
+    plans = [plan for plan in plans if plan.length > 1]
+    if not plans:
+        return None
+    starts, act_durations, leg_durations, ends, lengths = plans_to_arrays(plans)
+    starts, act_durations = jitter_arrays(
+        starts,
+        act_durations,
+        leg_durations,
+        ends,
+        lengths,
+        jitter=jitter.total_seconds(),
+        min_duration=min_duration.total_seconds(),
+        seed=seed,
+        rng=rng,
+    )
+    arrays_to_plans(plans, starts, act_durations, leg_durations, lengths)
+
+
+def jitter_arrays(
+    starts: np.ndarray,
+    act_durations: np.ndarray,
+    leg_durations: np.ndarray,
+    ends: np.ndarray,
+    lengths: np.ndarray,
+    jitter: float,
+    min_duration: float,
+    seed: Optional[int] = None,
+    rng: Optional[np.random.Generator] = None,
+) -> tuple[np.ndarray, np.ndarray]:
+    """Jitter activity durations of many plans at once, with plan times given as arrays of seconds.
+
+    As per `jitter_activity`, activities are jittered in sequence order, within the maximum jitter and minimum duration,
+    and the duration change of each activity is spread equally over the remaining activities,
+    such that plans end at the end of the day. Each step is applied to all plans at once,
+    so that jittering takes a single pass over the activities of the longest plan.
+
+    Args:
+        starts (np.ndarray): (n_plans,) start time of the first activity of each plan, in seconds.
+        act_durations (np.ndarray): (n_plans, max_acts) activity durations, in seconds, padded beyond plan lengths.
+        leg_durations (np.ndarray): (n_plans, max_acts - 1) leg durations, in seconds, padded beyond plan lengths.
+        ends (np.ndarray): (n_plans,) end time of the last activity of each plan, in seconds.
+        lengths (np.ndarray): (n_plans,) number of activities in each plan.
+        jitter (float): maximum jitter, in seconds.
+        min_duration (float): minimum activity duration, in seconds.
+        seed (Optional[int], optional): If given, seed number for reproducible results. Defaults to None.
+        rng (Optional[np.random.Generator], optional): If given, random number generator to draw from, `seed` is then ignored. Defaults to None.
+
+    Returns:
+        tuple[np.ndarray, np.ndarray]: new activity start times and durations, in seconds, each of shape (n_plans, max_acts).
+    """
+    if rng is None:
+        rng = np.random.default_rng(seed)
+    end_of_day = (END_OF_DAY - START_OF_DAY).total_seconds()
+    act_durations = np.array(act_durations, dtype=float)
+    lengths = np.asarray(lengths)
+    n_plans, max_acts = act_durations.shape
+    act_starts = np.zeros((n_plans, max_acts))
+
+    start = np.array(starts, dtype=float)
+    plan_end = np.array(ends, dtype=float)
+    # cumulative duration change of all (non final) activities following the current activity
+    change = np.zeros(n_plans)
+
+    for k in range(max_acts - 1):
+        act_starts[:, k] = start
+        active = k < lengths - 1
+        duration = act_durations[:, k] - change
+        end = start + duration
+
+        min_end = np.maximum(start + min_duration, end - jitter)
+        max_end = np.minimum(plan_end + min_duration, end + jitter)
+        jitter_range = np.maximum(np.floor(max_end - min_end), 1).astype(np.int64)
+        new_duration = min_end - start + rng.integers(jitter_range)
+
+        tail = lengths - k - 0.5
+        change = np.where(active, change + (new_duration - duration) / tail, change)
+        act_durations[:, k] = np.where(active, new_duration, act_durations[:, k])
+        start = np.where(active, start + new_duration + leg_durations[:, k], start)
+        plan_end = np.where(active, end_of_day, plan_end)
+
+    # final activities
+    final = lengths - 1
+    rows = np.arange(n_plans)
+    act_starts[rows, final] = start
+    act_durations[rows, final] = end_of_day - start
+    return act_starts, act_durations
+
+
+def plans_to_arrays(
+    plans: list[Plan],
+) -> tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """Extract plan times as arrays of seconds, for use with `jitter_arrays`.
+
+    Args:
+        plans (list[Plan]): plans of alternating activities and legs.
+
+    Returns:
+        tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+            first activity start times, activity durations, leg durations, last activity end times and number of activities.
+    """
+    lengths = np.array([(plan.length + 1) // 2 for plan in plans])
+    max_acts = lengths.max()
+    starts = np.zeros(len(plans))
+    ends = np.zeros(len(plans))
+    act_durations = np.zeros((len(plans), max_acts))
+    leg_durations = np.zeros((len(plans), max_acts - 1))
+    for p, plan in enumerate(plans):
+        starts[p] = (plan[0].start_time - START_OF_DAY).total_seconds()
+        ends[p] = (plan[-1].end_time - START_OF_DAY).total_seconds()
+        act_durations[p, : lengths[p]] = [
+            component.duration.total_seconds() for component in plan.day[::2]
+        ]
+        leg_durations[p, : lengths[p] - 1] = [
+            component.duration.total_seconds() for component in plan.day[1::2]
+        ]
+    return starts, act_durations, leg_durations, ends, lengths
+
+
+def arrays_to_plans(
+    plans: list[Plan],
+    act_starts: np.ndarray,
+    act_durations: np.ndarray,
+    leg_durations: np.ndarray,
+    lengths: np.ndarray,
+):
+    """Write plan times, as arrays of seconds (as returned by `jitter_arrays`), back to plans.
+
+    Args:
+        plans (list[Plan]): plans of alternating activities and legs, updated in place.
+        act_starts (np.ndarray): (n_plans, max_acts) activity start times, in seconds.
+        act_durations (np.ndarray): (n_plans, max_acts) activity durations, in seconds.
+        leg_durations (np.ndarray): (n_plans, max_acts - 1) leg durations, in seconds.
+        lengths (np.ndarray): (n_plans,) number of activities in each plan.
+    """
+    act_ends = act_starts + act_durations
+    for p, plan in enumerate(plans):
+        for k in range(lengths[p]):
+            act = plan.day[2 * k]
+            act.start_time = START_OF_DAY + timedelta(seconds=act_starts[p, k])
+            act.end_time = START_OF_DAY + timedelta(seconds=act_ends[p, k])
+            if k < lengths[p] - 1:
+                leg = plan.day[2 * k + 1]
+                leg.start_time = act.end_time
+                leg.end_time = act.end_time + timedelta(seconds=leg_durations[p, k])
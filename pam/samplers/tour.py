@@ -1,5 +1,6 @@
 import random
 import warnings
+from bisect import bisect
 from typing import Any, Dict, Iterable, List, Optional, Union
 
 import geopandas as gp
@@ -11,7 +12,10 @@ from scipy.spatial import distance_matrix
 from shapely.geometry import Point
 
 from pam.activity import Activity, Leg
+from pam.core import Person
 from pam.samplers.facility import FacilitySampler
+from pam.samplers.rng import RNGRegistry
+from pam.utils import map_chunks
 from pam.utils import minutes_to_datetime as mtdt
 from pam.variables import END_OF_DAY, EXPECTED_EUCLIDEAN_SPEEDS
 
@@ -68,12 +72,75 @@ def create_density_gdf(
     return density
 
 
+class CumulativeTable:
+    def __init__(self, items: list, weights: Optional[Iterable[float]] = None) -> None:
+        """Precomputed cumulative weights table, for repeated weighted sampling of items.
+
+        Draws from the `random` module are the same as those of `random.choices(items, weights)`,
+        but without rebuilding the cumulative weights for every draw.
+
+        Args:
+            items (list): items to sample.
+            weights (Optional[Iterable[float]], optional): item weights. If None, items are equally weighted. Defaults to None.
+        """
+        self.items = items
+        if weights is None:
+            weights = np.ones(len(items))
+        self.cum_weights = np.cumsum(np.asarray(list(weights), dtype=float))
+        self._cum_weights = self.cum_weights.tolist()
+        self._items = None
+
+    @property
+    def total(self) -> float:
+        total = self._cum_weights[-1] if self._cum_weights else 0.0
+        if not total > 0.0:
+            raise ValueError("Total of weights must be greater than zero")
+        return total
+
+    def sample(self, rng: Optional[np.random.Generator] = None) -> Any:
+        """Sample a single item.
+
+        Args:
+            rng (Optional[np.random.Generator], optional): If given, random number generator to draw from, otherwise the `random` module is used. Defaults to None.
+
+        Returns:
+            Any: sampled item.
+        """
+        draw = rng.random() if rng is not None else random.random()
+        return self.items[bisect(self._cum_weights, draw * self.total, 0, len(self.items) - 1)]
+
+    def samples(self, n: int = 1, rng: Optional[np.random.Generator] = None) -> np.ndarray:
+        """Sample `n` items at once.
+
+        Args:
+            n (int, optional): number of samples. Defaults to 1.
+            rng (Optional[np.random.Generator], optional): If given, random number generator to draw from, otherwise the `random` module is used. Defaults to None.
+
+        Returns:
+            np.ndarray: sampled items.
+        """
+        if rng is not None:
+            draws = rng.random(n)
+        else:
+            draws = np.fromiter((random.random() for _ in range(n)), dtype=float, count=n)
+        idxs = np.searchsorted(self.cum_weights, draws * self.total, side="right")
+        if self._items is None:
+            self._items = np.asarray(self.items)
+            if self._items.ndim != 1:  # e.g. tuples
+                self._items = np.empty(len(self.items), dtype=object)
+                for i, item in enumerate(self.items):
+                    self._items[i] = item
+        return self._items[np.minimum(idxs, len(self.items) - 1)]
+
+
 class PivotDistributionSampler:
     """Defines a distribution, a sampler, and plots based on input values. The resulting distribution can be sampled
     for inputs required to build an agent plan (i.e, time of day, repetition of activities).
     """
 
-    def __init__(self, bins: Iterable, pivots: dict, total=None):
+    def __init__(
+        self, bins: Iterable, pivots: dict, total=None, rng: Optional[np.random.Generator] = None
+    ):
         """Builds a dict distribution based on bins (i.e, hours) and pivots (i.e, hourly demand).
 
         Where the input pivot does not specify a value, values are estimated within the bin range by interpolation.
@@ -82,8 +149,11 @@ class PivotDistributionSampler:
             bins (Iterable): a range or dictionary of values
             pivots (dict): a dictionary of values associated with the bins.
             total (optional): Defaults to None.
+            rng (Optional[np.random.Generator], optional): If given, random number generator to draw from, otherwise the `random` module is used. Defaults to None.
         """
         self.demand = {}
+        self.rng = rng
+        self._cum_table = None
 
         if bins[0] not in pivots:
             pivots[bins[0]] = 0
@@ -125,13 +195,31 @@ class PivotDistributionSampler:
         return fig
 
     def sample(self):
-        return random.choices(list(self.demand.keys()), list(self.demand.values()), k=1)[0]
+        return self._table().sample(self.rng)
+
+    def samples(self, n: int = 1) -> list:
+        """
+
+        Args:
+          n (int, optional): number of samples to be returned. Defaults to 1.
+
+        Returns:
+          list: bins sampled from distribution
+
+        """
+        return self._table().samples(n, self.rng).tolist()
+
+    def _table(self) -> CumulativeTable:
+        if self._cum_table is None:
+            self._cum_table = CumulativeTable(list(self.demand.keys()), list(self.demand.values()))
+        return self._cum_table
 
 
 class FrequencySampler:
     """Object for initiating and sampling from frequency weighted distributing.
     This object includes three samplers: a single sample, multiple samples, or sample based on a threshold value
     (requires a threshold matrix).
+    Cumulative weights (and the distribution reduced by the threshold value) are computed once, on first use.
     """
 
     def __init__(
@@ -140,6 +228,7 @@ class FrequencySampler:
         freq: Optional[Union[str, Iterable]] = None,
         threshold_matrix: Optional[pd.DataFrame] = None,
         threshold_value: Optional[Union[int, float]] = None,
+        rng: Optional[np.random.Generator] = None,
     ) -> None:
         """
 
@@ -153,11 +242,16 @@ class FrequencySampler:
                 A dataframe that will be reduced based on a specified threshold_value. Defaults to None.
             threshold_value (Optional[Union[int, float]], optional):
                 A value to filter the threshold_matrix. This is the maximum allowed value. Defaults to None.
+            rng (Optional[np.random.Generator], optional):
+                If given, random number generator to draw from, otherwise the `random` module is used. Defaults to None.
         """
         self.distribution = dist
         self.frequency = freq
         self.threshold_matrix = threshold_matrix
         self.threshold_value = threshold_value
+        self.rng = rng
+        self._cum_table = None
+        self._threshold_table = None
 
     def sample(self) -> Any:
         """
@@ -166,7 +260,7 @@ class FrequencySampler:
             Any: Single object sampled from distribution
 
         """
-        return random.choices(self.distribution, weights=self.frequency, k=1)[0]
+        return self._table().sample(self.rng)
 
     def samples(self, n: int = 1) -> list:
         """
@@ -178,21 +272,56 @@ class FrequencySampler:
           list: objects sampled from distribution
 
         """
-        return random.choices(self.distribution, weights=self.frequency, k=n)
+        return self._table().samples(n, self.rng).tolist()
 
     def threshold_sample(self):
         """Returns a sampler of a distribution that has been reduced based on a threshold value."""
-        d_list = self.threshold_matrix
-        d_list = d_list[d_list <= self.threshold_value].index
-        d_threshold = self.distribution[self.distribution.index.isin(d_list)]
+        table = self._threshold()
+        if table is None:
+            warnings.warn("No destinations within this threshold value, change threshold")
+            return None
+        return table.sample(self.rng)
+
+    def threshold_samples(self, n: int = 1) -> Optional[list]:
+        """Returns samples of a distribution that has been reduced based on a threshold value.
+
+        Args:
+          n (int, optional): number of samples to be returned. Defaults to 1.
 
-        if len(d_threshold) == 0:
+        Returns:
+          Optional[list]: objects sampled from the reduced distribution, None if it is empty.
+        """
+        table = self._threshold()
+        if table is None:
             warnings.warn("No destinations within this threshold value, change threshold")
             return None
-        else:
-            return random.choices(
-                list(d_threshold.index), weights=list(d_threshold[self.frequency]), k=1
-            )[0]
+        return table.samples(n, self.rng).tolist()
+
+    def _table(self) -> CumulativeTable:
+        if self._cum_table is None:
+            if isinstance(self.distribution, pd.DataFrame):
+                items = list(self.distribution.index)
+            else:
+                items = list(self.distribution)
+            weights = self.frequency
+            if isinstance(weights, str):
+                weights = self.distribution[weights]
+            self._cum_table = CumulativeTable(items, weights)
+        return self._cum_table
+
+    def _threshold(self) -> Optional[CumulativeTable]:
+        """Distribution reduced based on the threshold value, filtered once and cached."""
+        if self._threshold_table is None:
+            d_list = self.threshold_matrix
+            d_list = d_list[d_list <= self.threshold_value].index
+            d_threshold = self.distribution[self.distribution.index.isin(d_list)]
+            if len(d_threshold) == 0:
+                self._threshold_table = False
+            else:
+                self._threshold_table = CumulativeTable(
+                    list(d_threshold.index), list(d_threshold[self.frequency])
+                )
+        return self._threshold_table or None
 
 
 def model_distance(o, d, scale=1.4):
@@ -275,6 +404,7 @@ class TourPlanner:
         self.facility_sampler = facility_sampler
         self.o_activity = activity_params["o_activity"]
         self.d_activity = activity_params["d_activity"]
+        self._d_zone_sampler = None
 
     def d_zone_sample_choice(self) -> str:
         """Samples a destination zone (d_zone) as a string, dependent on the presence of a threshold matrix.
@@ -283,15 +413,21 @@ class TourPlanner:
             str: d_zone
 
         """ ""
+        if self._d_zone_sampler is None:
+            if self.threshold_matrix is None:
+                self._d_zone_sampler = FrequencySampler(self.d_dist.index, self.d_dist[self.d_freq])
+            else:
+                self._d_zone_sampler = FrequencySampler(
+                    dist=self.d_dist,
+                    freq=self.d_freq,
+                    threshold_matrix=self.threshold_matrix.loc[self.o_zone],
+                    threshold_value=self.threshold_value,
+                )
+
         if self.threshold_matrix is None:
-            d_zone = FrequencySampler(self.d_dist.index, self.d_dist[self.d_freq]).sample()
+            d_zone = self._d_zone_sampler.sample()
         else:
-            d_zone = FrequencySampler(
-                dist=self.d_dist,
-                freq=self.d_freq,
-                threshold_matrix=self.threshold_matrix.loc[self.o_zone],
-                threshold_value=self.threshold_value,
-            ).threshold_sample()
+            d_zone = self._d_zone_sampler.threshold_sample()
 
         return d_zone
 
@@ -588,6 +724,418 @@ class TourPlanner:
         )
 
 
+_EXHAUSTED = object()
+
+
+class BatchTourPlanner:
+    """Object for planning the tours of many agents at once.
+
+    Equivalent to the TourPlanner, but vectorised across tours:
+    destination zones are sampled from precomputed cumulative weights tables (for each origin zone, if using a threshold matrix),
+    stops of all tours with the same number of stops are sequenced at once
+    (using a nearest neighbour tour from the origin, improved by 2-opt, see `sequence_tours`),
+    and activity and leg times are modelled for all tours at once.
+
+    Example:
+        ```python
+        planner = tour.BatchTourPlanner(
+            d_dist=destination_density,
+            d_freq="density",
+            facility_sampler=facility_sampler,
+            activity_params={"o_activity": "depot", "d_activity": "delivery"},
+        )
+        planner.plan(agents, stops=stops, hours=hours, minutes=minutes, o_zones=o_zones, seed=0)
+        ```
+    """
+
+    def __init__(
+        self,
+        d_dist: pd.DataFrame,
+        d_freq: Union[str, Iterable],
+        facility_sampler: FacilitySampler,
+        activity_params: dict[str, str],
+        threshold_matrix: Optional[pd.DataFrame] = None,
+        threshold_value: Optional[Union[int, float]] = None,
+        two_opt: bool = True,
+        max_resamples: int = 1000,
+    ):
+        """
+        Args:
+            d_dist (pd.DataFrame): distribution of destination zones.
+            d_freq (Union[str, Iterable]): frequency value to sample of destination distribution.
+            facility_sampler (FacilitySampler):
+            activity_params (dict[str, str]): dictionary of str of origin activity (str) and destination activity (str).
+            threshold_matrix (Optional[pd.DataFrame], optional): dataframe that will be reduced based on threshold value. Defaults to None.
+            threshold_value (Optional[Union[int, float]], optional): maximum threshold value allowed between origin and destination in threshold_matrix. Defaults to None.
+            two_opt (bool, optional): If True, improve nearest neighbour stop sequences using 2-opt. Defaults to True.
+            max_resamples (int, optional):
+                maximum number of destinations in a row to resample, as duplicates of the origin or of previous stops,
+                before giving up on a tour. Defaults to 1000.
+        """
+        self.d_zones = np.asarray(d_dist.index)
+        weights = d_dist[d_freq] if isinstance(d_freq, str) else d_freq
+        self.d_weights = np.asarray(weights, dtype=float)
+        self.threshold_matrix = threshold_matrix
+        self.threshold_value = threshold_value
+        self.facility_sampler = facility_sampler
+        self.o_activity = activity_params["o_activity"]
+        self.d_activity = activity_params["d_activity"]
+        self.two_opt = two_opt
+        self.max_resamples = max_resamples
+        self._d_zone_tables = {}
+
+    def d_zone_table(self, o_zone: Optional[str] = None) -> Optional[CumulativeTable]:
+        """Destination zone cumulative weights table, from a given origin zone if using a threshold matrix.
+
+        Args:
+            o_zone (Optional[str], optional): origin zone. Defaults to None.
+
+        Returns:
+            Optional[CumulativeTable]: None if there are no destinations within the threshold value.
+        """
+        if self.threshold_matrix is None:
+            o_zone = None
+        if o_zone not in self._d_zone_tables:
+            weights = self.d_weights
+            if o_zone is not None:
+                thresholds = self.threshold_matrix.loc[o_zone]
+                within = thresholds[thresholds <= self.threshold_value].index
+                weights = np.where(np.isin(self.d_zones, within), weights, 0)
+            if weights.sum() > 0:
+                self._d_zone_tables[o_zone] = CumulativeTable(list(self.d_zones), weights)
+            else:
+                warnings.warn("No destinations within this threshold value, change threshold")
+                self._d_zone_tables[o_zone] = None
+        return self._d_zone_tables[o_zone]
+
+    def sample_d_zones(self, o_zone: str, n: int, rng: np.random.Generator) -> list:
+        """Sample destination zones.
+
+        Args:
+            o_zone (str): origin zone.
+            n (int): number of destination zones to sample.
+            rng (np.random.Generator): random number generator.
+
+        Returns:
+            list: destination zones, None if there are no destinations within the threshold value.
+        """
+        table = self.d_zone_table(o_zone)
+        if table is None:
+            return [None] * n
+        return table.samples(n, rng).tolist()
+
+    def sample_stops(
+        self, stops: int, o_zone: str, rng: np.random.Generator
+    ) -> tuple[Point, list, list[Point]]:
+        """Sample an origin location and unique destinations, excluding the origin location.
+
+        Args:
+            stops (int): # of stops.
+            o_zone (str): origin zone.
+            rng (np.random.Generator): random number generator.
+
+        Raises:
+            ValueError: If there are no destinations within the threshold value of the origin zone,
+                or if `max_resamples` destinations in a row are duplicates of those already sampled.
+
+        Returns:
+            tuple[Point, list, list[Point]]: (o_loc, d_zones, d_locs).
+        """
+        if stops > 0 and self.d_zone_table(o_zone) is None:
+            raise ValueError(
+                f"No destinations within threshold value {self.threshold_value} of origin zone {o_zone}."
+            )
+        o_loc = self.facility_sampler.sample(o_zone, self.o_activity)
+        sampled = {(o_loc.x, o_loc.y)}
+        d_zones, d_locs = [], []
+        candidates = iter(())
+        resamples = 0
+        while len(d_locs) < stops:
+            d_zone = next(candidates, _EXHAUSTED)
+            if d_zone is _EXHAUSTED:
+                candidates = iter(self.sample_d_zones(o_zone, stops - len(d_locs), rng))
+                continue
+            d_loc = self.facility_sampler.sample(d_zone, self.d_activity)
+            if (d_loc.x, d_loc.y) in sampled:
+                resamples += 1
+                if resamples > self.max_resamples:
+                    raise ValueError(
+                        f"Failed to sample {stops} unique destinations from origin zone {o_zone}, "
+                        f"only {len(d_locs)} found in {self.max_resamples} resamples."
+                    )
+                continue
+            resamples = 0
+            sampled.add((d_loc.x, d_loc.y))
+            d_zones.append(d_zone)
+            d_locs.append(d_loc)
+        return o_loc, d_zones, d_locs
+
+    def sequence_stops(
+        self,
+        stops: Iterable[int],
+        o_zones: Iterable[str],
+        seed: Optional[int] = None,
+        workers: int = 1,
+        chunksize: int = 10000,
+    ) -> list[tuple[Point, list, list[Point]]]:
+        """Sample and sequence the stops of many tours.
+
+        Tours are planned in chunks, each with its own random stream, so that results for a given seed
+        do not depend on the number of workers.
+        If the facility sampler has a `reseed` method, it is reseeded for each chunk. With one worker, this replaces
+        the random state of `facility_sampler` itself, otherwise that of its copy in each worker process,
+        and the facilities sampled by the workers are merged into `facility_sampler`.
+
+        Args:
+            stops (Iterable[int]): # of stops of each tour.
+            o_zones (Iterable[str]): origin zone of each tour.
+            seed (Optional[int], optional): If given, seed number for reproducible results. Defaults to None.
+            workers (int, optional): number of processes to plan chunks of tours in. Defaults to 1.
+            chunksize (int, optional): number of tours in each chunk. Defaults to 10000.
+
+        Returns:
+            list[tuple[Point, list, list[Point]]]: (o_loc, d_zones, d_locs) of each tour.
+        """
+        stops = list(stops)
+        o_zones = list(o_zones)
+        if seed is None:
+            seed = np.random.SeedSequence().entropy
+        chunks = [
+            (i, stops[start : start + chunksize], o_zones[start : start + chunksize])
+            for i, start in enumerate(range(0, len(stops), chunksize))
+        ]
+        if workers == 1:
+            results = (self._sequence_chunk(chunk, seed) for chunk in chunks)
+            return [tour for result in results for tour in result]
+
+        tours = []
+        work = {"planner": self, "seed": seed}
+        for _, (result, facilities) in map_chunks(chunks, _sequence_tours, work, workers):
+            tours.extend(result)
+            if facilities and hasattr(self.facility_sampler, "merge_facilities"):
+                self.facility_sampler.merge_facilities(facilities)
+        return tours
+
+    def _sequence_chunk(self, chunk: tuple, seed: int) -> list[tuple[Point, list, list[Point]]]:
+        i, stops, o_zones = chunk
+        registry = RNGRegistry(seed)
+        rng = registry.stream("tour", i)
+        if hasattr(self.facility_sampler, "reseed"):
+            self.facility_sampler.reseed(registry.seed_for("tour_facility", i))
+
+        tours = [self.sample_stops(n, o_zone, rng) for n, o_zone in zip(stops, o_zones)]
+
+        # sequence all tours with the same number of stops at once
+        for n in set(stops):
+            idxs = [t for t, n_stops in enumerate(stops) if n_stops == n]
+            coords = np.array(
+                [
+                    [[loc.x, loc.y] for loc in [tours[t][0], *tours[t][2]]]  # origin first
+                    for t in idxs
+                ]
+            )
+            orders = sequence_tours(coords, two_opt=self.two_opt)
+            for t, order in zip(idxs, orders):
+                o_loc, d_zones, d_locs = tours[t]
+                tours[t] = (
+                    o_loc,
+                    [d_zones[k - 1] for k in order[1:]],
+                    [d_locs[k - 1] for k in order[1:]],
+                )
+        return tours
+
+    def apply(
+        self,
+        agents: list[Person],
+        hours: Iterable[int],
+        minutes: Iterable[int],
+        o_zones: Iterable[str],
+        tours: list[tuple[Point, list, list[Point]]],
+    ) -> None:
+        """Build agent plans from sequenced tours, as per the TourPlanner.
+
+        Activity and leg times are modelled for all tours with the same number of stops at once.
+
+        Args:
+            agents (list[Person]): agents to build plans for.
+            hours (Iterable[int]): start hour of each tour.
+            minutes (Iterable[int]): start minute of each tour.
+            o_zones (Iterable[str]): origin zone of each tour.
+            tours (list[tuple[Point, list, list[Point]]]): (o_loc, d_zones, d_locs) of each tour, as returned by `sequence_stops`.
+        """
+        start_tms = np.asarray(hours, dtype=int) * 60 + np.asarray(minutes, dtype=int)
+        o_zones = list(o_zones)
+        stops = [len(d_locs) for _, _, d_locs in tours]
+
+        for n in set(stops):
+            idxs = [t for t, n_stops in enumerate(stops) if n_stops == n]
+            # closed tour coordinates, from origin, through stops, back to origin
+            coords = np.array(
+                [[[loc.x, loc.y] for loc in [tours[t][0], *tours[t][2], tours[t][0]]] for t in idxs]
+            )
+            distances = np.linalg.norm(np.diff(coords, axis=1), axis=2) * 1.4
+            trip_durations = model_journey_time(distances)
+            leg_minutes = (trip_durations / 60).astype(int)
+            activity_minutes = (np.clip(trip_durations, 600, 3600) / 60).astype(int)
+            activity_minutes[:, -1] = 0  # return to origin activity ends at the end of the day
+            leg_ends = (
+                start_tms[idxs, None]
+                + np.cumsum(leg_minutes, axis=1)
+                + np.cumsum(activity_minutes, axis=1)
+                - activity_minutes
+            )
+            act_ends = leg_ends + activity_minutes
+            for t, row in zip(idxs, range(len(idxs))):
+                self._add_tour(
+                    agents[t],
+                    o_zones[t],
+                    tours[t],
+                    int(start_tms[t]),
+                    leg_ends[row].tolist(),
+                    act_ends[row].tolist(),
+                )
+
+    def _add_tour(
+        self,
+        agent: Person,
+        o_zone: str,
+        tour: tuple[Point, list, list[Point]],
+        start_tm: int,
+        leg_ends: list[int],
+        act_ends: list[int],
+    ) -> None:
+        o_loc, d_zones, d_locs = tour
+        zones = [o_zone, *d_zones, o_zone]
+        locs = [o_loc, *d_locs, o_loc]
+        acts = [self.o_activity] + [self.d_activity] * len(d_locs) + [self.o_activity]
+        act_ends = [start_tm] + act_ends[:-1] + [None]
+        agent.add(
+            Activity(
+                seq=1,
+                act=acts[0],
+                area=o_zone,
+                loc=o_loc,
+                start_time=mtdt(0),
+                end_time=mtdt(start_tm),
+            )
+        )
+        for k in range(len(locs) - 1):
+            agent.add(
+                Leg(
+                    seq=k + 1,
+                    mode="car",
+                    start_area=zones[k],
+                    end_area=zones[k + 1],
+                    start_loc=locs[k],
+                    end_loc=locs[k + 1],
+                    start_time=mtdt(act_ends[k]),
+                    end_time=mtdt(leg_ends[k]),
+                )
+            )
+            agent.add(
+                Activity(
+                    seq=k + 2,
+                    act=acts[k + 1],
+                    area=zones[k + 1],
+                    loc=locs[k + 1],
+                    start_time=mtdt(leg_ends[k]),
+                    end_time=END_OF_DAY if act_ends[k + 1] is None else mtdt(act_ends[k + 1]),
+                )
+            )
+
+    def plan(
+        self,
+        agents: list[Person],
+        stops: Iterable[int],
+        hours: Iterable[int],
+        minutes: Iterable[int],
+        o_zones: Iterable[str],
+        seed: Optional[int] = None,
+        workers: int = 1,
+        chunksize: int = 10000,
+    ) -> None:
+        """Sample, sequence and build the tour plans of many agents.
+
+        Args:
+            agents (list[Person]): agents to build plans for.
+            stops (Iterable[int]): # of stops of each tour.
+            hours (Iterable[int]): start hour of each tour.
+            minutes (Iterable[int]): start minute of each tour.
+            o_zones (Iterable[str]): origin zone of each tour.
+            seed (Optional[int], optional): If given, seed number for reproducible results. Defaults to None.
+            workers (int, optional): number of processes to plan chunks of tours in. Defaults to 1.
+            chunksize (int, optional): number of tours in each chunk. Defaults to 10000.
+        """
+        o_zones = list(o_zones)
+        tours = self.sequence_stops(stops, o_zones, seed=seed, workers=workers, chunksize=chunksize)
+        self.apply(agents, hours, minutes, o_zones, tours)
+
+
+def sequence_tours(
+    coords: np.ndarray, two_opt: bool = True, max_iterations: int = 100
+) -> np.ndarray:
+    """Sequence the stops of many closed tours, with the same number of stops, at once.
+
+    Tours start and end at their origin (the first node). Stops are sequenced by nearest neighbour from the origin,
+    then, optionally, improved by 2-opt (reversing sub-sequences of stops until there are no improvements).
+
+    Args:
+        coords (np.ndarray): (n_tours, n_nodes, 2) coordinates of the origin followed by the stops of each tour.
+        two_opt (bool, optional): If True, improve sequences using 2-opt. Defaults to True.
+        max_iterations (int, optional): maximum number of 2-opt passes. Defaults to 100.
+
+    Returns:
+        np.ndarray: (n_tours, n_nodes) node sequences, starting with the origin (0).
+    """
+    n_tours, n_nodes, _ = coords.shape
+    dist_matrices = np.linalg.norm(coords[:, :, None, :] - coords[:, None, :, :], axis=-1)
+    rows = np.arange(n_tours)
+
+    # nearest neighbour
+    order = np.zeros((n_tours, n_nodes), dtype=int)
+    visited = np.zeros((n_tours, n_nodes), dtype=bool)
+    visited[:, 0] = True
+    for step in range(1, n_nodes):
+        distances = np.where(visited, np.inf, dist_matrices[rows, order[:, step - 1]])
+        order[:, step] = distances.argmin(axis=1)
+        visited[rows, order[:, step]] = True
+
+    if not two_opt:
+        return order
+
+    # 2-opt, over the closed tours
+    tours = np.concatenate([order, order[:, :1]], axis=1)
+    for _ in range(max_iterations):
+        improved = False
+        for i in range(1, n_nodes - 1):
+            for j in range(i + 1, n_nodes):
+                a, b, c, d = tours[:, i - 1], tours[:, i], tours[:, j], tours[:, j + 1]
+                delta = (
+                    dist_matrices[rows, a, c]
+                    + dist_matrices[rows, b, d]
+                    - dist_matrices[rows, a, b]
+                    - dist_matrices[rows, c, d]
+                )
+                better = delta < -1e-9
+                if better.any():
+                    tours[better, i : j + 1] = tours[better, i : j + 1][:, ::-1]
+                    improved = True
+        if not improved:
+            break
+    return tours[:, :-1]
+
+
+def _sequence_tours(
+    chunk: tuple, planner: BatchTourPlanner, seed: int
+) -> tuple[list[tuple[Point, list, list[Point]]], dict]:
+    """Plan a chunk of tours in a worker process, returning the tours and any facilities sampled for them."""
+    sampler = planner.facility_sampler
+    if hasattr(sampler, "clear"):
+        sampler.clear()
+    tours = planner._sequence_chunk(chunk, seed)
+    return tours, dict(getattr(sampler, "facilities", {}))
+
+
 class ValidateTourOD:
     """Object to build a dataframe that produces both spatial and statistical plots to validate the tour origin and
     destinations align with input data.
@@ -1,14 +1,22 @@
 import logging
 from abc import ABC, abstractmethod
+from collections.abc import Iterable
+from copy import deepcopy
+from datetime import datetime
 from datetime import timedelta as td
-from typing import Optional
+from typing import NamedTuple, Optional, Union
 
 import numpy as np
+import pandas as pd
 
 from pam import utils
 from pam.activity import Activity, Leg, Plan
-from pam.core import Person
-from pam.variables import TRANSIT_MODES
+from pam.core import Person, Population
+from pam.variables import START_OF_DAY, TRANSIT_MODES
+
+PT_INTERACTIONS = ["pt interaction", "pt_interaction"]
+ONE_HOUR = td(hours=1)
+SECONDS_PER_DAY = 86400
 
 
 class PlanScorer(ABC):
@@ -49,6 +57,80 @@ class PlanScorer(ABC):
             float: Score.
         """
 
+    def score_components(
+        self,
+        plan: Plan,
+        cnfg: dict,
+        starts: Optional[np.ndarray] = None,
+        ends: Optional[np.ndarray] = None,
+    ) -> "PlanScores":
+        """Score each component of a plan, for use with `score_delta`.
+
+        Scorers that do not support scoring components separately score the whole plan as a single fixed term.
+
+        Args:
+            plan (Plan): Plan to be scored.
+            cnfg (dict): Scorer configuration.
+            starts (Optional[np.ndarray], optional): If given, start time of each component in seconds, instead of the plan times. Defaults to None.
+            ends (Optional[np.ndarray], optional): If given, end time of each component in seconds, instead of the plan times. Defaults to None.
+
+        Returns:
+            PlanScores: Component scores.
+        """
+        if starts is not None:
+            plan = set_plan_times(deepcopy(plan), starts, ends)
+        return PlanScores(components=np.zeros(len(plan)), fixed=self.score_plan(plan, cnfg))
+
+    def score_delta(
+        self,
+        plan: Plan,
+        cnfg: dict,
+        scores: "PlanScores",
+        starts: np.ndarray,
+        ends: np.ndarray,
+        changed: Iterable[int],
+    ) -> "PlanScores":
+        """Rescore a plan with new component times, recalculating only the scores of changed components.
+
+        The plan itself is not modified, proposed changes are given as arrays of component times.
+        Scorers that do not support scoring components separately rescore the whole plan.
+
+        Args:
+            plan (Plan): Plan to be scored.
+            cnfg (dict): Scorer configuration.
+            scores (PlanScores): Component scores of the plan, before changes, e.g. from `score_components`.
+            starts (np.ndarray): New start time of each component, in seconds.
+            ends (np.ndarray): New end time of each component, in seconds.
+            changed (Iterable[int]): Indices of the components whose times have changed.
+
+        Returns:
+            PlanScores: New component scores.
+        """
+        return self.score_components(plan, cnfg, starts, ends)
+
+    def score_plan_times(
+        self, plan: Plan, cnfg: dict, starts: np.ndarray, ends: np.ndarray
+    ) -> np.ndarray:
+        """Score many alternative schedules of a plan, given as arrays of component times.
+
+        Scorers that do not support vectorised scoring score each schedule in turn.
+
+        Args:
+            plan (Plan): Plan to be scored, not modified.
+            cnfg (dict): Scorer configuration.
+            starts (np.ndarray): (n_schedules, n_components) start times, in seconds.
+            ends (np.ndarray): (n_schedules, n_components) end times, in seconds.
+
+        Returns:
+            np.ndarray: (n_schedules,) score of each schedule.
+        """
+        return np.array(
+            [
+                self.score_components(plan, cnfg, plan_starts, plan_ends).total
+                for plan_starts, plan_ends in zip(starts, ends)
+            ]
+        )
+
 
 class CharyparNagelPlanScorer(PlanScorer):
     example_config = {
@@ -86,6 +168,10 @@ class CharyparNagelPlanScorer(PlanScorer):
         }
     }
 
+    def __init__(self, cnfg: dict) -> None:
+        super().__init__(cnfg)
+        self._compiled = {}
+
     def score_person(
         self, person: Person, key: str = "subpopulation", plan_costs: Optional[float] = None
     ) -> float:
@@ -115,6 +201,7 @@ class CharyparNagelPlanScorer(PlanScorer):
           float: Charypar-Nagel score
 
         """
+        cnfg = self.compile(cnfg)
         return (
             self.score_plan_activities(plan, cnfg)
             + self.score_plan_legs(plan, cnfg)
@@ -160,21 +247,47 @@ class CharyparNagelPlanScorer(PlanScorer):
                     f"\tTravel_distance_score: {self.travel_distance_score(component, cnfg=config)}"
                 )
 
+    def compile(self, cnfg: Union[dict, "CompiledScoringConfig"]) -> "CompiledScoringConfig":
+        """Get the compiled version of a (subpopulation) scoring configuration.
+
+        Configurations are compiled the first time they are used and then cached.
+        A cached configuration that has since been modified is compiled again (with a warning).
+
+        Args:
+            cnfg (Union[dict, CompiledScoringConfig]): scoring configuration, or an already compiled configuration.
+
+        Returns:
+            CompiledScoringConfig:
+        """
+        if isinstance(cnfg, CompiledScoringConfig):
+            return cnfg
+        cached = self._compiled.get(id(cnfg))
+        if cached is not None and cached[0] is cnfg:
+            if cached[1] == cnfg:
+                return cached[2]
+            self.logger.warning("Scoring configuration has changed since compiled, recompiling.")
+        cached = (cnfg, deepcopy(cnfg), compile_config(cnfg))
+        self._compiled[id(cnfg)] = cached
+        return cached[2]
+
+    def clear_compiled(self) -> None:
+        """Clear the cache of compiled configurations, e.g. after modifying a configuration."""
+        self._compiled = {}
+
     def score_plan_monetary_cost(self, plan_cost, cnfg) -> float:
         if plan_cost is not None:
-            return cnfg.get("mUM", 1) * plan_cost
+            return self.compile(cnfg).mum * plan_cost
         return 0.0
 
     def score_plan_daily(self, plan, cnfg) -> float:
-        modes = plan.mode_classes
-        return sum([self.score_day_mode_use(mode, cnfg) for mode in modes])
+        cnfg = self.compile(cnfg)
+        return sum([self.score_day_mode_use(mode, cnfg) for mode in plan.mode_classes])
 
     def score_day_mode_use(self, mode, cnfg) -> float:
-        return cnfg[mode].get("dailyUtilityConstant", 0) + (
-            cnfg[mode].get("dailyMonetaryConstant", 0) * cnfg.get("mUM", 1)
-        )
+        return self.compile(cnfg).modes[mode].daily
 
     def score_plan_activities(self, plan, cnfg):
+        cnfg = self.compile(cnfg)
         activities = list(plan.activities)
         if len(activities) == 1:
             return self.score_activity(activities[0], cnfg)
@@ -184,18 +297,27 @@ class CharyparNagelPlanScorer(PlanScorer):
             # see https://github.com/matsim-org/matsim-libs/blob/77536f9f05ff70b69bdf54f19604f5732d81949c/matsim/src/main/java/org/matsim/core/scoring/functions/CharyparNagelActivityScoring.java#L241-L265
             score = sum(
                 [
-                    self.score_activity(act, cnfg)
+                    self._score_activity(
+                        act.act, _seconds(act.start_time), _seconds(act.end_time), cnfg
+                    )
                     for act in activities
-                    if act.act not in ["pt interaction", "pt_interaction"]
+                    if act.act not in PT_INTERACTIONS
                 ]
             )
         else:
-            wrapped_activity, other_activities = self.activities_wrapper(activities)
-            score = self.score_activity(wrapped_activity, cnfg) + sum(
+            wrapped_score = self._score_activity(
+                activities[0].act,
+                _seconds(activities[-1].start_time),
+                _seconds(activities[0].end_time) + SECONDS_PER_DAY,
+                cnfg,
+            )
+            score = wrapped_score + sum(
                 [
-                    self.score_activity(act, cnfg)
-                    for act in other_activities
-                    if act.act not in ["pt interaction", "pt_interaction"]
+                    self._score_activity(
+                        act.act, _seconds(act.start_time), _seconds(act.end_time), cnfg
+                    )
+                    for act in activities[1:-1]
+                    if act.act not in PT_INTERACTIONS
                 ]
             )
 
@@ -211,16 +333,29 @@ class CharyparNagelPlanScorer(PlanScorer):
         return wrapped_act, non_wrapped
 
     def score_activity(self, activity, cnfg):
+        return self._score_activity(
+            activity.act,
+            _seconds(activity.start_time),
+            _seconds(activity.end_time),
+            self.compile(cnfg),
+        )
+
+    def _score_activity(
+        self, act: str, start: float, end: float, cnfg: "CompiledScoringConfig"
+    ) -> float:
+        """Score an activity, with start and end times in seconds from the start of the day."""
+        params = cnfg.activities[act]
         return sum(
             [
-                self.duration_score(activity, cnfg),
-                self.waiting_score(activity, cnfg),
-                self.late_arrival_score(activity, cnfg),
-                self.early_departure_score(activity, cnfg),
+                self._duration_score(params, start, end, cnfg),
+                self._waiting_score(params, start, cnfg),
+                self._late_arrival_score(params, start, cnfg),
+                self._early_departure_score(params, end, cnfg),
             ]
         )
 
     def score_plan_legs(self, plan, cnfg):
+        cnfg = self.compile(cnfg)
         return self.score_pt_interchanges(plan, cnfg) + sum(
             [self.score_leg(leg, cnfg) for leg in plan.legs]
         )
@@ -235,13 +370,14 @@ class CharyparNagelPlanScorer(PlanScorer):
         Returns:
             float:
         """
-        if not cnfg.get("utilityOfLineSwitch"):
+        cnfg = self.compile(cnfg)
+        if not cnfg.line_switch:
             return 0.0
         transits = []
         in_transit = 0
         for i in plan:
             if isinstance(i, Activity):
-                if i.act not in ["pt interaction", "pt_interaction"]:
+                if i.act not in PT_INTERACTIONS:
                     if in_transit > 0:
                         in_transit -= 1  # the first PT vehicle does not incur a line switch penalty
                     transits.append(in_transit)
@@ -250,110 +386,829 @@ class CharyparNagelPlanScorer(PlanScorer):
                 if i.mode in TRANSIT_MODES:
                     # number of PT modes used in each trip
                     in_transit += 1
-        cost = sum(transits) * cnfg.get("utilityOfLineSwitch", 0)
+        cost = sum(transits) * cnfg.line_switch
         return cost
 
     def score_leg(self, leg, cnfg):
+        cnfg = self.compile(cnfg)
+        params = cnfg.modes[leg.mode]
+        waiting = self._pt_waiting_hours(leg, cnfg)
         return sum(
             [
-                self.pt_waiting_time_score(leg, cnfg),
-                self.mode_constant_score(leg, cnfg),
-                self.travel_time_score(leg, cnfg),
-                self.travel_distance_score(leg, cnfg),
+                cnfg.waiting_pt * waiting if waiting > 0 else 0.0,
+                params.constant,
+                (leg.hours - waiting) * params.marginal_utility_of_travelling,
+                leg.distance * params.distance_rate,
             ]
         )
 
     def duration_score(self, activity, cnfg) -> float:
-        prio = 1
-        performing = cnfg["performing"]
-        typical_dur = utils.matsim_duration_to_hours(cnfg[activity.act]["typicalDuration"])
-
-        opening_time = cnfg[activity.act].get("openingTime")
-        if opening_time is not None:
-            opening_time = utils.matsim_time_to_datetime(opening_time)
-            if opening_time.time() > activity.start_time.time():
-                actual_start_time = opening_time
-            else:
-                actual_start_time = activity.start_time
+        cnfg = self.compile(cnfg)
+        return self._duration_score(
+            cnfg.activities[activity.act],
+            _seconds(activity.start_time),
+            _seconds(activity.end_time),
+            cnfg,
+        )
+
+    @staticmethod
+    def _duration_score(
+        params: "ActivityScoringParams", start: float, end: float, cnfg: "CompiledScoringConfig"
+    ) -> float:
+        if params.opening is not None and params.opening_tod > start % SECONDS_PER_DAY:
+            actual_start = params.opening
         else:
-            actual_start_time = activity.start_time
+            actual_start = start
 
-        closing_time = cnfg[activity.act].get("closingTime")
-        if closing_time is not None:
-            closing_time = utils.matsim_time_to_datetime(closing_time)
-            if closing_time.time() < activity.end_time.time():
-                actual_end_time = closing_time
-            else:
-                actual_end_time = activity.end_time
+        if params.closing is not None and params.closing_tod < end % SECONDS_PER_DAY:
+            actual_end = params.closing
         else:
-            actual_end_time = activity.end_time
+            actual_end = end
 
-        if actual_end_time < actual_start_time or actual_start_time > actual_end_time:
+        if actual_end < actual_start:
             duration = 0
         else:
-            duration = (actual_end_time - actual_start_time) / td(hours=1)
+            duration = (actual_end - actual_start) / 3600
 
-        if duration < typical_dur / np.e:
-            return (duration * np.e - typical_dur) * performing
+        if duration < params.typical_duration_threshold:
+            return (duration * np.e - params.typical_duration) * cnfg.performing
 
-        return performing * typical_dur * (np.log(duration / typical_dur) + (1 / prio))
+        return params.performing_typical_duration * (np.log(duration / params.typical_duration) + 1)
 
     def waiting_score(self, activity, cnfg) -> float:
-        waiting = cnfg["waiting"]
-        if not waiting:
-            return 0.0
-        opening_time = cnfg[activity.act].get("openingTime")
-        if opening_time is None:
+        cnfg = self.compile(cnfg)
+        return self._waiting_score(
+            cnfg.activities[activity.act], _seconds(activity.start_time), cnfg
+        )
+
+    @staticmethod
+    def _waiting_score(
+        params: "ActivityScoringParams", start: float, cnfg: "CompiledScoringConfig"
+    ) -> float:
+        if not cnfg.waiting or params.opening is None:
             return 0.0
-        opening_dt = utils.matsim_time_to_datetime(opening_time)
-        start_dt = activity.start_time
-        if start_dt.time() < opening_dt.time():
-            return waiting * ((opening_dt - start_dt) / td(hours=1))
+        if start % SECONDS_PER_DAY < params.opening_tod:
+            return cnfg.waiting * ((params.opening - start) / 3600)
         return 0.0
 
     def late_arrival_score(self, activity, cnfg) -> float:
-        if cnfg[activity.act].get("latestStartTime") is not None and cnfg.get("lateArrival"):
-            latest_start_time = utils.matsim_time_to_datetime(cnfg[activity.act]["latestStartTime"])
-            if activity.start_time.time() > latest_start_time.time():
-                return cnfg["lateArrival"] * (
-                    (activity.start_time - latest_start_time) / td(hours=1)
-                )
+        cnfg = self.compile(cnfg)
+        return self._late_arrival_score(
+            cnfg.activities[activity.act], _seconds(activity.start_time), cnfg
+        )
+
+    @staticmethod
+    def _late_arrival_score(
+        params: "ActivityScoringParams", start: float, cnfg: "CompiledScoringConfig"
+    ) -> float:
+        if params.latest_start is not None and cnfg.late_arrival:
+            if start % SECONDS_PER_DAY > params.latest_start_tod:
+                return cnfg.late_arrival * ((start - params.latest_start) / 3600)
         return 0.0
 
     def early_departure_score(self, activity, cnfg) -> float:
-        if cnfg[activity.act].get("earliestEndTime") is not None and cnfg.get("earlyDeparture"):
-            earliest_end_time = utils.matsim_time_to_datetime(cnfg[activity.act]["earliestEndTime"])
-            if activity.end_time.time() < earliest_end_time.time():
-                return cnfg["earlyDeparture"] * (
-                    (earliest_end_time - activity.end_time) / td(hours=1)
-                )
+        cnfg = self.compile(cnfg)
+        return self._early_departure_score(
+            cnfg.activities[activity.act], _seconds(activity.end_time), cnfg
+        )
+
+    @staticmethod
+    def _early_departure_score(
+        params: "ActivityScoringParams", end: float, cnfg: "CompiledScoringConfig"
+    ) -> float:
+        if params.earliest_end is not None and cnfg.early_departure:
+            if end % SECONDS_PER_DAY < params.earliest_end_tod:
+                return cnfg.early_departure * ((params.earliest_end - end) / 3600)
         return 0.0
 
     def too_short_score(self, activity, cnfg) -> float:
-        if cnfg[activity.act].get("minimalDuration") and cnfg.get("earlyDeparture"):
-            minimal_duration = utils.matsim_duration_to_hours(cnfg[activity.act]["minimalDuration"])
-            if activity.hours < minimal_duration:
-                return cnfg["earlyDeparture"] * (minimal_duration - activity.hours)
+        cnfg = self.compile(cnfg)
+        params = cnfg.activities[activity.act]
+        if params.minimal_duration and cnfg.early_departure:
+            if activity.hours < params.minimal_duration:
+                return cnfg.early_departure * (params.minimal_duration - activity.hours)
         return 0.0
 
+    def _pt_waiting_hours(self, leg, cnfg: "CompiledScoringConfig") -> float:
+        if cnfg.waiting_pt:
+            boarding_time = leg.boarding_time
+            if boarding_time:
+                return (boarding_time - leg.start_time) / ONE_HOUR
+        return 0
+
     def pt_waiting_time_score(self, leg, cnfg):
-        if cnfg.get("waitingPt") and leg.boarding_time:
-            waiting = (leg.boarding_time - leg.start_time) / td(hours=1)
-            if waiting > 0:
-                return cnfg["waitingPt"] * waiting
+        cnfg = self.compile(cnfg)
+        waiting = self._pt_waiting_hours(leg, cnfg)
+        if waiting > 0:
+            return cnfg.waiting_pt * waiting
         return 0.0
 
     def mode_constant_score(self, leg, cnfg):
-        return cnfg[leg.mode].get("constant", 0.0)
+        return self.compile(cnfg).modes[leg.mode].constant
 
     def travel_time_score(self, leg, cnfg) -> float:
-        duration = leg.hours
-        if cnfg.get("waitingPt") and leg.boarding_time:
-            duration -= (leg.boarding_time - leg.start_time) / td(hours=1)
-        return duration * cnfg[leg.mode].get("marginalUtilityOfTravelling", 0.0)
+        cnfg = self.compile(cnfg)
+        return (leg.hours - self._pt_waiting_hours(leg, cnfg)) * cnfg.modes[
+            leg.mode
+        ].marginal_utility_of_travelling
 
     def travel_distance_score(self, leg, cnfg) -> float:
-        return leg.distance * (
-            cnfg[leg.mode].get("marginalUtilityOfDistance", 0.0)
-            + (cnfg.get("mUM", 1.0) * cnfg[leg.mode].get("monetaryDistanceRate", 0.0))
+        return leg.distance * self.compile(cnfg).modes[leg.mode].distance_rate
+
+    def score_components(
+        self,
+        plan: Plan,
+        cnfg: dict,
+        starts: Optional[np.ndarray] = None,
+        ends: Optional[np.ndarray] = None,
+    ) -> "PlanScores":
+        """Score each activity and leg of a plan, for use with `score_delta`.
+
+        Pt interactions score 0. If the first and last activities are wrapped, their (single) score is given to the first activity.
+        Pt line switch and daily mode scores do not depend on times, so are a fixed term.
+
+        Args:
+          plan (Plan): activity plan to be scored.
+          cnfg (dict): configuration for plan scoring.
+          starts (Optional[np.ndarray], optional): If given, start time of each component in seconds, instead of the plan times. Defaults to None.
+          ends (Optional[np.ndarray], optional): If given, end time of each component in seconds, instead of the plan times. Defaults to None.
+
+        Returns:
+            PlanScores: component scores.
+        """
+        cnfg = self.compile(cnfg)
+        if starts is None:
+            starts, ends = plan_times(plan)
+        components = np.array(
+            [self._score_component(plan, i, starts, ends, cnfg) for i in range(len(plan))]
+        )
+        fixed = self.score_pt_interchanges(plan, cnfg) + self.score_plan_daily(plan, cnfg)
+        return PlanScores(components=components, fixed=fixed)
+
+    def score_delta(
+        self,
+        plan: Plan,
+        cnfg: dict,
+        scores: "PlanScores",
+        starts: np.ndarray,
+        ends: np.ndarray,
+        changed: Iterable[int],
+    ) -> "PlanScores":
+        """Rescore a plan with new component times, recalculating only the changed activities and legs.
+
+        If the last activity is changed and wrapped with the first, the wrapped (first) activity is rescored.
+
+        Args:
+          plan (Plan): activity plan, not modified.
+          cnfg (dict): configuration for plan scoring.
+          scores (PlanScores): component scores of the plan, before changes, e.g. from `score_components`.
+          starts (np.ndarray): new start time of each component, in seconds.
+          ends (np.ndarray): new end time of each component, in seconds.
+          changed (Iterable[int]): indices of the components whose times have changed.
+
+        Returns:
+            PlanScores: new component scores.
+        """
+        cnfg = self.compile(cnfg)
+        changed = set(changed)
+        if len(plan) - 1 in changed and self._wrapped(plan):
+            changed.add(0)
+        components = scores.components.copy()
+        for i in changed:
+            components[i] = self._score_component(plan, i, starts, ends, cnfg)
+        return PlanScores(components=components, fixed=scores.fixed)
+
+    @staticmethod
+    def _wrapped(plan: Plan) -> bool:
+        """As per `score_plan_activities`, the first and last activities are scored as one if of the same type."""
+        return len(plan) > 1 and plan.day[0].act == plan.day[-1].act
+
+    def _score_component(
+        self,
+        plan: Plan,
+        i: int,
+        starts: np.ndarray,
+        ends: np.ndarray,
+        cnfg: "CompiledScoringConfig",
+    ) -> float:
+        component = plan.day[i]
+        if isinstance(component, Leg):
+            return self._score_leg_times(component, starts[i], ends[i], cnfg)
+        if len(plan) == 1:
+            return self._score_activity(component.act, float(starts[i]), float(ends[i]), cnfg)
+        if self._wrapped(plan):
+            last = len(plan) - 1
+            if i == last:
+                return 0.0
+            if i == 0:
+                return self._score_activity(
+                    component.act, float(starts[last]), float(ends[0]) + SECONDS_PER_DAY, cnfg
+                )
+        if component.act in PT_INTERACTIONS:
+            return 0.0
+        return self._score_activity(component.act, float(starts[i]), float(ends[i]), cnfg)
+
+    def _score_leg_times(
+        self, leg: Leg, start: float, end: float, cnfg: "CompiledScoringConfig"
+    ) -> float:
+        params = cnfg.modes[leg.mode]
+        waiting = 0
+        if cnfg.waiting_pt:
+            boarding_time = leg.boarding_time
+            if boarding_time:
+                waiting = ((boarding_time - START_OF_DAY).total_seconds() - start) / 3600
+        return sum(
+            [
+                cnfg.waiting_pt * waiting if waiting > 0 else 0.0,
+                params.constant,
+                ((end - start) / 3600 - waiting) * params.marginal_utility_of_travelling,
+                leg.distance * params.distance_rate,
+            ]
+        )
+
+    def score_activity_times(
+        self, act: str, starts: np.ndarray, ends: np.ndarray, cnfg: dict
+    ) -> np.ndarray:
+        """Score an activity of the given type for many start and end times at once.
+
+        Args:
+          act (str): activity type.
+          starts (np.ndarray): start times, in seconds from the start of the day.
+          ends (np.ndarray): end times, in seconds from the start of the day, broadcast with `starts`.
+          cnfg (dict): configuration for plan scoring.
+
+        Returns:
+            np.ndarray: activity scores, of the broadcast shape of `starts` and `ends`.
+        """
+        cnfg = self.compile(cnfg)
+        return _activity_scores(
+            np.asarray(starts, dtype=float),
+            np.asarray(ends, dtype=float),
+            _activity_fields(cnfg.activities[act]),
+            performing=cnfg.performing,
+            waiting=cnfg.waiting or 0.0,
+            late_arrival=cnfg.late_arrival or 0.0,
+            early_departure=cnfg.early_departure or 0.0,
+        )
+
+    def score_leg_departures(self, leg: Leg, departures: np.ndarray, cnfg: dict) -> np.ndarray:
+        """Score a leg for many departure times at once, keeping its duration (and any pt boarding time).
+
+        Args:
+          leg (Leg): leg to be scored.
+          departures (np.ndarray): leg start times, in seconds from the start of the day.
+          cnfg (dict): configuration for plan scoring.
+
+        Returns:
+            np.ndarray: leg scores, of the shape of `departures`.
+        """
+        departures = np.asarray(departures, dtype=float)
+        return self._leg_scores(
+            leg, departures, departures + leg.duration.total_seconds(), self.compile(cnfg)
+        )
+
+    def score_plan_times(
+        self, plan: Plan, cnfg: dict, starts: np.ndarray, ends: np.ndarray
+    ) -> np.ndarray:
+        """Score many alternative schedules of a plan at once, given as arrays of component times.
+
+        Each activity and leg is scored for all schedules at once.
+
+        Args:
+          plan (Plan): activity plan, not modified.
+          cnfg (dict): configuration for plan scoring.
+          starts (np.ndarray): (n_schedules, n_components) start times, in seconds.
+          ends (np.ndarray): (n_schedules, n_components) end times, in seconds.
+
+        Returns:
+            np.ndarray: (n_schedules,) score of each schedule.
+        """
+        cnfg = self.compile(cnfg)
+        starts = np.asarray(starts, dtype=float)
+        ends = np.asarray(ends, dtype=float)
+        scores = np.full(len(starts), self.score_pt_interchanges(plan, cnfg), dtype=float)
+        scores += self.score_plan_daily(plan, cnfg)
+        wrapped = self._wrapped(plan)
+        last = len(plan) - 1
+        for i, component in enumerate(plan.day):
+            if isinstance(component, Leg):
+                scores += self._leg_scores(component, starts[:, i], ends[:, i], cnfg)
+            elif wrapped and i == 0:
+                scores += self.score_activity_times(
+                    component.act, starts[:, last], ends[:, 0] + SECONDS_PER_DAY, cnfg
+                )
+            elif wrapped and i == last:
+                continue
+            elif last == 0 or component.act not in PT_INTERACTIONS:
+                scores += self.score_activity_times(component.act, starts[:, i], ends[:, i], cnfg)
+        return scores
+
+    @staticmethod
+    def _leg_scores(
+        leg: Leg, starts: np.ndarray, ends: np.ndarray, cnfg: "CompiledScoringConfig"
+    ) -> np.ndarray:
+        params = cnfg.modes[leg.mode]
+        boarding = leg.boarding_time if cnfg.waiting_pt else None
+        if boarding is not None:
+            waiting = ((boarding - START_OF_DAY).total_seconds() - starts) / 3600
+        else:
+            waiting = np.zeros_like(starts)
+        return (
+            np.where(waiting > 0, (cnfg.waiting_pt or 0.0) * waiting, 0.0)
+            + params.constant
+            + ((ends - starts) / 3600 - waiting) * params.marginal_utility_of_travelling
+            + leg.distance * params.distance_rate
+        )
+
+    def score_population(self, population: Population, key: str = "subpopulation") -> pd.Series:
+        """Score all persons of a population at once, using `score_arrays`.
+
+        Args:
+          population (Population):
+          key (str, optional): person attribute name for subpopulation. Defaults to "subpopulation".
+
+        Returns:
+            pd.Series: Charypar-Nagel score of each person, indexed by household and person id.
+        """
+        index, plans, subpops = [], [], []
+        for hid, pid, person in population.people():
+            index.append((hid, pid))
+            plans.append(person.plan)
+            subpops.append(person.attributes[key])
+        scores = self.score_arrays(plans_to_scoring_arrays(plans, subpops))
+        return pd.Series(
+            scores, index=pd.MultiIndex.from_tuples(index, names=["hid", "pid"]), name="score"
+        )
+
+    def score_arrays(
+        self, arrays: "ScoringArrays", plan_costs: Optional[np.ndarray] = None
+    ) -> np.ndarray:
+        """Score many plans at once, given as flat arrays of activities and legs.
+
+        Equivalent to `score_plan` for each plan, with the activity, leg, line switch and daily mode terms calculated
+        for all activities and legs at once.
+        As per `score_plan_activities`, the first and last activities of a plan are scored as a single (wrapped) activity
+        if they are of the same type.
+
+        Args:
+          arrays (ScoringArrays): activities and legs of the plans, e.g. from `plans_to_scoring_arrays`.
+          plan_costs (Optional[np.ndarray], optional): (n_persons,) plan monetary costs. Defaults to None.
+
+        Returns:
+            np.ndarray: (n_persons,) Charypar-Nagel score of each plan.
+        """
+        configs = [self.compile(self.cnfg[label]) for label in arrays.subpopulation_labels]
+
+        def subpop_param(name: str) -> np.ndarray:
+            return np.array([getattr(cnfg, name) or 0.0 for cnfg in configs], dtype=float)
+
+        activity_scores = self._score_activity_arrays(arrays, configs, subpop_param)
+        scores = activity_scores + self._score_leg_arrays(arrays, configs, subpop_param)
+        if plan_costs is not None:
+            scores += subpop_param("mum")[arrays.subpopulations] * plan_costs
+        return scores
+
+    @staticmethod
+    def _score_activity_arrays(arrays: "ScoringArrays", configs, subpop_param) -> np.ndarray:
+        n_persons = len(arrays.subpopulations)
+        person = arrays.act_person
+        counts = np.bincount(person, minlength=n_persons)
+        first = np.concatenate([[0], np.cumsum(counts)[:-1]])[counts > 0]
+        last = np.cumsum(counts)[counts > 0] - 1
+
+        code = arrays.act_code
+        start = arrays.act_start.copy()
+        end = arrays.act_end.copy()
+        interaction = np.isin(
+            code, [i for i, a in enumerate(arrays.act_labels) if a in PT_INTERACTIONS]
+        )
+        scored = ~interaction
+        single = first == last
+        wrapped = ~single & (code[first] == code[last])
+        # the first and last activity are scored as a single wrapped activity
+        start[first[wrapped]] = arrays.act_start[last[wrapped]]
+        end[first[wrapped]] = arrays.act_end[first[wrapped]] + SECONDS_PER_DAY
+        scored[first[single | wrapped]] = True
+        scored[last[wrapped]] = False
+
+        person, code, start, end = person[scored], code[scored], start[scored], end[scored]
+        subpop = arrays.subpopulations[person]
+        tables, found = _activity_tables(configs, arrays.act_labels)
+        _check_found(found, subpop, code, arrays, arrays.act_labels)
+        params = {field: table[subpop, code] for field, table in tables.items()}
+        scores = _activity_scores(
+            start,
+            end,
+            params,
+            performing=subpop_param("performing")[subpop],
+            waiting=subpop_param("waiting")[subpop],
+            late_arrival=subpop_param("late_arrival")[subpop],
+            early_departure=subpop_param("early_departure")[subpop],
+        )
+        return np.bincount(person, weights=scores, minlength=n_persons)
+
+    @staticmethod
+    def _score_leg_arrays(arrays: "ScoringArrays", configs, subpop_param) -> np.ndarray:
+        n_persons = len(arrays.subpopulations)
+        person = arrays.leg_person
+        mode = arrays.leg_mode
+        subpop = arrays.subpopulations[person]
+        tables, found = _mode_tables(configs, arrays.mode_labels)
+        _check_found(found, subpop, mode, arrays, arrays.mode_labels)
+
+        waiting_pt = subpop_param("waiting_pt")[subpop]
+        waiting = np.where(
+            (waiting_pt != 0) & ~np.isnan(arrays.leg_boarding),
+            (arrays.leg_boarding - arrays.leg_start) / 3600,
+            0.0,
+        )
+        hours = (arrays.leg_end - arrays.leg_start) / 3600
+        leg_score = (
+            np.where(waiting > 0, waiting_pt * waiting, 0.0)
+            + tables["constant"][subpop, mode]
+            + (hours - waiting) * tables["marginal_utility_of_travelling"][subpop, mode]
+            + arrays.leg_distance * tables["distance_rate"][subpop, mode]
+        )
+        scores = np.bincount(person, weights=leg_score, minlength=n_persons).astype(float)
+
+        # line switches, as the number of transit legs after the first, in each trip
+        act_counts = np.bincount(arrays.act_person, minlength=n_persons)
+        leg_counts = np.bincount(person, minlength=n_persons)
+        act_offsets = np.concatenate([[0], np.cumsum(act_counts)[:-1]])
+        leg_offsets = np.concatenate([[0], np.cumsum(leg_counts)[:-1]])
+        # index of the activity preceding each leg
+        previous_act = act_offsets[person] + np.arange(len(person)) - leg_offsets[person]
+        interaction = np.isin(
+            arrays.act_code, [i for i, a in enumerate(arrays.act_labels) if a in PT_INTERACTIONS]
+        )
+        trip = np.cumsum(~interaction)[previous_act] - 1
+        transit = np.isin(mode, [i for i, m in enumerate(arrays.mode_labels) if m in TRANSIT_MODES])
+        n_transit = np.bincount(trip, weights=transit, minlength=len(interaction))
+        trip_person = arrays.act_person[~interaction]
+        line_switches = np.bincount(
+            trip_person,
+            weights=np.maximum(n_transit[: len(trip_person)] - 1, 0),
+            minlength=n_persons,
+        )
+        scores += subpop_param("line_switch")[arrays.subpopulations] * line_switches
+
+        # daily constants, for each mode used
+        used = np.unique(person * len(arrays.mode_labels) + mode)
+        used_person, used_mode = np.divmod(used, len(arrays.mode_labels))
+        scores += np.bincount(
+            used_person,
+            weights=tables["daily"][arrays.subpopulations[used_person], used_mode],
+            minlength=n_persons,
+        )
+        return scores
+
+
+class ActivityScoringParams(NamedTuple):
+    """Compiled scoring parameters of an activity type, with times in seconds from the start of the day."""
+
+    typical_duration: float  # hours
+    typical_duration_threshold: float  # typical duration / e, hours
+    performing_typical_duration: float  # marginal utility of performing * typical duration
+    opening: Optional[float]
+    opening_tod: Optional[float]  # time of day, seconds
+    closing: Optional[float]
+    closing_tod: Optional[float]
+    latest_start: Optional[float]
+    latest_start_tod: Optional[float]
+    earliest_end: Optional[float]
+    earliest_end_tod: Optional[float]
+    minimal_duration: Optional[float]  # hours
+
+
+class ModeScoringParams(NamedTuple):
+    """Compiled scoring parameters of a mode."""
+
+    constant: float
+    marginal_utility_of_travelling: float
+    distance_rate: float  # marginal utility of distance, including monetary distance rate
+    daily: float  # daily utility, including daily monetary constant
+
+
+class CompiledScoringConfig(NamedTuple):
+    """Compiled (subpopulation) scoring configuration, with parsed parameters for each activity type and mode."""
+
+    mum: float
+    line_switch: float
+    performing: float
+    waiting: float
+    waiting_pt: float
+    late_arrival: float
+    early_departure: float
+    activities: dict[str, ActivityScoringParams]
+    modes: dict[str, ModeScoringParams]
+
+
+def compile_config(cnfg: dict) -> CompiledScoringConfig:
+    """Compile a (subpopulation) Charypar-Nagel scoring configuration.
+
+    Activity times are parsed once, to seconds from the start of the day, durations to hours, and mode parameters are combined.
+
+    Args:
+        cnfg (dict): scoring configuration, refer to `CharyparNagelPlanScorer.example_config` for example.
+
+    Returns:
+        CompiledScoringConfig:
+    """
+    performing = cnfg.get("performing")
+    mum = cnfg.get("mUM", 1)
+    activities = {}
+    modes = {}
+    for key, params in cnfg.items():
+        if not isinstance(params, dict):
+            continue
+        modes[key] = ModeScoringParams(
+            constant=params.get("constant", 0.0),
+            marginal_utility_of_travelling=params.get("marginalUtilityOfTravelling", 0.0),
+            distance_rate=params.get("marginalUtilityOfDistance", 0.0)
+            + (cnfg.get("mUM", 1.0) * params.get("monetaryDistanceRate", 0.0)),
+            daily=params.get("dailyUtilityConstant", 0)
+            + (params.get("dailyMonetaryConstant", 0) * mum),
+        )
+        if "typicalDuration" not in params:
+            continue
+        typical_duration = utils.matsim_duration_to_hours(params["typicalDuration"])
+        times = {}
+        for name in ["openingTime", "closingTime", "latestStartTime", "earliestEndTime"]:
+            time = params.get(name)
+            times[name] = None if time is None else _seconds(utils.matsim_time_to_datetime(time))
+        minimal_duration = params.get("minimalDuration")
+        activities[key] = ActivityScoringParams(
+            typical_duration=typical_duration,
+            typical_duration_threshold=typical_duration / np.e,
+            performing_typical_duration=(
+                performing * typical_duration if performing is not None else None
+            ),
+            opening=times["openingTime"],
+            opening_tod=_time_of_day(times["openingTime"]),
+            closing=times["closingTime"],
+            closing_tod=_time_of_day(times["closingTime"]),
+            latest_start=times["latestStartTime"],
+            latest_start_tod=_time_of_day(times["latestStartTime"]),
+            earliest_end=times["earliestEndTime"],
+            earliest_end_tod=_time_of_day(times["earliestEndTime"]),
+            minimal_duration=(
+                utils.matsim_duration_to_hours(minimal_duration) if minimal_duration else None
+            ),
+        )
+
+    return CompiledScoringConfig(
+        mum=mum,
+        line_switch=cnfg.get("utilityOfLineSwitch"),
+        performing=performing,
+        waiting=cnfg.get("waiting"),
+        waiting_pt=cnfg.get("waitingPt"),
+        late_arrival=cnfg.get("lateArrival"),
+        early_departure=cnfg.get("earlyDeparture"),
+        activities=activities,
+        modes=modes,
+    )
+
+
+def _seconds(time: datetime) -> float:
+    return (time - START_OF_DAY).total_seconds()
+
+
+def _time_of_day(seconds: Optional[float]) -> Optional[float]:
+    return None if seconds is None else seconds % SECONDS_PER_DAY
+
+
+class PlanScores(NamedTuple):
+    """Score of each component of a plan, for incremental (delta) scoring."""
+
+    components: np.ndarray  # (n_components,) score of each activity and leg
+    fixed: float  # time independent terms
+
+    @property
+    def total(self) -> float:
+        return float(self.components.sum()) + self.fixed
+
+
+def plan_times(plan: Plan) -> tuple[np.ndarray, np.ndarray]:
+    """Start and end time of each component of a plan, in seconds from the start of the day.
+
+    Args:
+        plan (Plan):
+
+    Returns:
+        tuple[np.ndarray, np.ndarray]: start times and end times.
+    """
+    starts = np.array([(c.start_time - START_OF_DAY).total_seconds() for c in plan.day])
+    ends = np.array([(c.end_time - START_OF_DAY).total_seconds() for c in plan.day])
+    return starts, ends
+
+
+def set_plan_times(plan: Plan, starts: np.ndarray, ends: np.ndarray) -> Plan:
+    """Set the start and end time of each component of a plan, in place.
+
+    Args:
+        plan (Plan):
+        starts (np.ndarray): start time of each component, in seconds from the start of the day.
+        ends (np.ndarray): end time of each component, in seconds from the start of the day.
+
+    Returns:
+        Plan: the updated plan.
+    """
+    for component, start, end in zip(plan.day, starts, ends):
+        component.start_time = _seconds_to_datetime(start)
+        component.end_time = _seconds_to_datetime(end)
+    return plan
+
+
+def _seconds_to_datetime(seconds: float) -> datetime:
+    return START_OF_DAY + td(seconds=float(seconds))
+
+
+class ScoringArrays(NamedTuple):
+    """Activities and legs of many plans as flat arrays, for vectorised scoring.
+
+    Activities and legs are ordered by person, then by plan sequence, such that the k-th leg of a person
+    is between the k-th and (k+1)-th activities of that person. Times are in seconds from the start of the day.
+    Codes index the corresponding labels.
+    """
+
+    subpopulations: np.ndarray  # (n_persons,) subpopulation code of each person
+    act_person: np.ndarray  # (n_acts,) person index of each activity
+    act_code: np.ndarray  # (n_acts,) activity type code
+    act_start: np.ndarray  # (n_acts,) seconds
+    act_end: np.ndarray  # (n_acts,) seconds
+    leg_person: np.ndarray  # (n_legs,) person index of each leg
+    leg_mode: np.ndarray  # (n_legs,) mode code
+    leg_start: np.ndarray  # (n_legs,) seconds
+    leg_end: np.ndarray  # (n_legs,) seconds
+    leg_distance: np.ndarray  # (n_legs,) metres
+    leg_boarding: np.ndarray  # (n_legs,) pt boarding time in seconds, nan if none
+    subpopulation_labels: list[str]
+    act_labels: list[str]
+    mode_labels: list[str]
+
+
+def plans_to_scoring_arrays(plans: list[Plan], subpopulations: list[str]) -> ScoringArrays:
+    """Extract activities and legs of plans as flat arrays, for use with `CharyparNagelPlanScorer.score_arrays`.
+
+    Args:
+        plans (list[Plan]): plans of alternating activities and legs.
+        subpopulations (list[str]): subpopulation of each plan.
+
+    Returns:
+        ScoringArrays:
+    """
+    acts = {}
+    modes = {}
+    subpops = {}
+    act_person, act_code, act_start, act_end = [], [], [], []
+    leg_person, leg_mode, leg_start, leg_end, leg_distance, leg_boarding = [], [], [], [], [], []
+    for p, plan in enumerate(plans):
+        for component in plan.day:
+            start = (component.start_time - START_OF_DAY).total_seconds()
+            end = (component.end_time - START_OF_DAY).total_seconds()
+            if isinstance(component, Activity):
+                act_person.append(p)
+                act_code.append(acts.setdefault(component.act, len(acts)))
+                act_start.append(start)
+                act_end.append(end)
+            else:
+                leg_person.append(p)
+                leg_mode.append(modes.setdefault(component.mode, len(modes)))
+                leg_start.append(start)
+                leg_end.append(end)
+                leg_distance.append(component.distance)
+                boarding = component.boarding_time
+                leg_boarding.append(
+                    np.nan if boarding is None else (boarding - START_OF_DAY).total_seconds()
+                )
+
+    return ScoringArrays(
+        subpopulations=np.array(
+            [subpops.setdefault(subpop, len(subpops)) for subpop in subpopulations], dtype=int
+        ),
+        act_person=np.array(act_person, dtype=int),
+        act_code=np.array(act_code, dtype=int),
+        act_start=np.array(act_start, dtype=float),
+        act_end=np.array(act_end, dtype=float),
+        leg_person=np.array(leg_person, dtype=int),
+        leg_mode=np.array(leg_mode, dtype=int),
+        leg_start=np.array(leg_start, dtype=float),
+        leg_end=np.array(leg_end, dtype=float),
+        leg_distance=np.array(leg_distance, dtype=float),
+        leg_boarding=np.array(leg_boarding, dtype=float),
+        subpopulation_labels=list(subpops),
+        act_labels=list(acts),
+        mode_labels=list(modes),
+    )
+
+
+def _activity_fields(params: ActivityScoringParams) -> dict[str, float]:
+    """Activity parameters as used for vectorised scoring, with times in seconds (nan if not set)."""
+
+    def seconds(time: Optional[float]) -> float:
+        return np.nan if time is None else time
+
+    return {
+        "typical_duration": params.typical_duration,
+        "threshold": params.typical_duration_threshold,
+        "performing_typical_duration": params.performing_typical_duration,
+        "opening": seconds(params.opening),
+        "closing": seconds(params.closing),
+        "latest_start": seconds(params.latest_start),
+        "earliest_end": seconds(params.earliest_end),
+    }
+
+
+def _activity_tables(
+    configs: list[CompiledScoringConfig], labels: list[str]
+) -> tuple[dict[str, np.ndarray], np.ndarray]:
+    """(n_subpopulations, n_act_labels) tables of activity parameters, with times in seconds (nan if not set)."""
+    tables = {}
+    found = np.zeros((len(configs), len(labels)), dtype=bool)
+    for s, cnfg in enumerate(configs):
+        for a, label in enumerate(labels):
+            params = cnfg.activities.get(label)
+            if params is None:
+                continue
+            found[s, a] = True
+            for field, value in _activity_fields(params).items():
+                tables.setdefault(field, np.full((len(configs), len(labels)), np.nan))[s, a] = value
+    return tables, found
+
+
+def _activity_scores(
+    start: np.ndarray,
+    end: np.ndarray,
+    params: dict[str, np.ndarray],
+    performing: Union[float, np.ndarray],
+    waiting: Union[float, np.ndarray],
+    late_arrival: Union[float, np.ndarray],
+    early_departure: Union[float, np.ndarray],
+) -> np.ndarray:
+    """Vectorised equivalent of `CharyparNagelPlanScorer._score_activity`, with times in seconds.
+
+    All arguments (and parameters, as returned by `_activity_fields`) are broadcast together.
+    """
+    start_tod = start % SECONDS_PER_DAY
+    end_tod = end % SECONDS_PER_DAY
+
+    # nan (unset) times are never compared as True
+    actual_start = np.where(params["opening"] > start_tod, params["opening"], start)
+    actual_end = np.where(params["closing"] < end_tod, params["closing"], end)
+    duration = np.where(actual_end < actual_start, 0, (actual_end - actual_start) / 3600)
+    typical = params["typical_duration"]
+    with np.errstate(divide="ignore"):
+        duration_score = np.where(
+            duration < params["threshold"],
+            (duration * np.e - typical) * performing,
+            params["performing_typical_duration"] * (np.log(duration / typical) + 1),
+        )
+    waiting_score = np.where(
+        start_tod < params["opening"], waiting * ((params["opening"] - start) / 3600), 0.0
+    )
+    late_arrival_score = np.where(
+        start_tod > params["latest_start"],
+        late_arrival * ((start - params["latest_start"]) / 3600),
+        0.0,
+    )
+    early_departure_score = np.where(
+        end_tod < params["earliest_end"],
+        early_departure * ((params["earliest_end"] - end) / 3600),
+        0.0,
+    )
+    return duration_score + waiting_score + late_arrival_score + early_departure_score
+
+
+def _mode_tables(
+    configs: list[CompiledScoringConfig], labels: list[str]
+) -> tuple[dict[str, np.ndarray], np.ndarray]:
+    """(n_subpopulations, n_mode_labels) tables of mode parameters."""
+    tables = {field: np.zeros((len(configs), len(labels))) for field in ModeScoringParams._fields}
+    found = np.zeros((len(configs), len(labels)), dtype=bool)
+    for s, cnfg in enumerate(configs):
+        for m, label in enumerate(labels):
+            params = cnfg.modes.get(label)
+            if params is None:
+                continue
+            found[s, m] = True
+            for field in ModeScoringParams._fields:
+                tables[field][s, m] = getattr(params, field)
+    return tables, found
+
+
+def _check_found(
+    found: np.ndarray,
+    subpops: np.ndarray,
+    codes: np.ndarray,
+    arrays: ScoringArrays,
+    labels: list[str],
+) -> None:
+    missing = ~found[subpops, codes]
+    if missing.any():
+        pairs = sorted(
+            {
+                (arrays.subpopulation_labels[s], labels[c])
+                for s, c in zip(subpops[missing], codes[missing])
+            }
         )
+        raise KeyError(f"Scoring configuration missing for (subpopulation, type): {pairs}")
@@ -1,9 +1,12 @@
 import gzip
 import os
+from collections.abc import Iterable, Iterator
 from datetime import datetime, timedelta
 from io import BytesIO
+from itertools import islice
+from multiprocessing import Pool
 from pathlib import Path
-from typing import Generator, Union
+from typing import Any, Callable, Generator, Optional, Union
 
 import numpy as np
 from lxml import etree as et
@@ -249,15 +252,23 @@ def get_elems(path: Union[str, Path], tag: str) -> Generator:
     """
     target = try_unzip(path)
     tag = get_tag(target, tag)
-    target = try_unzip(path)  # need to repeat :(
+    if isinstance(target, gzip.GzipFile):
+        target.close()
+        return _parse_gzip_elems(path, tag)  # need to repeat :(
     return parse_elems(target, tag)
 
 
-def parse_elems(target: Union[BytesIO, str, Path], tag: str) -> Generator:
+def _parse_gzip_elems(path: Union[str, Path], tag: str) -> Generator:
+    """As per `parse_elems`, closing the gzip file once traversed (or the generator is closed)."""
+    with gzip.open(path) as target:
+        yield from parse_elems(target, tag)
+
+
+def parse_elems(target: Union[gzip.GzipFile, BytesIO, str, Path], tag: str) -> Generator:
     """Traverse the given XML tree, retrieving the elements of the specified tag.
 
     Args:
-        target (Union[BytesIO, str, Path]): Target xml, either BytesIO object or string path
+        target (Union[gzip.GzipFile, BytesIO, str, Path]): Target xml, either file object or string path
         tag (str): The tag type to extract , e.g. 'link'
 
     Yields:
@@ -272,25 +283,30 @@ def parse_elems(target: Union[BytesIO, str, Path], tag: str) -> Generator:
     del doc
 
 
-def try_unzip(path: Union[str, Path]) -> Union[BytesIO, str, Path]:
-    """Attempts to unzip xml at given path, if fails, returns path
+def try_unzip(path: Union[str, Path]) -> Union[gzip.GzipFile, str, Path]:
+    """Attempts to open gzipped xml at given path, if fails, returns path.
+
+    The gzipped xml is decompressed incrementally as it is read, rather than loaded into memory.
 
     Args:
         path (Union[str, Path]): xml path.
 
     Returns:
-        Union[BytesIO, str, Path]: BytesIO object or path if already unzipped.
+        Union[gzip.GzipFile, str, Path]: Open gzip file object or path if already unzipped.
     """
     try:
-        with gzip.open(path) as unzipped:
-            xml = unzipped.read()
-            target = BytesIO(xml)
-            return target
+        unzipped = gzip.open(path)
+    except OSError:
+        return path
+    try:
+        unzipped.peek(1)
     except OSError:
+        unzipped.close()
         return path
+    return unzipped
 
 
-def get_tag(target: Union[BytesIO, str, Path], tag: str) -> str:
+def get_tag(target: Union[gzip.GzipFile, BytesIO, str, Path], tag: str) -> str:
     """Check for namespace declaration.
 
     If they exists return tag string with namespace [''] ie {namespaces['']}tag.
@@ -299,7 +315,7 @@ def get_tag(target: Union[BytesIO, str, Path], tag: str) -> str:
     TODO: Not working with iterparse, generated elem also have ns which is dealt with later.
 
     Args:
-        target (Union[BytesIO, str, Path]): Target xml, either BytesIO object or path.
+        target (Union[gzip.GzipFile, BytesIO, str, Path]): Target xml, either file object or path.
         tag (str): The tag type to extract , e.g. 'link'.
 
     Returns:
@@ -406,3 +422,55 @@ def xml_tree(content: et.Element) -> str:
     """
     tree = et.tostring(content, pretty_print=True, xml_declaration=False, encoding="UTF-8")
     return tree
+
+
+def map_chunks(
+    chunks: Iterable[list],
+    func: Callable,
+    work: dict,
+    workers: int = 1,
+    payload: Optional[Callable] = None,
+) -> Iterator[tuple[list, Any]]:
+    """Apply `func(chunk, **work)` to each chunk, yielding each chunk with its result, in order.
+
+    With more than one worker, chunks are distributed across a process pool, with `func` and `work` copied to each
+    process once. At most a few chunks per worker are read ahead of the results.
+
+    Args:
+        chunks (Iterable[list]): chunks of work, e.g. lists of households.
+        func (Callable): function applied to each chunk (or its payload), with `work` as keyword arguments.
+        work (dict): keyword arguments of `func`, shared by all chunks.
+        workers (int, optional): number of processes. Defaults to 1.
+        payload (Optional[Callable], optional):
+            If given, function of a chunk returning what is passed to `func` (and sent to a process) instead. Defaults to None.
+
+    Yields:
+        Iterator[tuple[list, Any]]: each chunk and the result of `func`.
+    """
+    chunks = iter(chunks)
+    if payload is None:
+        payload = _identity
+    if workers == 1:
+        for chunk in chunks:
+            yield chunk, func(payload(chunk), **work)
+        return None
+
+    with Pool(workers, initializer=_init_chunk_worker, initargs=(func, work)) as pool:
+        while window := list(islice(chunks, workers * 4)):
+            yield from zip(window, pool.imap(_chunk_worker, [payload(chunk) for chunk in window]))
+
+
+def _identity(chunk: list) -> list:
+    return chunk
+
+
+_CHUNK_WORKER = {}
+
+
+def _init_chunk_worker(func: Callable, work: dict) -> None:
+    _CHUNK_WORKER["func"] = func
+    _CHUNK_WORKER["work"] = work
+
+
+def _chunk_worker(chunk: list) -> Any:
+    return _CHUNK_WORKER["func"](chunk, **_CHUNK_WORKER["work"])
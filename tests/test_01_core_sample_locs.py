@@ -1,5 +1,8 @@
-from random import random
+from copy import deepcopy
+from random import random, seed
 
+import numpy as np
+import pytest
 from shapely.geometry import Point
 
 from pam.core import Population
@@ -82,3 +85,62 @@ def test_retain_already_existing_locs(SmithHousehold):
     # default behaviour is to override
     population.sample_locs(FakeSampler())
     assert SmithHousehold[2].plan[2].location != existing_location
+
+
+class GlobalRandomSampler:
+    def sample(self, location_idx, activity, mode=None, previous_duration=None, previous_loc=None):
+        return Point(random(), random())
+
+
+@pytest.fixture
+def smiths_population(SmithHousehold):
+    population = Population()
+    for i in range(10):
+        household = deepcopy(SmithHousehold)
+        household.hid = f"smith-{i}"
+        population.add(household)
+    return population
+
+
+def sampled_locs(population):
+    return [act.location.loc for _, _, person in population.people() for act in person.activities]
+
+
+def test_sample_locs_complex_seeded_is_reproducible(smiths_population):
+    population_a = deepcopy(smiths_population)
+    population_b = deepcopy(smiths_population)
+    population_a.sample_locs_complex(GlobalRandomSampler(), seed=1)
+    population_b.sample_locs_complex(GlobalRandomSampler(), seed=1)
+    assert sampled_locs(population_a) == sampled_locs(population_b)
+
+
+def test_sample_locs_complex_seeded_households_are_independent(smiths_population):
+    smiths_population.sample_locs_complex(GlobalRandomSampler(), seed=1)
+    locs = [hh.location.loc for _, hh in smiths_population]
+    assert len(set(locs)) == len(locs)
+
+
+@pytest.mark.parametrize("workers", [2, 3])
+def test_sample_locs_complex_parallel_matches_serial(smiths_population, workers):
+    serial = deepcopy(smiths_population)
+    serial.sample_locs_complex(GlobalRandomSampler(), seed=1)
+    smiths_population.sample_locs_complex(GlobalRandomSampler(), seed=1, workers=workers)
+    assert sampled_locs(smiths_population) == sampled_locs(serial)
+
+
+def test_sample_locs_complex_parallel_shares_household_locations(smiths_population):
+    smiths_population.sample_locs_complex(GlobalRandomSampler(), seed=1, workers=2)
+    for _, household in smiths_population:
+        assert len({id(person.plan[0].location) for _, person in household}) == 1
+        for _, person in household:
+            assert person.plan[1].start_location is person.plan[0].location
+
+
+def test_sample_locs_complex_seeded_restores_global_random_state(smiths_population):
+    seed(4)
+    np.random.seed(4)
+    expected = (random(), np.random.random())
+    seed(4)
+    np.random.seed(4)
+    smiths_population.sample_locs_complex(GlobalRandomSampler(), seed=1)
+    assert (random(), np.random.random()) == expected
@@ -3,12 +3,15 @@ from lxml import etree as et
 
 from pam.activity import Plan
 from pam.read import (
+    count_matsim_household_members,
     get_attributes_from_person,
     load_attributes_map,
     parse_veh_attribute,
     read_matsim,
+    stream_matsim_households,
     stream_matsim_persons,
 )
+from pam.write.matsim import Writer
 
 test_trips_path = pytest.test_data_dir / "test_matsim_plans.xml"
 test_tripsv12_path = pytest.test_data_dir / "test_matsim_plansv12.xml"
@@ -192,6 +195,39 @@ def test_stream_transit_v12_matsim():
     assert legs[1].route.network_route == []
 
 
+def test_count_matsim_household_members():
+    assert count_matsim_household_members(test_tripsv12_path) == {"A": 2, "B": 3}
+
+
+def test_stream_matsim_households_matches_read_matsim():
+    population = read_matsim(test_tripsv12_path, household_key="hid", weight=1)
+    households = list(stream_matsim_households(test_tripsv12_path, weight=1))
+    assert sorted(hh.hid for hh in households) == ["A", "B"]
+    for household in households:
+        assert set(household.people) == set(population[household.hid].people)
+        assert household.freq == 1
+
+
+def test_stream_matsim_households_without_household_key():
+    households = list(stream_matsim_households(test_tripsv12_path, household_key=None))
+    assert len(households) == 5
+    assert all(len(hh) == 1 and hh.hid in hh.people for hh in households)
+
+
+def test_stream_matsim_households_not_contiguous_raises():
+    with pytest.raises(UserWarning):
+        list(stream_matsim_households(test_tripsv12_path, contiguous=True))
+
+
+def test_stream_matsim_households_contiguous(tmp_path):
+    path = tmp_path / "plans.xml"
+    with Writer(str(path)) as writer:
+        for household in stream_matsim_households(test_tripsv12_path):
+            writer.add_hh(household)
+    households = list(stream_matsim_households(path, contiguous=True))
+    assert {hh.hid: len(hh) for hh in households} == {"A": 2, "B": 3}
+
+
 def test_parse_veh_attribute():
     assert parse_veh_attribute('{"car":"chris"}') == {"car": "chris"}
 
@@ -1,3 +1,5 @@
+import random
+
 import pytest
 
 from pam.activity import Activity, Leg
@@ -97,3 +99,77 @@ def test_apply_two_policies(population):
         for pid, person in household.people.items():
             counter += len(person.plan) == 1
     assert counter < 60  # super dodgy test with probability
+
+
+def test_stream_policies_matches_apply_policies(population):
+    policy = policies.HouseholdQuarantined(0.5)
+    random.seed(1)
+    applied = policies.apply_policies(population, policy)
+    random.seed(1)
+    streamed = list(policies.stream_policies(iter(population.households.values()), policy))
+    assert len(streamed) == 20
+    for household in streamed:
+        for pid, person in household.people.items():
+            assert len(person.plan) == len(applied[household.hid][pid].plan)
+
+
+def test_apply_policies_to_writer_writes_each_household(population):
+    class ListWriter:
+        def __init__(self):
+            self.households = []
+
+        def add_hh(self, household):
+            self.households.append(household)
+
+    writer = ListWriter()
+    policy = policies.PersonStayAtHome(1)
+    assert policies.apply_policies_to_writer(population, policy, writer) == 20
+    assert [hh.hid for hh in writer.households] == list(population.households)
+    for household in writer.households:
+        for person in household.people.values():
+            assert_single_home_activity(person)
+
+
+def test_apply_policies_with_seed_is_reproducible(population):
+    policy = policies.HouseholdQuarantined(0.5)
+    a = policies.apply_policies(population, policy, seed=1)
+    b = policies.apply_policies(population, policy, seed=1)
+    c = policies.apply_policies(population, policy, seed=2)
+    lengths = [[len(person.plan) for _, _, person in pop.people()] for pop in [a, b, c]]
+    assert lengths[0] == lengths[1]
+    assert lengths[0] != lengths[2]
+
+
+def test_apply_policies_with_seed_restores_global_random_state(population):
+    random.seed(4)
+    expected = random.random()
+    random.seed(4)
+    policies.apply_policies(population, policies.HouseholdQuarantined(0.5), seed=1)
+    assert random.random() == expected
+
+
+@pytest.mark.parametrize("workers", [2, 3])
+def test_apply_policies_with_seed_is_independent_of_workers(population, workers):
+    policy = [
+        policies.HouseholdQuarantined(0.3),
+        policies.PersonStayAtHome(probability_samplers.PersonProbability(0.3)),
+    ]
+    serial = policies.apply_policies(population, policy, seed=3)
+    parallel = policies.apply_policies(population, policy, seed=3, workers=workers, chunksize=3)
+    assert list(parallel.households) == list(serial.households)
+    for hid, pid, person in serial.people():
+        assert parallel[hid][pid].plan.day == person.plan.day
+    # the input population is not modified
+    for _, _, person in population.people():
+        assert len(person.plan) == 5
+
+
+def test_apply_policies_in_parallel_copies_population(population):
+    population.metadata = {"source": "test"}
+    policy = policies.HouseholdQuarantined(0.5)
+    result = policies.apply_policies(population, policy, seed=1, workers=2)
+    assert result.metadata == population.metadata
+    assert result.metadata is not population.metadata
+    assert result._vehicles_manager is not population._vehicles_manager
+    assert result.households is not population.households
+    assert list(result.households) == list(population.households)
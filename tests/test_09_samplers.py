@@ -1,3 +1,4 @@
+import pickle
 import random
 from collections.abc import Iterator
 
@@ -594,3 +595,44 @@ def test_facility_sampler_weighted_distance():
             )
         )
     assert pd.Series(sampled_facilities).value_counts(normalize=True).idxmax() == Point((1000, 750))
+
+
+def test_facility_sampler_reseed_is_reproducible():
+    facility_df = pd.DataFrame(
+        {"id": [1, 2, 3, 4], "activity": ["work", "work", "work", "education"]}
+    )
+    points = [Point((1, 1)), Point((1.5, 1.5)), Point((1.8, 1.8)), Point((3, 3))]
+    facility_gdf = gp.GeoDataFrame(facility_df, geometry=points)
+
+    zones_df = pd.DataFrame({"a": [1, 2, 3], "b": [4, 5, 6]})
+    polys = [
+        Polygon(((0, 0), (0, 2), (2, 2), (2, 0))),
+        Polygon(((2, 2), (2, 4), (4, 4), (4, 2))),
+        Polygon(((4, 4), (4, 6), (6, 6), (6, 4))),
+    ]
+    zones_gdf = gp.GeoDataFrame(zones_df, geometry=polys)
+
+    sampler = facility.FacilitySampler(facility_gdf, zones_gdf, ["work", "education"])
+    sampler.reseed(3)
+    first = [sampler.sample(0, "work") for _ in range(2)]
+    sampler.reseed(3)
+    assert [sampler.sample(0, "work") for _ in range(2)] == first
+
+
+def test_facility_sampler_pickle_and_merge_facilities():
+    facility_df = pd.DataFrame({"id": [1, 2], "activity": ["work", "home"]})
+    points = [Point((1, 1)), Point((3, 3))]
+    facility_gdf = gp.GeoDataFrame(facility_df, geometry=points)
+
+    zones_df = pd.DataFrame({"a": [1, 2]})
+    polys = [Polygon(((0, 0), (0, 2), (2, 2), (2, 0))), Polygon(((2, 2), (2, 4), (4, 4), (4, 2)))]
+    zones_gdf = gp.GeoDataFrame(zones_df, geometry=polys)
+
+    sampler = facility.FacilitySampler(facility_gdf, zones_gdf, ["work", "home"])
+    copied = pickle.loads(pickle.dumps(sampler))
+    assert copied.sample(0, "work") == Point((1, 1))
+    assert isinstance(copied.sample(0, "home"), Point)  # random default
+
+    sampler.sample(1, "work")  # random default
+    sampler.merge_facilities(copied.facilities)
+    assert set(sampler.facilities) == {"_0", "_1", 0}
@@ -0,0 +1,121 @@
+import geopandas as gp
+import numpy as np
+import pandas as pd
+import pytest
+from shapely.geometry import MultiPoint, MultiPolygon, Point, Polygon
+
+from pam.samplers import attributes, basic, facility, spatial
+from pam.samplers.rng import RNGRegistry, derive_seed
+
+
+@pytest.fixture
+def registry():
+    return RNGRegistry(seed=42)
+
+
+@pytest.fixture
+def polygons():
+    p1 = Polygon(((0, 0), (1, 0), (1, 1), (0, 1)))
+    p2 = Polygon(((10, 10), (11, 10), (11, 11), (10, 11)))
+    return gp.GeoSeries([p1, p2, MultiPolygon([p1, p2]), MultiPoint([Point(0, 0), Point(5, 5)])])
+
+
+def test_registry_streams_are_reproducible(registry):
+    a = registry.stream("facility").random(5)
+    b = RNGRegistry(seed=42).stream("facility").random(5)
+    np.testing.assert_array_equal(a, b)
+
+
+def test_registry_named_streams_are_independent(registry):
+    a = registry.stream("facility").random(5)
+    b = registry.stream("population_sample").random(5)
+    c = registry.stream("facility", "hh-1").random(5)
+    assert not np.array_equal(a, b)
+    assert not np.array_equal(a, c)
+
+
+def test_registry_spawn_matches_stream_entities(registry):
+    child = registry.spawn("sample_locs")
+    a = child.stream("hh-1").random(5)
+    b = registry.stream("sample_locs", "hh-1").random(5)
+    np.testing.assert_array_equal(a, b)
+
+
+def test_registry_from_registry_seed(registry):
+    assert RNGRegistry(registry.seed).stream("x").random() == registry.stream("x").random()
+
+
+def test_derive_seed_is_stable():
+    assert derive_seed(1, "hh-1") == derive_seed(1, "hh-1")
+    assert derive_seed(1, "hh-1") != derive_seed(1, "hh-2")
+    assert derive_seed(1, "hh-1") != derive_seed(2, "hh-1")
+
+
+def test_freq_sample_with_rng_does_not_repeat(registry):
+    rng = registry.stream("freq")
+    draws = [basic.freq_sample(1, 0.5, rng=rng) for _ in range(100)]
+    assert set(draws) == {0, 1}
+
+
+def test_freq_sample_with_rng_is_reproducible():
+    a = [basic.freq_sample(1, 0.5, rng=RNGRegistry(1).stream("freq")) for _ in range(10)]
+    b = [basic.freq_sample(1, 0.5, rng=RNGRegistry(1).stream("freq")) for _ in range(10)]
+    assert a == b
+
+
+def test_discrete_joint_distribution_sampler_with_rng(registry):
+    rng = registry.stream("attributes")
+    mapping = ["gender"]
+    distribution = {"male": 0.5, "female": 0.5}
+    draws = [
+        attributes.discrete_joint_distribution_sampler(
+            {"gender": "male"}, mapping, distribution, rng=rng
+        )
+        for _ in range(100)
+    ]
+    assert set(draws) == {True, False}
+
+
+def test_random_point_sampler_with_rng_is_reproducible(polygons):
+    a = spatial.RandomPointSampler(polygons, rng=RNGRegistry(1).stream("spatial"))
+    b = spatial.RandomPointSampler(polygons, rng=RNGRegistry(1).stream("spatial"))
+    for idx in polygons.index:
+        assert a.sample(idx, None) == b.sample(idx, None)
+
+
+def test_random_point_sampler_with_rng_does_not_repeat(polygons, registry):
+    sampler = spatial.RandomPointSampler(polygons, rng=registry.stream("spatial"))
+    assert sampler.sample(0, None) != sampler.sample(0, None)
+    assert sampler.sample(0, None).within(polygons[0])
+    assert sampler.sample(2, None).within(polygons[2])
+
+
+def test_inf_yielder_simple_with_rng(registry):
+    candidates = [1, 2, 3]
+    sampler = facility.inf_yielder(candidates, rng=registry.stream("facility"))
+    assert set([next(sampler) for i in range(3)]) == set(candidates)
+    assert candidates == [1, 2, 3]
+
+
+def test_inf_yielder_weighted_with_rng_does_not_repeat(registry):
+    candidates = [1, 2, 3]
+    weights = pd.Series(data=[0.3, 0.3, 0.4], index=[1, 2, 3])
+    sampler = facility.inf_yielder(candidates, weights=weights, rng=registry.stream("facility"))
+    assert set([next(sampler(None, None, None)) for i in range(100)]) == set(candidates)
+
+
+def test_facility_sampler_with_rng_is_reproducible():
+    facility_df = pd.DataFrame({"id": [1, 2, 3], "activity": ["work", "work", "work"]})
+    points = [Point((1, 1)), Point((1.5, 1.5)), Point((1.8, 1.8))]
+    facility_gdf = gp.GeoDataFrame(facility_df, geometry=points)
+    zones_gdf = gp.GeoDataFrame(
+        pd.DataFrame({"a": [1]}), geometry=[Polygon(((0, 0), (0, 2), (2, 2), (2, 0)))]
+    )
+
+    def draws():
+        sampler = facility.FacilitySampler(
+            facility_gdf, zones_gdf, ["work", "home"], rng=RNGRegistry(7).stream("facility")
+        )
+        return [sampler.sample(0, "work") for _ in range(6)] + [sampler.sample(0, "home")]
+
+    assert draws() == draws()
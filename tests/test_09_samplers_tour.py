@@ -1,6 +1,9 @@
 # %% import packages
 
+import random
+
 import geopandas as gp
+import numpy as np
 import pandas as pd
 import pytest
 from matplotlib.figure import Figure
@@ -285,6 +288,48 @@ def test_frequency_sampler_with_threshold():
     )
 
 
+def test_frequency_sampler_matches_random_choices():
+    dist, weights = ["a", "b", "c"], [0.2, 0.5, 0.3]
+    sampler = tour.FrequencySampler(dist, weights)
+    random.seed(0)
+    expected = random.choices(dist, weights=weights, k=20)
+    random.seed(0)
+    assert [sampler.sample() for _ in range(10)] + sampler.samples(10) == expected
+
+
+def test_frequency_sampler_samples_with_rng():
+    sampler = tour.FrequencySampler(range(3), [0, 1, 1], rng=np.random.default_rng(0))
+    samples = sampler.samples(1000)
+    assert isinstance(samples, list)
+    assert set(samples) == {1, 2}
+
+
+def test_frequency_sampler_threshold_samples_are_cached():
+    zone_densities = pd.DataFrame({"zone": ["A", "B"], "density": [1, 1]}).set_index("zone")
+    threshold_matrix = pd.DataFrame({"zone": ["A", "B"], "A": [0, 1000], "B": [1000, 0]}).set_index(
+        "zone"
+    )
+    sampler = tour.FrequencySampler(
+        dist=zone_densities,
+        freq="density",
+        threshold_matrix=threshold_matrix["A"],
+        threshold_value=50,
+        rng=np.random.default_rng(0),
+    )
+    assert set(sampler.threshold_samples(100)) == {"A"}
+    assert sampler._threshold() is sampler._threshold()
+
+
+def test_pivot_distribution_sampler_samples():
+    dist = tour.PivotDistributionSampler(
+        bins=range(0, 3), pivots={1: 1, 2: 1}, total=30, rng=np.random.default_rng(0)
+    )
+    samples = dist.samples(1000)
+    assert isinstance(samples, list)
+    assert set(samples) == {1, 2}
+    assert dist.sample() in {1, 2}
+
+
 def test_plot_pivot_distribution_sampler():
     bins = range(0, 3)
     pivots = {1: 1, 2: 1}
@@ -523,3 +568,140 @@ def test_plot_density_difference(od_density):
     )
 
     assert isinstance(fig, Figure)
+
+
+# %% batch tour planner
+def tour_length(coords, order):
+    closed = coords[np.append(order, order[0])]
+    return np.linalg.norm(np.diff(closed, axis=0), axis=1).sum()
+
+
+def test_sequence_tours_nearest_neighbour():
+    coords = np.array([[[0, 0], [3, 0], [1, 0], [2, 0]], [[0, 0], [0, 1], [0, 3], [0, 2]]])
+    orders = tour.sequence_tours(coords, two_opt=False)
+    assert orders.tolist() == [[0, 2, 3, 1], [0, 1, 3, 2]]
+
+
+def test_sequence_tours_two_opt_improves_nearest_neighbour():
+    coords = np.random.default_rng(0).random((50, 8, 2))
+    nn_orders = tour.sequence_tours(coords, two_opt=False)
+    orders = tour.sequence_tours(coords)
+    assert (orders[:, 0] == 0).all()
+    assert (np.sort(orders, axis=1) == np.arange(8)).all()
+    nn_lengths = [tour_length(c, o) for c, o in zip(coords, nn_orders)]
+    lengths = [tour_length(c, o) for c, o in zip(coords, orders)]
+    assert all(length <= nn + 1e-9 for length, nn in zip(lengths, nn_lengths))
+    assert sum(lengths) < sum(nn_lengths)
+
+
+@pytest.fixture
+def batch_planner(delivery_density, facility_sampler):
+    return tour.BatchTourPlanner(
+        d_dist=delivery_density,
+        d_freq="density",
+        facility_sampler=facility_sampler,
+        activity_params={"o_activity": "depot", "d_activity": "delivery"},
+    )
+
+
+def batch_agents(n):
+    return [Person(f"LGV_{i}") for i in range(n)]
+
+
+def plan_tours(planner, n=20, **kwargs):
+    agents = batch_agents(n)
+    planner.plan(
+        agents,
+        stops=[1 + i % 2 for i in range(n)],
+        hours=[i % 24 for i in range(n)],
+        minutes=[i % 60 for i in range(n)],
+        o_zones=[2] * n,
+        **kwargs,
+    )
+    return agents
+
+
+def test_batch_tour_planner_builds_valid_plans(batch_planner):
+    agents = plan_tours(batch_planner, seed=0)
+    for i, agent in enumerate(agents):
+        assert agent.plan.validate_times()
+        assert agent.first_activity == agent.last_activity.act == "depot"
+        assert len(list(agent.legs)) == 2 + i % 2
+        assert agent.activities.__next__().end_time.hour == i % 24
+        stops = [(act.location.loc.x, act.location.loc.y) for act in agent.activities][:-1]
+        assert len(set(stops)) == len(stops)
+
+
+def test_batch_tour_planner_with_threshold(delivery_density, facility_sampler, df_od):
+    planner = tour.BatchTourPlanner(
+        d_dist=delivery_density,
+        d_freq="density",
+        facility_sampler=facility_sampler,
+        activity_params={"o_activity": "depot", "d_activity": "delivery"},
+        threshold_matrix=df_od,
+        threshold_value=3000,
+    )
+    d_zones = planner.sample_d_zones(1, 100, np.random.default_rng(0))
+    assert set(d_zones) == {1}
+    with pytest.warns(UserWarning, match="No destinations within this threshold value"):
+        planner.threshold_value = 2000
+        assert planner.sample_d_zones(2, 2, np.random.default_rng(0)) == [None, None]
+
+
+def test_batch_tour_planner_is_reproducible(batch_planner):
+    locs = [
+        [
+            [act.location.loc for act in agent.activities]
+            for agent in plan_tours(batch_planner, seed=1)
+        ]
+        for _ in range(2)
+    ]
+    assert locs[0] == locs[1]
+
+
+def test_batch_tour_planner_parallel_matches_serial(batch_planner):
+    serial = plan_tours(batch_planner, seed=1, chunksize=5)
+    parallel = plan_tours(batch_planner, seed=1, chunksize=5, workers=2)
+    for agent_a, agent_b in zip(serial, parallel):
+        assert [(c.start_time, c.end_time) for c in agent_a.plan] == [
+            (c.start_time, c.end_time) for c in agent_b.plan
+        ]
+        assert [a.location.loc for a in agent_a.activities] == [
+            a.location.loc for a in agent_b.activities
+        ]
+
+
+def test_batch_tour_planner_raises_without_destinations_within_threshold(
+    delivery_density, facility_sampler, df_od
+):
+    planner = tour.BatchTourPlanner(
+        d_dist=delivery_density,
+        d_freq="density",
+        facility_sampler=facility_sampler,
+        activity_params={"o_activity": "depot", "d_activity": "delivery"},
+        threshold_matrix=df_od,
+        threshold_value=2000,
+    )
+    with pytest.warns(UserWarning), pytest.raises(ValueError, match="No destinations within"):
+        planner.sample_stops(2, 2, np.random.default_rng(0))
+
+
+def test_batch_tour_planner_raises_if_unique_destinations_are_exhausted(batch_planner):
+    batch_planner.max_resamples = 10
+    with pytest.raises(ValueError, match="Failed to sample 1000 unique destinations"):
+        batch_planner.sample_stops(1000, 2, np.random.default_rng(0))
+
+
+def test_batch_tour_planner_parallel_merges_facilities(delivery_density, facility_sampler):
+    facility_sampler.build_xml = True
+    planner = tour.BatchTourPlanner(
+        d_dist=delivery_density,
+        d_freq="density",
+        facility_sampler=facility_sampler,
+        activity_params={"o_activity": "depot", "d_activity": "delivery"},
+    )
+    plan_tours(planner, seed=1, chunksize=5, workers=2)
+    parallel = len(facility_sampler.facilities)
+    facility_sampler.clear()
+    plan_tours(planner, seed=1, chunksize=5)
+    assert parallel == len(facility_sampler.facilities) > 0
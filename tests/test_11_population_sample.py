@@ -1,4 +1,12 @@
-from pam.samplers.population import sample
+from copy import deepcopy
+
+import numpy as np
+import pytest
+
+from pam.core import Household, Population
+from pam.read import read_matsim
+from pam.samplers.population import sample, sample_counts, sample_to_writer
+from pam.write.matsim import Writer
 
 
 def test_upsample_from_hh_weights(population_heh):
@@ -92,3 +100,86 @@ def test_upsample_from_leg_weights_up_sample(population_heh):
     new_population = sample(population=population, sample=1, verbose=False, seed=0)
     assert len(population) == len(new_population) / 2
     assert population.size == new_population.size
+
+
+@pytest.fixture
+def population_many_heh(population_heh):
+    household = population_heh["0"]
+    population = Population()
+    for i in range(100):
+        hh = deepcopy(household)
+        hh.hid = str(i)
+        hh.hh_freq = 1.5
+        population.add(hh)
+    return population
+
+
+def test_sample_counts_rounds_probabilistically():
+    counts = sample_counts([1.5] * 1000, 1, seed=0)
+    assert set(counts) == {1, 2}
+    assert 400 < (counts == 2).sum() < 600
+
+
+def test_sample_counts_is_reproducible():
+    np.testing.assert_array_equal(
+        sample_counts([0.5] * 100, 1, seed=1), sample_counts([0.5] * 100, 1, seed=1)
+    )
+
+
+def test_sample_counts_rejects_missing_frequencies():
+    with pytest.raises(ValueError, match="positions \\[0\\]"):
+        sample_counts([None, 3], 0.5, seed=1)
+
+
+@pytest.mark.parametrize("sampler", ["sample", "sample_to_writer"])
+def test_sample_rejects_empty_households(population_heh, tmp_path, sampler):
+    for _, hh in population_heh:
+        hh.hh_freq = 1
+    population_heh.add(Household("empty"))
+    with pytest.raises(ValueError, match="Household empty has no frequency"):
+        if sampler == "sample":
+            sample(population_heh, sample=1, seed=0)
+        else:
+            with Writer(str(tmp_path / "plans.xml")) as writer:
+                sample_to_writer(population_heh, 1, writer, seed=0)
+
+
+def test_sample_is_reproducible(population_many_heh):
+    a = sample(population_many_heh, sample=1, seed=3)
+    b = sample(population_many_heh, sample=1, seed=3)
+    assert sorted(a.households) == sorted(b.households)
+
+
+def test_sample_share_plans(population_heh):
+    population_heh["0"].hh_freq = 3
+    new_population = sample(population_heh, sample=1, share_plans=True)
+    assert len(new_population) == 3
+    for _, _, person in new_population.people():
+        assert person.plan is population_heh["0"]["1"].plan
+        assert person.attributes is not population_heh["0"]["1"].attributes
+        assert person.person_freq == 1
+    assert population_heh["0"]["1"].pid == "1"
+
+
+def test_sample_copies_plans_by_default(population_heh):
+    population_heh["0"].hh_freq = 2
+    new_population = sample(population_heh, sample=1)
+    for _, _, person in new_population.people():
+        assert person.plan is not population_heh["0"]["1"].plan
+        assert person.plan == population_heh["0"]["1"].plan
+
+
+@pytest.mark.parametrize("stream", [False, True])
+def test_sample_to_writer_matches_sample(population_many_heh, tmp_path, stream):
+    path = str(tmp_path / "plans.xml")
+    households = (hh for _, hh in population_many_heh) if stream else population_many_heh
+    with Writer(path) as writer:
+        written = sample_to_writer(households, sample=1, writer=writer, seed=3)
+
+    expected = sample(population_many_heh, sample=1, seed=3)
+    assert written == expected.num_households
+    written_population = read_matsim(path, household_key="hid")
+    assert sorted(written_population.households) == sorted(expected.households)
+    assert sorted(pid for _, pid, _ in written_population.people()) == sorted(
+        pid for _, pid, _ in expected.people()
+    )
@@ -1,7 +1,19 @@
+from copy import deepcopy
+
+import numpy as np
 import pytest
 
+from pam import utils
 from pam.read import read_matsim
-from pam.scoring import CharyparNagelPlanScorer
+from pam.scoring import (
+    CharyparNagelPlanScorer,
+    CompiledScoringConfig,
+    compile_config,
+    plan_times,
+    plans_to_scoring_arrays,
+    set_plan_times,
+)
+from pam.variables import START_OF_DAY
 
 TEST_EXPERIENCED_PLANS_PATH = pytest.test_data_dir / "test_matsim_experienced_plans_v12.xml"
 
@@ -143,3 +155,146 @@ def test_scores_experienced(config_complex):
         matsim_score = person.plan.score
         pam_score = scorer.score_person(person)
         assert abs(matsim_score - pam_score) < 0.1
+
+
+def test_compile_config_parses_times(default_config):
+    compiled = compile_config(default_config)
+    assert isinstance(compiled, CompiledScoringConfig)
+    work = compiled.activities["work"]
+    assert work.typical_duration == utils.matsim_duration_to_hours(
+        default_config["work"]["typicalDuration"]
+    )
+    assert work.opening == 6 * 3600
+    assert work.opening_tod == 6 * 3600
+    assert compiled.modes["car"].daily == -2
+
+
+def test_compiled_config_scores_match_config(Anna, default_config):
+    scorer = CharyparNagelPlanScorer(cnfg=default_config)
+    compiled = compile_config(default_config)
+    assert scorer.score_plan(Anna.plan, compiled) == scorer.score_plan(Anna.plan, default_config)
+
+
+def test_compile_is_cached(default_config):
+    scorer = CharyparNagelPlanScorer(cnfg=default_config)
+    compiled = scorer.compile(default_config)
+    assert scorer.compile(default_config) is compiled
+    assert scorer.compile(compiled) is compiled
+    scorer.clear_compiled()
+    assert scorer.compile(default_config) is not compiled
+
+
+def test_compile_recompiles_modified_config(Anna, default_config, caplog):
+    scorer = CharyparNagelPlanScorer(cnfg=default_config)
+    score = scorer.score_plan(Anna.plan, default_config)
+    default_config["performing"] *= 2
+    assert scorer.score_plan(Anna.plan, default_config) != score
+    assert "Scoring configuration has changed" in caplog.text
+
+
+def test_score_population_matches_score_person(config_complex):
+    population = read_matsim(TEST_EXPERIENCED_PLANS_PATH, version=12, crop=False)
+    scorer = CharyparNagelPlanScorer(config_complex)
+    for hid, pid, person in population.people():
+        person.attributes.setdefault("subpopulation", "default")
+    scores = scorer.score_population(population)
+    for hid, pid, person in population.people():
+        assert scores[(hid, pid)] == pytest.approx(scorer.score_person(person))
+
+
+@pytest.mark.parametrize("plan_fixture", ["Anna", "AnnaPT", "small_plan"])
+def test_score_arrays_matches_score_plan(plan_fixture, default_config, request):
+    plan = request.getfixturevalue(plan_fixture)
+    plan = getattr(plan, "plan", plan)
+    scorer = CharyparNagelPlanScorer(cnfg={"default": default_config})
+    arrays = plans_to_scoring_arrays([plan, plan], ["default", "default"])
+    scores = scorer.score_arrays(arrays, plan_costs=np.array([0, 10]))
+    assert scores[0] == pytest.approx(scorer.score_plan(plan, default_config))
+    assert scores[1] == pytest.approx(scorer.score_plan(plan, default_config, plan_cost=10))
+
+
+def test_score_arrays_missing_config(Anna, default_config):
+    del default_config["education"]
+    scorer = CharyparNagelPlanScorer(cnfg={"default": default_config})
+    with pytest.raises(KeyError, match="education"):
+        scorer.score_arrays(plans_to_scoring_arrays([Anna.plan], ["default"]))
+
+
+@pytest.mark.parametrize("activity_fixture", ["short_activity", "early_activity"])
+def test_score_activity_times_matches_score_activity(activity_fixture, default_config, request):
+    activity = request.getfixturevalue(activity_fixture)
+    scorer = CharyparNagelPlanScorer(cnfg=default_config)
+    start = (activity.start_time - START_OF_DAY).total_seconds()
+    end = (activity.end_time - START_OF_DAY).total_seconds()
+    scores = scorer.score_activity_times(
+        activity.act, np.array([start]), np.array([end]), default_config
+    )
+    assert scores[0] == pytest.approx(scorer.score_activity(activity, default_config))
+
+
+def test_score_leg_departures_matches_score_leg(default_config, pt_wait_leg):
+    scorer = CharyparNagelPlanScorer(cnfg=default_config)
+    departure = (pt_wait_leg.start_time - START_OF_DAY).total_seconds()
+    scores = scorer.score_leg_departures(
+        pt_wait_leg, np.array([departure, departure + 60]), default_config
+    )
+    assert scores[0] == pytest.approx(scorer.score_leg(pt_wait_leg, default_config))
+    # one minute less waiting for the same boarding time
+    assert scores[1] - scores[0] == pytest.approx((-5 + 2) / 60)
+
+
+@pytest.mark.parametrize("plan_fixture", ["Anna", "AnnaPT", "small_plan"])
+def test_score_components_total_matches_score_plan(plan_fixture, default_config, request):
+    plan = request.getfixturevalue(plan_fixture)
+    plan = getattr(plan, "plan", plan)
+    scorer = CharyparNagelPlanScorer(cnfg=default_config)
+    scores = scorer.score_components(plan, default_config)
+    assert len(scores.components) == len(plan)
+    assert scores.total == pytest.approx(scorer.score_plan(plan, default_config))
+
+
+def test_score_delta_matches_rescored_plan(Anna, default_config):
+    scorer = CharyparNagelPlanScorer(cnfg=default_config)
+    scores = scorer.score_components(Anna.plan, default_config)
+    starts, ends = plan_times(Anna.plan)
+    # leave home an hour later, and return home an hour earlier (changing the wrapped home activity)
+    starts[-1] -= 3600
+    ends[-2] -= 3600
+    ends[0] += 3600
+    starts[1] += 3600
+    ends[1] += 3600
+    starts[2] += 3600
+    new_scores = scorer.score_delta(
+        Anna.plan, default_config, scores, starts, ends, [0, 1, 2, 3, 4]
+    )
+    rescored = scorer.score_plan(set_plan_times(deepcopy(Anna.plan), starts, ends), default_config)
+    assert new_scores.total == pytest.approx(rescored)
+    assert scores.total == pytest.approx(scorer.score_plan(Anna.plan, default_config))
+
+
+@pytest.mark.parametrize("plan_fixture", ["Anna", "AnnaPT", "small_plan"])
+def test_score_plan_times_matches_score_plan(plan_fixture, default_config, request):
+    plan = request.getfixturevalue(plan_fixture)
+    plan = getattr(plan, "plan", plan)
+    scorer = CharyparNagelPlanScorer(cnfg=default_config)
+    starts, ends = plan_times(plan)
+    later = np.array(ends)
+    later[:-1] += 600
+    shifted = np.array(starts)
+    shifted[1:] += 600
+    scores = scorer.score_plan_times(
+        plan, default_config, np.stack([starts, shifted]), np.stack([ends, later])
+    )
+    assert scores[0] == pytest.approx(scorer.score_plan(plan, default_config))
+    rescored = scorer.score_plan(set_plan_times(deepcopy(plan), shifted, later), default_config)
+    assert scores[1] == pytest.approx(rescored)
+
+
+def test_score_delta_only_rescores_changed_components(Anna, default_config):
+    scorer = CharyparNagelPlanScorer(cnfg=default_config)
+    scores = scorer.score_components(Anna.plan, default_config)
+    starts, ends = plan_times(Anna.plan)
+    ends[2] -= 3600
+    new_scores = scorer.score_delta(Anna.plan, default_config, scores, starts, ends, [2])
+    assert new_scores.components[2] < scores.components[2]
+    assert (new_scores.components[[0, 1, 3, 4]] == scores.components[[0, 1, 3, 4]]).all()
@@ -1,6 +1,7 @@
+from copy import deepcopy
 from datetime import timedelta
 
-from pam.samplers.time import apply_jitter_to_plan, jitter_activity
+from pam.samplers.time import apply_jitter_to_plan, apply_jitter_to_plans, jitter_activity
 
 
 def test_jitter_activity(Steve):
@@ -29,3 +30,50 @@ def test_apply_jitter_to_plan(Steve):
         plan=Steve.plan, jitter=timedelta(minutes=5), min_duration=timedelta(minutes=5)
     )
     assert Steve.plan.validate()
+
+
+class MidpointRNG:
+    def integers(self, high):
+        return high // 2
+
+
+def plan_times(plan):
+    return [(c.start_time, c.end_time) for c in plan]
+
+
+def test_apply_jitter_to_plans(Steve, Timmy, Bobby, small_plan):
+    plans = [Steve.plan, Timmy.plan, Bobby.plan, small_plan]
+    apply_jitter_to_plans(plans, jitter=timedelta(minutes=30), min_duration=timedelta(minutes=5))
+    for plan in plans:
+        assert plan.validate_times()
+        assert plan.valid_end_of_day_time
+
+
+def test_apply_jitter_to_plans_is_reproducible(Steve):
+    plan_a, plan_b = deepcopy(Steve.plan), deepcopy(Steve.plan)
+    apply_jitter_to_plans(
+        [plan_a], jitter=timedelta(minutes=30), min_duration=timedelta(minutes=5), seed=1
+    )
+    apply_jitter_to_plans(
+        [plan_b], jitter=timedelta(minutes=30), min_duration=timedelta(minutes=5), seed=1
+    )
+    assert plan_times(plan_a) == plan_times(plan_b)
+    assert plan_times(plan_a) != plan_times(Steve.plan)
+
+
+def test_apply_jitter_to_plans_matches_apply_jitter_to_plan(Steve, Timmy, Bobby, mocker):
+    mocker.patch("pam.samplers.time.randrange", side_effect=lambda high: high // 2)
+    plans = [Steve.plan, Timmy.plan, Bobby.plan]
+    expected = deepcopy(plans)
+    for plan in expected:
+        apply_jitter_to_plan(plan, jitter=timedelta(minutes=30), min_duration=timedelta(minutes=5))
+
+    apply_jitter_to_plans(
+        plans, jitter=timedelta(minutes=30), min_duration=timedelta(minutes=5), rng=MidpointRNG()
+    )
+    for plan, expected_plan in zip(plans, expected):
+        for (start, end), (expected_start, expected_end) in zip(
+            plan_times(plan), plan_times(expected_plan)
+        ):
+            assert abs((start - expected_start).total_seconds()) < 1
+            assert abs((end - expected_end).total_seconds()) < 1
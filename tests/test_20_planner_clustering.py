@@ -1,5 +1,8 @@
+from copy import deepcopy
+
 import numpy as np
 import pytest
+from scipy.spatial.distance import squareform
 
 from pam.planner import clustering
 
@@ -105,3 +108,91 @@ def test_clustering_method_uses_correct_metric_matrix(clusters):
     # spectral clustering uses similarity instead of distnace
     clusters.fit(n_clusters=2, clustering_method="spectral")
     clusters.model.metric_matrix_ = 1 - clusters.distances
+
+
+@pytest.mark.parametrize("n_cores", [1, 2])
+def test_condensed_distances_match_distance_matrix(n_cores):
+    sequences = ["aa", "bb", "ab", "aab", "b"]
+    condensed = clustering.calc_levenshtein_condensed(sequences, n_cores=n_cores)
+    assert condensed.dtype == np.float32
+    np.testing.assert_array_almost_equal(
+        squareform(condensed), clustering.calc_levenshtein_matrix(sequences, sequences)
+    )
+
+
+@pytest.fixture
+def population_duplicated(population_no_args):
+    population = deepcopy(population_no_args)
+    for hid, hh in population_no_args.households.items():
+        hh = deepcopy(hh)
+        hh.hid = f"{hid}-copy"
+        population.add(hh)
+    return population
+
+
+def test_plans_are_not_deduplicated_by_default(population_duplicated):
+    clusters = clustering.PlanClusters(population_duplicated)
+    assert clusters.plans_unique_encoded == list(clusters.plans_encoded)
+    assert clusters.distances.shape == (len(clusters.plans),) * 2
+
+
+def test_identical_plans_are_deduplicated(population_duplicated):
+    clusters = clustering.PlanClusters(population_duplicated, deduplicate=True)
+    assert len(clusters.plans_unique_encoded) == len(set(clusters.plans_encoded))
+    assert len(clusters.plans_unique_encoded) <= len(clusters.plans) / 2
+    assert clusters.sample_weights.sum() == len(clusters.plans)
+    assert [clusters.plans_unique_encoded[i] for i in clusters.plans_inverse] == list(
+        clusters.plans_encoded
+    )
+    assert clusters.distances.shape == (len(clusters.plans_unique_encoded),) * 2
+
+
+def test_deduplicated_clusters_match(population_duplicated):
+    clusters = clustering.PlanClusters(population_duplicated, deduplicate=True)
+    clusters.fit(n_clusters=2)
+    clusters_all = clustering.PlanClusters(population_duplicated)
+    clusters_all.fit(n_clusters=2)
+    assert len(clusters.labels) == len(clusters_all.labels)
+    # same partition, up to cluster numbering
+    assert len(set(zip(clusters.labels, clusters_all.labels))) == 2
+
+
+def test_clara_finds_clusters():
+    sequences = ["aaaa", "aaab", "aaba", "bbbb", "bbba", "babb", "cccc", "ccca"]
+    model = clustering.CLARA(n_clusters=3, sample_size=5, n_samples=10, seed=1).fit(sequences)
+    labels = model.labels_
+    assert labels[0] == labels[1] == labels[2]
+    assert labels[3] == labels[4] == labels[5]
+    assert labels[6] == labels[7]
+    assert len(set(labels)) == 3
+    assert [labels[i] for i in model.medoid_indices_] == [0, 1, 2]
+
+
+def test_clara_sample_weights_move_medoids():
+    sequences = ["aaaa", "aaab", "aabb"]
+    model = clustering.CLARA(n_clusters=1).fit(sequences, sample_weight=[1, 1, 1])
+    assert model.medoid_indices_[0] == 1
+    model = clustering.CLARA(n_clusters=1).fit(sequences, sample_weight=[1, 1, 10])
+    assert model.medoid_indices_[0] == 2
+
+
+def test_clara_clustering_of_plans(population_duplicated):
+    clusters = clustering.PlanClusters(population_duplicated)
+    clusters.fit(n_clusters=2, clustering_method="clara", seed=1)
+    assert set(clusters.labels) == {0, 1}
+    assert clusters.get_cluster_sizes().sum() == len(clusters.plans)
+    assert clusters._distances is None
+
+
+def test_closest_matches_without_distance_matrix(population_duplicated):
+    clusters = clustering.PlanClusters(population_duplicated)
+    plan = clusters.plans[0]
+    closest_plans = clusters.get_closest_matches(plan, 4)
+    assert clusters._distances is None
+    clusters.distances
+    assert clusters.get_closest_matches(plan, 4) == closest_plans
+    # the duplicate of the plan is the closest match
+    assert (
+        clusters.plans_encoded[clusters.plans.index(closest_plans[0])] == clusters.plans_encoded[0]
+    )
+    assert id(plan) not in [id(p) for p in closest_plans]
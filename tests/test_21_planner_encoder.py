@@ -1,12 +1,16 @@
+import numpy as np
 import pytest
 
 from pam.planner.encoder import (
     PlanCharacterEncoder,
     PlanOneHotEncoder,
+    PlanRunLengthEncoder,
     PlansCharacterEncoder,
     PlansOneHotEncoder,
+    PlansRunLengthEncoder,
     StringCharacterEncoder,
     StringIntEncoder,
+    run_length_hamming_distance,
 )
 
 
@@ -87,3 +91,53 @@ def test_character_encoder_shape(Steve):
 
     assert len(plan_encoded) == 24 * 60
     assert isinstance(plan_encoded, str)
+
+
+def test_run_length_plan_encoding_works_two_way(Steve):
+    plan = Steve.plan
+    encoder = PlanRunLengthEncoder(labels=plan.activity_classes)
+    plan_encoded_decoded = encoder.decode(encoder.encode(plan))
+
+    assert [x.act for x in plan.day] == [x.act for x in plan_encoded_decoded.day]
+    assert [x.start_time for x in plan.day] == [x.start_time for x in plan_encoded_decoded.day]
+    assert [x.end_time for x in plan.day] == [x.end_time for x in plan_encoded_decoded.day]
+
+
+def test_run_length_encoding_matches_one_hot_encoding(population_no_args):
+    labels = population_no_args.activity_classes
+    rle_encoder = PlanRunLengthEncoder(labels=labels)
+    one_hot_encoder = PlanOneHotEncoder(activity_encoder=rle_encoder.activity_encoder)
+    for plan in population_no_args.plans():
+        np.testing.assert_array_equal(
+            rle_encoder.get_seq(rle_encoder.encode(plan)),
+            one_hot_encoder.get_seq(one_hot_encoder.encode(plan)),
+        )
+
+
+def test_run_length_activity_counts_match_one_hot_encoding(population_no_args):
+    labels = population_no_args.activity_classes
+    counts = PlansRunLengthEncoder(labels).activity_counts(population_no_args.plans())
+    one_hot = PlansOneHotEncoder(labels).encode(population_no_args.plans()).sum(axis=0)
+    np.testing.assert_array_equal(counts, one_hot)
+
+
+@pytest.mark.parametrize(
+    "a,b",
+    [
+        ([[0, 0, 10]], [[0, 0, 10]]),
+        ([[0, 0, 10]], [[1, 0, 10]]),
+        ([[0, 0, 4], [1, 4, 6]], [[0, 0, 6], [2, 6, 4]]),
+        ([[0, 0, 4], [1, 4, 6]], [[0, 0, 4]]),
+    ],
+)
+def test_run_length_hamming_distance_matches_minutes(a, b):
+    a, b = np.array(a), np.array(b)
+    seq_a = list(PlanRunLengthEncoder.get_seq(a))
+    seq_b = list(PlanRunLengthEncoder.get_seq(b))
+    length = max(len(seq_a), len(seq_b))
+    seq_a += [-1] * (length - len(seq_a))
+    seq_b += [-1] * (length - len(seq_b))
+    expected = sum(x != y for x, y in zip(seq_a, seq_b))
+    assert run_length_hamming_distance(a, b) == expected
+    assert run_length_hamming_distance(b, a) == expected
+    assert run_length_hamming_distance(a, b, normalize=True) == expected / length
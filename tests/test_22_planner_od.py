@@ -81,3 +81,34 @@ def test_od_factory_inconsistent_inputs_raise_error(od_matrices):
     # inconsistent zoning
     with pytest.raises(AssertionError):
         ODFactory.check(od_matrices[:-1], labels)
+
+
+@pytest.mark.parametrize("dtype", [np.float32, np.float16])
+def test_od_dtype(data_od, labels, dtype):
+    od = OD(data=data_od, labels=labels, dtype=dtype)
+    assert od.data.dtype == dtype
+    np.testing.assert_equal(od["time", "a", "b", :], np.array([40, 45]))
+
+
+def test_create_od_from_matrices_with_dtype(od_matrices, od):
+    od_from_matrices = ODFactory.from_matrices(od_matrices, dtype=np.float32)
+    assert od_from_matrices.data.dtype == np.float32
+    np.testing.assert_equal(od_from_matrices.data, od.data)
+
+
+def test_od_npy_round_trip_is_memory_mapped(tmp_path, od):
+    path = tmp_path / "od.npy"
+    od.to_npy(path)
+    od_mapped = OD.from_npy(path, labels=od.labels)
+    assert isinstance(od_mapped.data, np.memmap)
+    np.testing.assert_equal(od_mapped.data, od.data)
+    np.testing.assert_equal(od_mapped["distance", "b", :, "bus"], od["distance", "b", :, "bus"])
+
+
+def test_create_memory_mapped_od_from_matrices(tmp_path, od_matrices, od):
+    path = tmp_path / "od.npy"
+    od_from_matrices = ODFactory.from_matrices(od_matrices, dtype=np.float32, path=path)
+    assert isinstance(od_from_matrices.data, np.memmap)
+    od_mapped = OD.from_npy(path, labels=od_from_matrices.labels)
+    assert od_mapped.data.dtype == np.float32
+    np.testing.assert_equal(od_mapped.data, od.data)
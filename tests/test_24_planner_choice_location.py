@@ -6,6 +6,7 @@ import pytest
 from pytest import approx
 
 from pam.planner.choice_location import (
+    BatchDiscretionaryTrips,
     ChoiceConfiguration,
     ChoiceMNL,
     ChoiceModel,
@@ -197,3 +198,162 @@ def test_all_discretionary_locations_updated(
     # all discretionary locations should have changed
     for i in [1, 2, 4, 5]:
         assert activities_prior[i].location.area != activities_post[i].location.area
+
+
+@pytest.mark.parametrize(
+    "u",
+    [
+        "od['time', 'b'] + (np.array([0, 2]) * (person.attributes['subpopulation']=='poor'))",
+        "[-0.05, -0.07] * od['time', person.home.area] + 0.4 * np.log(zones.jobs)",
+        "od['time', act.location.area, :, 'car'][:, None] - od['distance', :, 'a']",
+        "od['time', 'a'] * len(person.plan)",
+    ],
+)
+def test_vectorised_choice_set_matches_single_activity_evaluation(choice_model_mnl, u):
+    choice_model_mnl.configure(u=u, scope="act.act!='home'", vectorise=True)
+    choice_set = choice_model_mnl.get_choice_set()
+    choice_set_single = choice_model_mnl.get_choice_set(chunksize=1)
+    assert choice_set.idxs == choice_set_single.idxs
+    np.testing.assert_array_equal(choice_set.u_choices, choice_set_single.u_choices)
+
+
+def test_choice_set_is_not_vectorised_by_default(choice_model_mnl):
+    # reduces over the OD data of all activities in a chunk if vectorised
+    u = "od['time', act.location.area] / od['time', act.location.area].max()"
+    choice_model_mnl.configure(u=u, scope="True")
+    choice_set = choice_model_mnl.get_choice_set()
+    choice_set_single = choice_model_mnl.get_choice_set(chunksize=1)
+    np.testing.assert_array_equal(choice_set.u_choices, choice_set_single.u_choices)
+
+
+def test_vectorised_evaluation_errors_are_raised(choice_model_mnl):
+    choice_model_mnl.configure(u="od['time', 'a'] * person.attributes['missing']", scope="True")
+    for vectorise in [False, True]:
+        choice_model_mnl.configure(vectorise=vectorise)
+        with pytest.raises(KeyError):
+            choice_model_mnl.get_choice_set()
+
+
+def test_choice_set_dtype(choice_model_mnl):
+    choice_model_mnl.configure(u="od['time', 'a']", scope="True", dtype=np.float32)
+    u_choices = choice_model_mnl.get_choice_set().u_choices
+    assert u_choices.dtype == np.float32
+    np.testing.assert_almost_equal(u_choices[0], choice_model_mnl.od["time", "a"].flatten())
+
+
+@pytest.mark.parametrize("gumbel", [False, True])
+def test_seeded_selections_are_reproducible(choice_model_mnl, gumbel):
+    choice_model_mnl.configure(u="od['time', 'b']", scope="True", seed=1, gumbel=gumbel)
+    selections = choice_model_mnl.selections.selections
+    choice_model_mnl._selections = None
+    assert choice_model_mnl.selections.selections == selections
+
+
+def test_gumbel_sampling_requires_mnl(choice_model):
+    choice_model.configure(
+        u="od['time', 'b']",
+        scope="True",
+        func_probabilities=lambda x: x / sum(x),
+        func_sampling=sample_weighted,
+        gumbel=True,
+    )
+    with pytest.raises(ValueError):
+        choice_model.selections.sample()
+
+
+@pytest.mark.parametrize("gumbel", [False, True])
+@pytest.mark.parametrize("chunksize", [1, 3, 1000])
+def test_chunked_apply_matches_apply(population_planner_choice, od, data_zones, gumbel, chunksize):
+    choice_model_mnl = ChoiceMNL(deepcopy(population_planner_choice), od, data_zones)
+    choice_model_chunked = ChoiceMNL(deepcopy(population_planner_choice), od, data_zones)
+    for model in [choice_model_mnl, choice_model_chunked]:
+        model.configure(
+            u="[-0.05, -0.07] * od['time', act.location.area]", scope="True", seed=1, gumbel=gumbel
+        )
+    choice_model_mnl.apply(once_per_agent=False)
+    choice_model_chunked.apply(once_per_agent=False, chunksize=chunksize)
+
+    def locations_and_modes(population):
+        return [
+            (act.location.area, act.previous.mode if act.previous is not None else None)
+            for _, _, person in population.people()
+            for act in person.activities
+        ]
+
+    assert locations_and_modes(choice_model_chunked.population) == locations_and_modes(
+        choice_model_mnl.population
+    )
+
+
+@pytest.mark.parametrize("observed", [0, 0.3, 0.5, 1])
+def test_batch_leg_ratio_probabilities_match_interpolation(observed):
+    leg_ratios = np.array([0, 0.2, 0.3, 0.5, 0.9, 1])
+    np.testing.assert_almost_equal(
+        BatchDiscretionaryTrips.pdf_leg_ratios(leg_ratios, np.array([observed]))[0],
+        DiscretionaryTripOD.pdf_leg_ratio(leg_ratios, observed),
+    )
+
+
+def test_batch_destination_probabilities_match(discretionary_trip_od, od_discretionary):
+    solver = BatchDiscretionaryTrips([], od_discretionary)
+    chain = solver.parse_chain(discretionary_trip_od._trip_chain)
+    leg_ratios, p = solver.destination_factors(
+        chain.anchor_zone_start, chain.anchor_zone_end, chain.trmodes[0]
+    )
+    p = solver.pdf_leg_ratios(leg_ratios, np.array(chain.observed_leg_ratios))[0] * p
+    np.testing.assert_almost_equal(p / p.sum(), discretionary_trip_od.destination_p)
+
+
+def test_batch_chain_stages_use_their_own_leg_mode(
+    plan_home_shop_shop_work_shop_shop_home, od_discretionary
+):
+    trip_chain = get_trip_chains_either_anchor(plan_home_shop_shop_work_shop_shop_home)[-1]
+    trip_chain[3].mode = "bus"
+    trip_chain[2].location.area = "b"
+    solver = BatchDiscretionaryTrips([], od_discretionary)
+    chain = solver.parse_chain(trip_chain)
+    assert chain.trmodes == ["car", "bus"]
+    assert chain.round_trips == [False, False]
+
+    # second stage, from the first discretionary location, as per the recursive solution
+    stage = DiscretionaryTripOD(trip_chain=trip_chain[2:], od=od_discretionary)
+    leg_ratios, p = solver.destination_factors("b", chain.anchor_zone_end, chain.trmodes[1])
+    p = solver.pdf_leg_ratios(leg_ratios, np.array(chain.observed_leg_ratios[1:]))[0] * p
+    np.testing.assert_almost_equal(p / p.sum(), stage.destination_p)
+
+
+def test_batch_discretionary_trips_materialises_population_plans(
+    population_planner_choice, od_discretionary
+):
+    solver = BatchDiscretionaryTrips(population_planner_choice, od_discretionary)
+    assert isinstance(solver._plans, list)
+    assert len(solver._plans) == len(list(population_planner_choice.people()))
+
+
+def test_batch_all_discretionary_locations_updated(
+    plan_home_shop_shop_work_shop_shop_home, od_discretionary
+):
+    plan_prior = deepcopy(plan_home_shop_shop_work_shop_shop_home)
+
+    BatchDiscretionaryTrips(
+        [plan_home_shop_shop_work_shop_shop_home], od_discretionary
+    ).update_plans(seed=1)
+
+    activities_prior = list(plan_prior.activities)
+    activities_post = list(plan_home_shop_shop_work_shop_shop_home.activities)
+    for i in [0, 3, 6]:
+        assert activities_prior[i].location.area == activities_post[i].location.area
+    for i in [1, 2, 4, 5]:
+        assert activities_prior[i].location.area != activities_post[i].location.area
+
+
+def test_batch_discretionary_trips_do_not_depend_on_workers(
+    plan_home_shop_shop_work_shop_shop_home, od_discretionary
+):
+    def update(**kwargs):
+        plans = [deepcopy(plan_home_shop_shop_work_shop_shop_home) for _ in range(10)]
+        BatchDiscretionaryTrips(plans, od_discretionary).update_plans(seed=1, chunksize=3, **kwargs)
+        return [[act.location.area for act in plan.activities] for plan in plans]
+
+    assert update() == update()
+    assert update() == update(workers=2)
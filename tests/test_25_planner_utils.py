@@ -13,7 +13,9 @@ from pam.planner.utils_planner import (
     get_first_leg_time_ratio,
     get_trip_chains,
     get_validate,
+    sample_mnl_gumbel,
     sample_weighted,
+    sample_weighted_rows,
 )
 from pam.read import read_matsim
 
@@ -100,3 +102,48 @@ def test_single_anchor_complete(plan_other_work_shop_other):
     for chain in chains:
         convert_single_anchor_roundtrip(chain)
         assert chain[0] == chain[-1]
+
+
+def test_mnl_probabilities_large_utilities_do_not_overflow():
+    probs = calculate_mnl_probabilities(np.array([1000, 1000, 0]))
+    np.testing.assert_almost_equal(probs, [0.5, 0.5, 0])
+
+
+def test_mnl_probabilities_of_matrix_rows():
+    choices = np.array([[10, 3, 9], [0, 11, 2]])
+    probs = calculate_mnl_probabilities(choices)
+    for row, row_probs in zip(choices, probs):
+        np.testing.assert_almost_equal(row_probs, calculate_mnl_probabilities(row))
+
+
+def test_weighted_rows_sampling_matches_weighted_sampling():
+    weights = np.random.default_rng(0).random((50, 6))
+    random.seed(10)
+    expected = [sample_weighted(row) for row in weights]
+    random.seed(10)
+    assert sample_weighted_rows(weights).tolist() == expected
+
+
+def test_weighted_rows_sampling_with_rng():
+    weights = np.array([[0, 1, 0], [1, 0, 0]] * 10)
+    sampled = sample_weighted_rows(weights, rng=np.random.default_rng(0))
+    assert sampled.tolist() == [1, 0] * 10
+
+
+def test_gumbel_sampling_frequencies_match_mnl_probabilities():
+    utilities = np.log(np.array([[0.2, 0.3, 0.5]] * 100000))
+    sampled = sample_mnl_gumbel(utilities, rng=np.random.default_rng(0))
+    np.testing.assert_allclose(np.bincount(sampled) / len(sampled), [0.2, 0.3, 0.5], atol=0.01)
+
+
+@pytest.mark.parametrize("weights", [[[1, 1, 1], [0, 0, 0]], [[1, 1, 1], [np.nan, 1, 1]]])
+def test_weighted_rows_sampling_rejects_rows_without_weights(weights):
+    with pytest.raises(ValueError, match="rows \\[1\\]"):
+        sample_weighted_rows(np.array(weights), rng=np.random.default_rng(0))
+
+
+def test_gumbel_sampling_is_independent_of_block_size():
+    utilities = np.random.default_rng(1).random((100, 4))
+    expected = sample_mnl_gumbel(utilities, rng=np.random.default_rng(0), block_size=100)
+    sampled = sample_mnl_gumbel(utilities, rng=np.random.default_rng(0), block_size=7)
+    np.testing.assert_array_equal(sampled, expected)
@@ -1,4 +1,5 @@
 """Tests for pam/optimise/grid.py"""
+
 import pytest
 
 from pam.activity import Activity, Leg, Plan
@@ -91,3 +92,23 @@ def test_traverse_double(dummy_scorer, plan, recorder):
     assert recorder.best_score == 0
     grid.traverse(dummy_scorer, {}, plan, 7200, 72000, 1, recorder)
     assert recorder.best_score == 1
+
+
+def test_grid_search_keeps_initial_plan_when_not_improved(plan):
+    class InitialBestScorer(PlanScorer):
+        """Scores the first (initial) plan highest."""
+
+        def __init__(self):
+            self.n = 0
+
+        def score_plan(self, plan: Plan, cnfg: dict, plan_cost=None) -> float:
+            self.n += 1
+            return 1 if self.n == 1 else 0
+
+        def score_person(self, person, key="subpopulation", plan_costs=None) -> float:
+            return 0
+
+    end_times = [act.end_time for act in plan.activities]
+    best_plan, best_score = grid.grid_search(plan, InitialBestScorer(), {}, step=12 * 3600)
+    assert best_score == 1
+    assert [act.end_time for act in best_plan.activities] == end_times
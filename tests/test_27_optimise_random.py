@@ -1,10 +1,12 @@
 """Tests for pam/optimise/random.py"""
+
+import numpy as np
 import pytest
 
 from pam.activity import Activity, Leg, Plan
 from pam.core import Person
 from pam.optimise import random
-from pam.scoring import PlanScorer
+from pam.scoring import PlanScorer, plan_times
 from pam.utils import minutes_to_datetime as mtdt
 from pam.variables import END_OF_DAY
 
@@ -107,3 +109,57 @@ def test_reschedule(dummy_scorer, plan):
     assert best_scores == {0: 2, 1: 3, 2: 4}
     assert new_plan.valid_sequence
     assert new_plan.valid_time_sequence
+
+
+def test_random_mutate_activity_durations_with_rng_is_reproducible(plan):
+    a = random.random_mutate_activity_durations(plan, rng=np.random.default_rng(1))
+    b = random.random_mutate_activity_durations(plan, rng=np.random.default_rng(1))
+    assert [act.end_time for act in a.activities] == [act.end_time for act in b.activities]
+
+
+def test_random_activity_times_match_mutated_plan(plan):
+    starts, ends = random.random_activity_times(plan, rng=np.random.default_rng(2))
+    mutated = random.random_mutate_activity_durations(plan, rng=np.random.default_rng(2))
+    mutated_starts, mutated_ends = plan_times(mutated)
+    assert list(starts) == list(mutated_starts)
+    assert list(ends) == list(mutated_ends)
+    assert ends[-1] == 24 * 60 * 60
+
+
+def test_random_activity_times_batch_matches_single_draws(plan):
+    starts, ends = random.random_activity_times(plan, rng=np.random.default_rng(3), size=3)
+    rng = np.random.default_rng(3)
+    for i in range(3):
+        single_starts, single_ends = random.random_activity_times(plan, rng=rng)
+        assert list(starts[i]) == list(single_starts)
+        assert list(ends[i]) == list(single_ends)
+
+
+def test_reschedule_in_batches(dummy_scorer, plan):
+    new_plan, best_scores = random.reschedule(plan, dummy_scorer, {}, patience=5, batch_size=4)
+    # dummy scores increase with each proposal scored, so the last of each batch is best
+    assert best_scores == {0: 1, 3: 5, 5: 7}
+    assert new_plan.valid_sequence
+    assert new_plan.valid_time_sequence
+
+
+class WorkScorer(PlanScorer):
+    """Scores plans by the duration of work, in hours."""
+
+    def score_plan(self, plan: Plan, cnfg: dict, plan_cost=None) -> float:
+        return sum(act.duration.total_seconds() / 3600 for act in plan if act.act == "work")
+
+    def score_person(self, person: Person, key: str = "subpopulation", plan_costs=None) -> float:
+        return self.score_plan(person.plan, {})
+
+
+def test_reschedule_in_batches_with_rng_is_reproducible(plan):
+    scorer = WorkScorer({})
+    a, a_scores = random.reschedule(
+        plan, scorer, {}, patience=50, batch_size=10, rng=np.random.default_rng(4), verbose=False
+    )
+    b, b_scores = random.reschedule(
+        plan, scorer, {}, patience=50, batch_size=10, rng=np.random.default_rng(4), verbose=False
+    )
+    assert a_scores == b_scores
+    assert [act.end_time for act in a.activities] == [act.end_time for act in b.activities]
@@ -1,8 +1,12 @@
+import random
+
 import numpy as np
 import pandas as pd
 import pytest
 
 from pam.planner import ipf
+from pam.read import read_matsim
+from pam.write.matsim import Writer
 
 
 @pytest.fixture
@@ -93,3 +97,96 @@ def test_generate_fitted_population_matches_marginals(population, zone_data):
                 if (person.attributes[var] == cl) and (person.attributes["hzone"] == zone):
                     n += 1
             assert n == v
+
+
+def test_ipf_stops_when_converged(marginals, mocker):
+    mocker.spy(ipf, "get_scaling_factor")
+    X = np.zeros(tuple(map(len, marginals))) + 0.001
+    fitted = ipf.ipf(X, marginals, max_iterations=10**3)
+    assert ipf.get_max_error(fitted, marginals) <= 0.001
+    assert ipf.get_scaling_factor.call_count < 100
+
+
+def test_ipf_batch_matches_ipf(marginals):
+    batch_marginals = [np.stack([m, m[::-1]]) for m in marginals]
+    X = np.zeros((2, *map(len, marginals))) + 0.001
+    X[1, 0, 0, 0] = 1
+    result = ipf.ipf_batch(X, batch_marginals)
+    for i in range(2):
+        np.testing.assert_almost_equal(
+            result.fitted[i], ipf.ipf(X[i], [m[i] for m in batch_marginals])
+        )
+    assert result.converged.all()
+    assert (result.max_error <= 0.001).all()
+    assert (result.iterations > 0).all()
+
+
+def test_ipf_batch_freezes_converged_matrices(marginals):
+    X = np.zeros(tuple(map(len, marginals))) + 0.001
+    fitted = ipf.ipf(X, marginals, tolerance=10**-9)
+    result = ipf.ipf_batch(
+        np.stack([fitted, X]), [np.stack([m, m]) for m in marginals], tolerance=10**-9
+    )
+    np.testing.assert_array_equal(result.fitted[0], fitted)
+    assert result.iterations[0] < result.iterations[1]
+
+
+def test_ipf_batch_reports_non_convergence():
+    # inconsistent marginals cannot be matched
+    X = np.ones((1, 2, 2))
+    result = ipf.ipf_batch(X, [np.array([[1, 1]]), np.array([[2, 2]])], max_iterations=3)
+    assert not result.converged[0]
+    assert result.iterations[0] == 3
+    assert result.max_error[0] > 0.001
+
+
+@pytest.fixture
+def fitted_distributions(population, zone_data):
+    population["B"]["gerry"].attributes["age"] = "yes"  # avoid zero-cell issue
+    encodings, dist = ipf.generate_joint_distributions(zone_data)
+    return encodings, dist, ipf.get_sample_pool(population, encodings)
+
+
+def test_sampled_population_matches_random_choices(fitted_distributions):
+    encodings, dist, sample_pool = fitted_distributions
+    random.seed(1)
+    pop = ipf.sample_population(encodings, dist, sample_pool)
+
+    random.seed(1)
+    expected = []
+    for zone, zone_dist in dist.items():
+        for code, sample_size in np.ndenumerate(zone_dist):
+            if sample_size:
+                for person in random.choices(sample_pool[code], k=sample_size):
+                    expected.append((f"{person.pid}-{len(expected)}", zone))
+
+    assert [(pid, person.attributes["hzone"]) for _, pid, person in pop.people()] == expected
+
+
+def test_seeded_references_share_templates(fitted_distributions):
+    encodings, dist, sample_pool = fitted_distributions
+    references = list(ipf.sample_references(encodings, dist, sample_pool, seed=1))
+    assert references == list(ipf.sample_references(encodings, dist, sample_pool, seed=1))
+    assert len(references) == sum(zone_dist.sum() for zone_dist in dist.values())
+    templates = {id(person) for pool in sample_pool.values() for person in pool}
+    assert all(id(reference.template) in templates for reference in references)
+
+    person = references[0].materialise()
+    assert person.pid == references[0].pid
+    assert person.attributes["hzone"] == references[0].zone
+    assert person.plan is not references[0].template.plan
+    assert "hzone" not in references[0].template.attributes
+
+
+def test_sampled_population_streamed_to_writer(fitted_distributions, tmp_path):
+    encodings, dist, sample_pool = fitted_distributions
+    path = str(tmp_path / "population.xml")
+    with Writer(path) as writer:
+        n = ipf.sample_population_to_writer(encodings, dist, sample_pool, writer, seed=1)
+
+    pop = ipf.sample_population(encodings, dist, sample_pool, seed=1)
+    pop_written = read_matsim(path, version=12)
+    assert n == len(pop)
+    assert {pid for _, pid, _ in pop_written.people()} == {pid for _, pid, _ in pop.people()}
+    for _, pid, person in pop_written.people():
+        assert person.attributes["hzone"] == pop[pid][pid].attributes["hzone"]
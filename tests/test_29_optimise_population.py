@@ -0,0 +1,133 @@
+"""Tests for pam/optimise/population.py"""
+
+from copy import deepcopy
+
+import pytest
+from shapely.geometry import Point
+
+from pam.activity import Activity, Leg
+from pam.core import Household, Person, Population
+from pam.optimise.population import optimise_population, score_population
+from pam.read import read_matsim
+from pam.scoring import CharyparNagelPlanScorer, PlanScorer
+from pam.utils import minutes_to_datetime as mtdt
+from pam.variables import END_OF_DAY
+from pam.write.matsim import Writer
+
+
+@pytest.fixture
+def population():
+    population = Population()
+    for h in range(4):
+        household = Household(f"hh{h}")
+        for p in range(2):
+            person = Person(f"p{h}-{p}", attributes={"subpopulation": "default"})
+            work_start = 420 + 60 * h + 30 * p
+            person.add(
+                Activity(
+                    act="home",
+                    area=1,
+                    loc=Point(0, 0),
+                    start_time=mtdt(0),
+                    end_time=mtdt(work_start),
+                )
+            )
+            person.add(
+                Leg(
+                    mode="car",
+                    start_time=mtdt(work_start),
+                    end_time=mtdt(work_start + 60),
+                    distance=1000,
+                )
+            )
+            person.add(
+                Activity(
+                    act="work",
+                    area=2,
+                    loc=Point(1000, 0),
+                    start_time=mtdt(work_start + 60),
+                    end_time=mtdt(1020),
+                )
+            )
+            person.add(Leg(mode="car", start_time=mtdt(1020), end_time=mtdt(1080), distance=1000))
+            person.add(
+                Activity(
+                    act="home", area=1, loc=Point(0, 0), start_time=mtdt(1080), end_time=END_OF_DAY
+                )
+            )
+            household.add(person)
+        population.add(household)
+    return population
+
+
+@pytest.fixture
+def scorer(default_config):
+    return CharyparNagelPlanScorer({"default": default_config})
+
+
+def test_optimise_population_grid(population, scorer):
+    results = optimise_population(population, scorer, step=3600, chunksize=3)
+    assert len(results) == 8
+    assert (results.score >= results.initial_score).all()
+    for hid, pid, person in population.people():
+        assert person.plan.valid_time_sequence
+        assert scorer.score_person(person) == pytest.approx(results.loc[(hid, pid), "score"])
+
+
+def test_optimise_population_random_is_reproducible(population, scorer):
+    serial = optimise_population(
+        deepcopy(population), scorer, "random", seed=1, patience=20, chunksize=1, workers=1
+    )
+    parallel = optimise_population(
+        population, scorer, "random", seed=1, patience=20, chunksize=3, workers=2
+    )
+    assert serial.equals(parallel)
+
+
+def test_optimise_population_timeout_keeps_initial_plan(population, scorer):
+    results = optimise_population(population, scorer, step=3600, timeout=0)
+    assert results.score.equals(results.initial_score)
+
+
+def test_optimise_population_progress(population, scorer):
+    progress = []
+    optimise_population(population, scorer, step=3600, chunksize=3, progress=progress.append)
+    assert progress == [6, 8]
+
+
+def test_optimise_population_to_writer(population, scorer, tmp_path):
+    path = str(tmp_path / "plans.xml")
+    households = population.households.values()
+    with Writer(path) as writer:
+        optimise_population(households, scorer, step=3600, writer=writer)
+    assert len(list(read_matsim(path, version=12).people())) == 8
+
+
+def test_optimise_population_unknown_optimiser(population, scorer):
+    with pytest.raises(ValueError):
+        optimise_population(population, scorer, "foo")
+
+
+class ConstantScorer(PlanScorer):
+    def score_person(self, person, key="subpopulation", plan_costs=None):
+        return 0.0
+
+    def score_plan(self, plan, cnfg, plan_cost=None):
+        return 0.0
+
+
+def test_optimise_population_dp_requires_charypar_nagel_scorer(population):
+    with pytest.raises(ValueError, match="CharyparNagelPlanScorer"):
+        optimise_population(population, ConstantScorer({"default": {}}), "dp")
+
+
+def test_optimise_population_dp_rejects_timeout(population, scorer):
+    with pytest.raises(ValueError, match="timeout"):
+        optimise_population(population, scorer, "dp", timeout=1)
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_score_population(population, scorer, workers):
+    scores = score_population(population, scorer, workers=workers, chunksize=3)
+    for hid, pid, person in population.people():
+        assert scores[(hid, pid)] == pytest.approx(scorer.score_person(person))
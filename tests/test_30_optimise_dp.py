@@ -0,0 +1,75 @@
+"""Tests for pam/optimise/dp.py"""
+
+import pytest
+
+from pam.activity import Activity, Leg, Plan
+from pam.optimise import dp, grid
+from pam.scoring import CharyparNagelPlanScorer
+from pam.utils import minutes_to_datetime as mtdt
+from pam.variables import END_OF_DAY
+
+
+def make_plan(acts: list[str], times: list[int]) -> Plan:
+    plan = Plan()
+    for k, act in enumerate(acts):
+        end_time = mtdt(times[2 * k + 1]) if 2 * k + 1 < len(times) else END_OF_DAY
+        plan.add(Activity(act=act, area=k, start_time=mtdt(times[2 * k]), end_time=end_time))
+        if k < len(acts) - 1:
+            plan.add(
+                Leg(
+                    mode="car",
+                    start_time=mtdt(times[2 * k + 1]),
+                    end_time=mtdt(times[2 * k + 2]),
+                    distance=1000,
+                )
+            )
+    return plan
+
+
+@pytest.fixture
+def scorer(default_config):
+    return CharyparNagelPlanScorer({"default": default_config})
+
+
+@pytest.mark.parametrize(
+    "acts,times,step",
+    [
+        (["home", "work", "home"], [0, 420, 480, 1020, 1080], 3600),
+        (["home", "shop", "work", "home"], [0, 420, 480, 510, 570, 960, 1020], 3600),
+        (["home", "work", "shop"], [0, 420, 480, 1020, 1080], 1800),
+        (["home", "work"], [0, 420, 480], 900),
+    ],
+)
+def test_dp_search_matches_grid_search(scorer, default_config, acts, times, step):
+    plan = make_plan(acts, times)
+    grid_plan, grid_score = grid.grid_search(plan, scorer, default_config, step=step)
+    dp_plan, dp_score = dp.dp_search(plan, scorer, default_config, step=step)
+    assert dp_score == pytest.approx(grid_score)
+    assert [act.end_time for act in dp_plan.activities] == [
+        act.end_time for act in grid_plan.activities
+    ]
+    assert dp_plan.valid_time_sequence
+
+
+def test_dp_search_copies_plan(scorer, default_config):
+    plan = make_plan(["home", "work", "home"], [0, 420, 480, 1020, 1080])
+    end_times = [act.end_time for act in plan.activities]
+    dp_plan, _ = dp.dp_search(plan, scorer, default_config, step=3600)
+    assert [act.end_time for act in plan.activities] == end_times
+    assert dp_plan is not plan
+
+
+def test_dp_search_keeps_better_initial_plan(scorer, default_config):
+    # the initial schedule is not on the (coarse) grid
+    plan = make_plan(["home", "work", "home"], [0, 450, 480, 1020, 1050])
+    initial_score = scorer.score_plan(plan, default_config)
+    dp_plan, dp_score = dp.dp_search(plan, scorer, default_config, step=6 * 3600, copy=False)
+    assert dp_score == initial_score
+    assert plan[0].end_time == mtdt(450)
+
+
+def test_single_activity_plan_is_unchanged(scorer, default_config):
+    plan = make_plan(["home"], [0])
+    dp_plan, dp_score = dp.dp_search(plan, scorer, default_config)
+    assert dp_score == scorer.score_plan(plan, default_config)
+    assert dp_plan.day[0].end_time == END_OF_DAY
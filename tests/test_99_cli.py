@@ -3,7 +3,7 @@ import os
 import pytest
 from click.testing import CliRunner
 
-from pam import read
+from pam import read, write
 from pam.cli import cli
 
 
@@ -133,6 +133,17 @@ def test_cli_sample(path_test_plan, tmp_path, sample_percentage):
     assert len(population) == (len(population_input) * float(sample_percentage))
 
 
+def test_cli_sample_non_contiguous_households(path_test_plan, tmp_path):
+    path_output_dir = tmp_path / "output"
+    runner = CliRunner()
+    result = runner.invoke(
+        cli, ["sample", path_test_plan, str(path_output_dir), "-s", "1", "--contiguous_households"]
+    )
+    assert result.exit_code == 1
+    assert "use --non_contiguous_households" in result.output
+    assert list(path_output_dir.iterdir()) == []
+
+
 def test_cli_wipe_all_links(path_test_plan, tmp_path):
     population_input = read.read_matsim(path_test_plan, household_key="hid", version=12)
     path_output_dir = str(tmp_path)
@@ -175,3 +186,77 @@ def test_cli_link_wipe_selected_only(path_test_plan, tmp_path):
             assert "3-4" not in leg.route.network_route
         for act in person.acts:
             assert act.location.link != "3-4"
+
+
+def test_cli_apply_policies(path_test_plan, tmp_path):
+    path_policies = tmp_path / "policies.py"
+    path_policies.write_text(
+        "from pam.policy import policies\n\n"
+        "policies = [policies.RemoveHouseholdActivities(['work'], probability=1)]\n"
+    )
+    path_output_dir = str(tmp_path / "output")
+    runner = CliRunner()
+    result = runner.invoke(
+        cli,
+        [
+            "apply-policies",
+            path_test_plan,
+            str(path_policies),
+            path_output_dir,
+            "--non_contiguous_households",
+        ],
+    )
+    if result.exit_code != 0:
+        print(result.output)
+    assert result.exit_code == 0
+
+    population_input = read.read_matsim(path_test_plan, household_key="hid", version=12)
+    population = read.read_matsim(
+        os.path.join(path_output_dir, "plans.xml"), household_key="hid", version=12
+    )
+    assert len(population) == len(population_input)
+    assert "work" in population_input.activity_classes
+    assert "work" not in population.activity_classes
+
+
+def test_cli_apply_policies_to_non_contiguous_households(path_test_plan, tmp_path):
+    path_policies = tmp_path / "policies.py"
+    path_policies.write_text(
+        "from pam.policy import policies\n\n"
+        "policies = [policies.RemoveHouseholdActivities(['work'], probability=1)]\n"
+    )
+    path_output_dir = tmp_path / "output"
+    runner = CliRunner()
+    result = runner.invoke(
+        cli, ["apply-policies", path_test_plan, str(path_policies), str(path_output_dir)]
+    )
+    assert result.exit_code == 1
+    assert "use --non_contiguous_households" in result.output
+    assert list(path_output_dir.iterdir()) == []
+
+
+def test_cli_apply_policies_to_contiguous_households(path_test_plan, tmp_path):
+    # households are written contiguously
+    population_input = read.read_matsim(path_test_plan, household_key="hid", version=12)
+    path_input = str(tmp_path / "contiguous.xml")
+    write.write_matsim(population_input, plans_path=path_input, household_key="hid")
+    path_policies = tmp_path / "policies.py"
+    path_policies.write_text(
+        "from pam.policy import policies\n\n"
+        "policies = [policies.RemoveHouseholdActivities(['work'], probability=1)]\n"
+    )
+    path_output_dir = tmp_path / "output"
+    runner = CliRunner()
+    result = runner.invoke(
+        cli, ["apply-policies", path_input, str(path_policies), str(path_output_dir)]
+    )
+    if result.exit_code != 0:
+        print(result.output)
+    assert result.exit_code == 0
+    assert os.listdir(path_output_dir) == ["plans.xml"]
+
+    population = read.read_matsim(
+        str(path_output_dir / "plans.xml"), household_key="hid", version=12
+    )
+    assert len(population) == len(population_input)
+    assert "work" not in population.activity_classes